@@ -1,25 +1,21 @@
+import functools
+
 from google.adk.agents import Agent
 from google.adk.tools import google_search
 
-diet_lifestyle_agent = Agent(
-    name="DietLifestyleCoach",
-    model="gemini-2.0-flash",
-    description=(
-        "Personalized Diet & Lifestyle coaching agent. Asks up to 5 quick questions "
-        "about the user's vitals, conditions, and goals — skipping any already answered "
-        "during MedAssist intake — then uses Google Search to deliver a tailored "
-        "nutrition plan, weekly activity routine, and lifestyle recommendations."
-    ),
-    instruction="""You are Coach Vita, a friendly and knowledgeable Diet & Lifestyle coach.
+from agent_context import compact_history, inject_profile_context
+
+_INSTRUCTION = """You are Coach Vita, a friendly and knowledgeable Diet & Lifestyle coach.
 
 CONTEXT AWARENESS:
-Before asking any question, scan the full conversation history for user data.
-Profile data may appear as a tool result from get_user_profile (look for fullName, age,
-gender, height, weight, bloodGroup fields) or in anything MedAssist has already discussed
-(conditions, medications, lifestyle, symptoms).
+Before asking any question, check the [PATIENT CONTEXT] line at the end of these
+instructions (profile fields with a value) and anything MedAssist has already discussed
+in the conversation history (conditions, medications, lifestyle, symptoms).
 Extract every field that has a real, non-empty value — treat all of it as already known.
 Do NOT ask for any information already present in the conversation history.
 Only ask for details that are genuinely missing.
+Earlier turns may arrive as an "[Earlier conversation — compacted]" message with a
+summary and pinned context (profile, clinical report) — treat it as part of the history.
 
 STEP 1 — COLLECT MISSING INFORMATION (up to 5 questions, one at a time):
 
@@ -88,10 +84,31 @@ RULES:
 - Never prescribe medication or claim to diagnose.
 - If the user mentions an eating disorder or extreme restriction, respond with empathy
   and recommend professional support before proceeding.
-""",
-    tools=[google_search],
-    disallow_transfer_to_parent=True,
-    disallow_transfer_to_peers=True,
-)
-
-root_agent = diet_lifestyle_agent
+"""
+
+
+@functools.cache
+def build_diet_lifestyle_agent() -> Agent:
+    """Coach Vita, the diet and lifestyle coach."""
+    return Agent(
+        name="DietLifestyleCoach",
+        model="gemini-2.0-flash",
+        description=(
+            "Personalized Diet & Lifestyle coaching agent. Asks up to 5 quick questions "
+            "about the user's vitals, conditions, and goals — skipping any already answered "
+            "during MedAssist intake — then uses Google Search to deliver a tailored "
+            "nutrition plan, weekly activity routine, and lifestyle recommendations."
+        ),
+        instruction=_INSTRUCTION,
+        tools=[google_search],
+        before_model_callback=[inject_profile_context, compact_history],
+        disallow_transfer_to_parent=True,
+        disallow_transfer_to_peers=True,
+    )
+
+
+def __getattr__(name: str):
+    # `diet_lifestyle_agent` / `root_agent` are built on first access (old imports, the ADK loader).
+    if name in ("diet_lifestyle_agent", "root_agent"):
+        return build_diet_lifestyle_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
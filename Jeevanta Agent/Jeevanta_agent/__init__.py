@@ -1,2 +1,18 @@
-from . import agent
-from .agent import root_agent
+"""Jeevanta orchestrator package.
+
+Importing it has no side effects. `root_agent` is built on first access —
+that is how `adk web` / `adk run` load it — and, since the ADK CLI has no
+application lifespan, that access also starts the reminder scheduler.
+api_server builds the agent and starts the scheduler in its own lifespan.
+"""
+
+
+def __getattr__(name: str):
+    if name == "root_agent":
+        from Reminder_agent.reminder_scheduler import start_scheduler
+
+        from .agent import build_root_agent
+
+        start_scheduler()
+        return build_root_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,28 +1,26 @@
+import functools
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from google.adk.agents import Agent
-from MedAssist_agent.agent import med_assist_agent
-from DietLifestyle_agent.agent import diet_lifestyle_agent
-from Reminder_agent.agent import reminder_agent
+from agent_context import compact_history, inject_profile_context
+from MedAssist_agent.agent import build_med_assist_agent
+from DietLifestyle_agent.agent import build_diet_lifestyle_agent
+from Reminder_agent.agent import build_reminder_agent
 from Jeevanta_agent.auth_tools import send_otp, verify_otp, get_user_profile
 
-root_agent = Agent(
-    name="Jeevanta",
-    model="gemini-2.0-flash",
-    description=(
-        "Jeevanta is the central health platform orchestrator. It authenticates users "
-        "via OTP, loads their profile, then routes them across MedAssist, "
-        "DietLifestyleCoach, and ReminderAgent with full context pre-loaded."
-    ),
-    instruction="""You are Jeevanta, the central orchestrator for a smart AI health platform.
+_INSTRUCTION = """You are Jeevanta, the central orchestrator for a smart AI health platform.
 
 ═══════════════════════════════════════════════
 PHASE 1 — AUTHENTICATION (mandatory first step)
 ═══════════════════════════════════════════════
 
+If an [AUTHENTICATED] line appears at the end of these instructions, the API has
+already verified the user and loaded their profile — skip phases 1 and 2 and go
+straight to PHASE 3 routing.
+
 STEP 1 — Collect name and phone number:
   Greet the user warmly:
   "Welcome to Jeevanta! Before we begin, I need to verify your identity.
@@ -50,13 +48,9 @@ STEP 4 — Fetch and store profile silently:
   The profile data is FOR YOUR INTERNAL CONTEXT ONLY — do NOT display it to the user.
   Do NOT print a profile card or list the fields back to the user.
 
-  Internally note only the fields that have a non-empty, non-null value.
-  Ignore and discard any field that is empty, null, or missing.
-
-  Store the available data mentally as:
-    [CONTEXT] Name=<value> Age=<value> Gender=<value> Height=<value>cm
-              Weight=<value>kg BloodGroup=<value> Email=<value> Phone=<value>
-  (only include fields that actually have values)
+  The tool saves the non-empty fields to the session automatically; from the
+  next step on they appear in a [PATIENT CONTEXT] line at the end of your
+  instructions and of every specialist's instructions.
 
   After loading the profile, greet the user by name (if available) with a single
   warm sentence, e.g.: "Great, [Name]! You're all set. Let me connect you with
@@ -97,11 +91,32 @@ When in doubt, transfer to MedAssist.
 CONTEXT PASSING RULES (critical)
 ═══════════════════════════════════════════════
 
-Before transferring, the tool result from get_user_profile is already in the
-conversation history. All sub-agents will receive this history and must read
-the profile data from it directly — do NOT repeat or re-ask for information
-that is already present in the tool result or conversation history.
-""",
-    tools=[send_otp, verify_otp, get_user_profile],
-    sub_agents=[med_assist_agent, diet_lifestyle_agent, reminder_agent],
-)
+The profile loaded by get_user_profile is injected into every sub-agent as a
+[PATIENT CONTEXT] line — do NOT repeat it in your messages, and do NOT re-ask
+for information already present in that context or the conversation history.
+"""
+
+
+@functools.cache
+def build_root_agent() -> Agent:
+    """The Jeevanta orchestrator with every specialist attached as a sub-agent."""
+    return Agent(
+        name="Jeevanta",
+        model="gemini-2.0-flash",
+        description=(
+            "Jeevanta is the central health platform orchestrator. It authenticates users "
+            "via OTP, loads their profile, then routes them across MedAssist, "
+            "DietLifestyleCoach, and ReminderAgent with full context pre-loaded."
+        ),
+        instruction=_INSTRUCTION,
+        tools=[send_otp, verify_otp, get_user_profile],
+        sub_agents=[build_med_assist_agent(), build_diet_lifestyle_agent(), build_reminder_agent()],
+        before_model_callback=[inject_profile_context, compact_history],
+    )
+
+
+def __getattr__(name: str):
+    # `root_agent` is built on first access (old imports, the ADK loader).
+    if name == "root_agent":
+        return build_root_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,15 +1,31 @@
 """OTP-based authentication tools for the Jeevanta orchestrator."""
 
 import os
-import requests
+
+import httpx
 from dotenv import load_dotenv
+from google.adk.tools import ToolContext
+
+from agent_context import PROFILE_STATE_KEY, PatientProfile
+from Jeevanta_agent.http_client import CircuitOpenError, Endpoint, arequest
+from Jeevanta_agent.profile_cache import ProfileCache
 
 load_dotenv()
 
 OTP_SEND_URL     = os.getenv("OTP_SEND_URL",     "https://lab-test-backend-1.onrender.com/api/v1/otp/send")
 OTP_VERIFY_URL   = os.getenv("OTP_VERIFY_URL",   "https://lab-test-backend-1.onrender.com/api/v1/otp/verify")
 USER_PROFILE_URL = os.getenv("USER_PROFILE_URL", "https://coherent-corine-tepid.ngrok-free.dev/api/mobile")
-_TIMEOUT = 60  # Render.com free tier can take 30-60s on cold start
+
+# Separate connect/read budgets per endpoint. A cold Render.com backend fails
+# fast on connect and trips the breaker instead of pinning a request for 60s.
+_OTP_CONNECT_TIMEOUT     = float(os.getenv("OTP_CONNECT_TIMEOUT", "5"))
+_OTP_READ_TIMEOUT        = float(os.getenv("OTP_READ_TIMEOUT", "20"))
+_PROFILE_CONNECT_TIMEOUT = float(os.getenv("PROFILE_CONNECT_TIMEOUT", "5"))
+_PROFILE_READ_TIMEOUT    = float(os.getenv("PROFILE_READ_TIMEOUT", "15"))
+
+_otp_send    = Endpoint("otp_send",    _OTP_CONNECT_TIMEOUT, _OTP_READ_TIMEOUT)
+_otp_verify  = Endpoint("otp_verify",  _OTP_CONNECT_TIMEOUT, _OTP_READ_TIMEOUT)
+_profile_get = Endpoint("profile_get", _PROFILE_CONNECT_TIMEOUT, _PROFILE_READ_TIMEOUT, idempotent=True)
 
 # ------------------------------------------------------------------
 # DEV BYPASS — set OTP_BYPASS=true in .env to skip real OTP calls.
@@ -19,8 +35,15 @@ _TIMEOUT = 60  # Render.com free tier can take 30-60s on cold start
 _BYPASS     = os.getenv("OTP_BYPASS", "false").lower() == "true"
 _BYPASS_OTP = os.getenv("OTP_BYPASS_CODE", "123456")
 
+# Profiles keyed by normalised phone number (see profile_cache for TTL/LRU settings).
+profile_cache = ProfileCache()
+
+
+def _normalize_phone(phone_number: str) -> str:
+    return "".join(ch for ch in phone_number.strip() if ch.isdigit() or ch == "+")
+
 
-def send_otp(name: str, phone_number: str) -> dict:
+async def send_otp(name: str, phone_number: str) -> dict:
     """Send an OTP to the user's phone number via the authentication API.
 
     Call this after collecting the user's name and phone number.
@@ -40,11 +63,10 @@ def send_otp(name: str, phone_number: str) -> dict:
         }
 
     try:
-        response = requests.post(
-            OTP_SEND_URL,
+        response = await arequest(
+            _otp_send, "POST", OTP_SEND_URL,
             json={"phone_number": phone_number.strip()},
             headers={"Content-Type": "application/json"},
-            timeout=_TIMEOUT,
         )
         data = response.json()
 
@@ -61,13 +83,17 @@ def send_otp(name: str, phone_number: str) -> dict:
             "expires_at": expires_at,
         }
 
-    except requests.exceptions.ConnectionError:
+    except CircuitOpenError:
+        return {"ok": False, "message": "The OTP service is temporarily unavailable. Please try again in a minute."}
+    except httpx.TimeoutException:
+        return {"ok": False, "message": "The OTP service timed out. Please try again."}
+    except httpx.TransportError:
         return {"ok": False, "message": "Could not reach the OTP service. Please try again."}
     except Exception as e:
         return {"ok": False, "message": f"Failed to send OTP: {e}"}
 
 
-def verify_otp(phone_number: str, otp_entered: str) -> dict:
+async def verify_otp(phone_number: str, otp_entered: str) -> dict:
     """Verify the OTP entered by the user by calling the verification API.
 
     Call this after the user shares the OTP they received on their phone.
@@ -85,14 +111,13 @@ def verify_otp(phone_number: str, otp_entered: str) -> dict:
         return {"ok": False, "verified": False, "message": f"Incorrect OTP. (Dev bypass: use {_BYPASS_OTP})"}
 
     try:
-        response = requests.post(
-            OTP_VERIFY_URL,
+        response = await arequest(
+            _otp_verify, "POST", OTP_VERIFY_URL,
             json={
                 "phone_number": phone_number.strip(),
                 "otp_code": str(otp_entered).strip(),
             },
             headers={"Content-Type": "application/json"},
-            timeout=_TIMEOUT,
         )
         data = response.json()
 
@@ -117,13 +142,17 @@ def verify_otp(phone_number: str, otp_entered: str) -> dict:
             "message": "Incorrect OTP. Please ask the user to check and try again.",
         }
 
-    except requests.exceptions.ConnectionError:
+    except CircuitOpenError:
+        return {"ok": False, "verified": False, "message": "The OTP service is temporarily unavailable. Please try again in a minute."}
+    except httpx.TimeoutException:
+        return {"ok": False, "verified": False, "message": "The OTP service timed out. Please try again."}
+    except httpx.TransportError:
         return {"ok": False, "verified": False, "message": "Could not reach the OTP service. Please try again."}
     except Exception as e:
         return {"ok": False, "verified": False, "message": f"Verification failed: {e}"}
 
 
-def get_user_profile(phone_number: str) -> dict:
+async def get_user_profile(phone_number: str, tool_context: ToolContext) -> dict:
     """Fetch the user's full profile from the database using their phone number.
 
     Call this immediately after successful OTP verification to load the user's
@@ -137,18 +166,37 @@ def get_user_profile(phone_number: str) -> dict:
         Profile fields: fullName, username, email, age, gender, dob, height,
                         weight, bloodGroup, phoneNumber.
     """
+    result = await load_user_profile(phone_number)
+    if result.get("ok"):
+        # Stored once as typed state; agents get it via inject_profile_context.
+        tool_context.state[PROFILE_STATE_KEY] = PatientProfile.from_api(result["profile"]).to_state()
+    return result
+
+
+async def load_user_profile(phone_number: str) -> dict:
+    """Cached profile lookup without a tool context (used by the login fast path)."""
+    return await profile_cache.get(_normalize_phone(phone_number), _fetch_user_profile)
+
+
+async def invalidate_user_profile(phone_number: str) -> None:
+    """Drop a cached profile, e.g. after the user edits it in the mobile app."""
+    await profile_cache.invalidate(_normalize_phone(phone_number))
+
+
+async def _fetch_user_profile(phone_number: str) -> dict:
     try:
-        response = requests.request(
-            method="GET",
-            url=USER_PROFILE_URL,
-            json={"phoneNumber": phone_number.strip()},
+        response = await arequest(
+            _profile_get, "GET", USER_PROFILE_URL,
+            json={"phoneNumber": phone_number},
             headers={
                 "Content-Type": "application/json",
                 "ngrok-skip-browser-warning": "true",
             },
-            timeout=_TIMEOUT,
         )
-        data = response.json()
+        try:
+            data = response.json()
+        except ValueError:
+            return {"ok": False, "profile": {}, "message": f"Profile service returned non-JSON response (status {response.status_code}). Check the URL and ngrok tunnel."}
 
         # Support both {success, data} and flat response shapes
         if not data.get("success"):
@@ -180,9 +228,9 @@ def get_user_profile(phone_number: str) -> dict:
             "message": "User profile loaded successfully.",
         }
 
-    except requests.exceptions.ConnectionError:
+    except CircuitOpenError:
+        return {"ok": False, "profile": {}, "message": "The profile service is temporarily unavailable. Continue without profile data."}
+    except httpx.TransportError:
         return {"ok": False, "profile": {}, "message": "Could not reach the profile service. Make sure the backend is running."}
-    except requests.exceptions.JSONDecodeError:
-        return {"ok": False, "profile": {}, "message": f"Profile service returned non-JSON response (status {response.status_code}). Check the URL and ngrok tunnel."}
     except Exception as e:
         return {"ok": False, "profile": {}, "message": f"Failed to fetch profile: {e}"}
@@ -0,0 +1,275 @@
+"""Shared pooled HTTP clients for outbound service calls.
+
+One sync and one async httpx client are kept per process so calls reuse
+keep-alive connections instead of paying a TCP+TLS handshake each time.
+Every call goes through an Endpoint, which carries its own connect/read
+timeouts, retry budget and circuit breaker.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+import httpx
+
+_MAX_CONNECTIONS   = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+_MAX_KEEPALIVE     = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+_KEEPALIVE_EXPIRY  = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+_MAX_RETRIES       = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+_BREAKER_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD", "5"))
+_BREAKER_RESET     = float(os.getenv("HTTP_BREAKER_RESET", "30"))
+
+_BACKOFF_BASE = 0.25   # seconds
+_BACKOFF_CAP  = 2.0
+
+_RETRYABLE_STATUS = {502, 503, 504}
+
+# Errors raised before the request reached the server — always safe to retry.
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+_limits = httpx.Limits(
+    max_connections=_MAX_CONNECTIONS,
+    max_keepalive_connections=_MAX_KEEPALIVE,
+    keepalive_expiry=_KEEPALIVE_EXPIRY,
+)
+_sync_client: httpx.Client | None = None
+_async_client: httpx.AsyncClient | None = None
+_client_lock = threading.Lock()
+
+_endpoints: dict[str, "Endpoint"] = {}
+
+
+class CircuitOpenError(Exception):
+    """Raised without touching the network while an endpoint's breaker is open."""
+
+
+# ---------------------------------------------------------------------------
+# Circuit breaker
+# ---------------------------------------------------------------------------
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed → open → half-open → closed.
+
+    After `threshold` consecutive failures the breaker opens and rejects calls
+    for `reset_after` seconds, then lets a single trial call through.
+    """
+
+    def __init__(self, threshold: int = _BREAKER_THRESHOLD, reset_after: float = _BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+# ---------------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------------
+
+class Endpoint:
+    """Call policy for one upstream endpoint, plus its metrics.
+
+    Non-idempotent endpoints (e.g. sending an OTP) are only retried when the
+    connection could not be established, so a request is never sent twice.
+    """
+
+    def __init__(self, name: str, connect_timeout: float, read_timeout: float,
+                 retries: int = _MAX_RETRIES, idempotent: bool = False):
+        self.name = name
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout, read=read_timeout,
+            write=read_timeout, pool=connect_timeout,
+        )
+        self.retries = retries
+        self.idempotent = idempotent
+        self.breaker = CircuitBreaker()
+        self._stats = {
+            "requests": 0,
+            "pool_hits": 0,
+            "new_connections": 0,
+            "retries": 0,
+            "failures": 0,
+            "short_circuited": 0,
+        }
+        self._stats_lock = threading.Lock()
+        _endpoints[name] = self
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def _should_retry(self, attempt: int, exc: Exception | None, status: int | None) -> bool:
+        if attempt >= self.retries:
+            return False
+        if isinstance(exc, _NOT_SENT_ERRORS):
+            return True
+        return self.idempotent and (exc is not None or status in _RETRYABLE_STATUS)
+
+    def metrics(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["breaker"] = self.breaker.state
+        return stats
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** attempt))
+
+
+def _record_outcome(endpoint: Endpoint, exc: Exception | None, status: int | None) -> None:
+    if exc is not None or (status is not None and status >= 500):
+        endpoint.breaker.record_failure()
+        endpoint._count("failures")
+    else:
+        endpoint.breaker.record_success()
+
+
+# ---------------------------------------------------------------------------
+# Clients
+# ---------------------------------------------------------------------------
+
+def _get_sync_client() -> httpx.Client:
+    global _sync_client
+    if _sync_client is None:
+        with _client_lock:
+            if _sync_client is None:
+                _sync_client = httpx.Client(limits=_limits)
+    return _sync_client
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(limits=_limits)
+    return _async_client
+
+
+def request(endpoint: Endpoint, method: str, url: str, **kwargs) -> httpx.Response:
+    """Send a request on the shared sync client under the endpoint's policy.
+
+    Raises CircuitOpenError if the breaker is open, or the last httpx error
+    once retries are exhausted. 5xx responses are returned, not raised.
+    """
+    client = _get_sync_client()
+    attempt = 0
+    while True:
+        if not endpoint.breaker.allow():
+            endpoint._count("short_circuited")
+            raise CircuitOpenError(f"{endpoint.name} is temporarily unavailable")
+
+        connected = []
+        def trace(event_name, info):
+            if event_name.endswith("connect_tcp.started"):
+                connected.append(True)
+
+        endpoint._count("requests")
+        exc, status, response = None, None, None
+        try:
+            response = client.request(
+                method, url, timeout=endpoint.timeout,
+                extensions={"trace": trace}, **kwargs,
+            )
+            status = response.status_code
+        except httpx.TransportError as e:
+            exc = e
+        endpoint._count("new_connections" if connected else "pool_hits")
+        _record_outcome(endpoint, exc, status)
+
+        if not endpoint._should_retry(attempt, exc, status):
+            if exc is not None:
+                raise exc
+            return response
+        endpoint._count("retries")
+        time.sleep(_backoff(attempt))
+        attempt += 1
+
+
+async def arequest(endpoint: Endpoint, method: str, url: str, **kwargs) -> httpx.Response:
+    """Async counterpart of request(), using the shared AsyncClient."""
+    client = _get_async_client()
+    attempt = 0
+    while True:
+        if not endpoint.breaker.allow():
+            endpoint._count("short_circuited")
+            raise CircuitOpenError(f"{endpoint.name} is temporarily unavailable")
+
+        connected = []
+        async def trace(event_name, info):
+            if event_name.endswith("connect_tcp.started"):
+                connected.append(True)
+
+        endpoint._count("requests")
+        exc, status, response = None, None, None
+        try:
+            response = await client.request(
+                method, url, timeout=endpoint.timeout,
+                extensions={"trace": trace}, **kwargs,
+            )
+            status = response.status_code
+        except httpx.TransportError as e:
+            exc = e
+        endpoint._count("new_connections" if connected else "pool_hits")
+        _record_outcome(endpoint, exc, status)
+
+        if not endpoint._should_retry(attempt, exc, status):
+            if exc is not None:
+                raise exc
+            return response
+        endpoint._count("retries")
+        await asyncio.sleep(_backoff(attempt))
+        attempt += 1
+
+
+async def aclose() -> None:
+    """Close both shared clients (call on application shutdown)."""
+    global _sync_client, _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
+
+
+def metrics() -> dict:
+    """Per-endpoint request, pool, retry and breaker counters."""
+    return {name: ep.metrics() for name, ep in _endpoints.items()}
@@ -0,0 +1,174 @@
+"""TTL + LRU cache for user profiles, with an optional shared Redis tier.
+
+Entries are fresh for PROFILE_CACHE_TTL seconds. After that they are still
+served for up to PROFILE_CACHE_STALE_TTL seconds while a background task
+refreshes them. Concurrent misses for the same key share one upstream fetch.
+Set PROFILE_CACHE_REDIS_URL (any Redis-compatible server) to share entries
+across workers; the `redis` package is only needed in that case.
+"""
+
+import asyncio
+import copy
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from dotenv import load_dotenv
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # optional — only needed for the shared tier
+    aioredis = None
+
+load_dotenv()
+
+_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "10000"))
+_TTL         = float(os.getenv("PROFILE_CACHE_TTL", "900"))
+_STALE_TTL   = float(os.getenv("PROFILE_CACHE_STALE_TTL", "86400"))
+_REDIS_URL   = os.getenv("PROFILE_CACHE_REDIS_URL", "")
+_REDIS_PREFIX = "jeevanta:profile:"
+
+Loader = Callable[[str], Awaitable[dict]]
+
+
+class ProfileCache:
+    """Async read-through cache. Only results with ok=True are stored."""
+
+    def __init__(self, max_entries: int = _MAX_ENTRIES, ttl: float = _TTL,
+                 stale_ttl: float = _STALE_TTL, redis_url: str = _REDIS_URL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._background: set[asyncio.Task] = set()
+        self._redis = None
+        if redis_url:
+            if aioredis is None:
+                print("[ProfileCache] PROFILE_CACHE_REDIS_URL set but `redis` is not installed — using in-process cache only.")
+            else:
+                self._redis = aioredis.from_url(redis_url)
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "refreshes": 0,
+            "evictions": 0,
+            "shared_errors": 0,
+        }
+
+    # -- public -------------------------------------------------------------
+
+    async def get(self, key: str, loader: Loader) -> dict:
+        """Return the cached value for key, calling loader(key) on a miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        elif self._redis is not None:
+            entry = await self._shared_get(key)
+            if entry is not None:
+                self._stats["shared_hits"] += 1
+                self._local_put(key, *entry)
+
+        if entry is not None:
+            fetched_at, value = entry
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                self._stats["hits"] += 1
+                return copy.deepcopy(value)
+            if age < self.stale_ttl:
+                self._stats["stale_hits"] += 1
+                self._refresh_in_background(key, loader)
+                return copy.deepcopy(value)
+
+        self._stats["misses"] += 1
+        return copy.deepcopy(await self._load(key, loader))
+
+    async def invalidate(self, key: str) -> None:
+        """Drop key from both tiers so the next read goes upstream."""
+        self._entries.pop(key, None)
+        if self._redis is not None:
+            try:
+                await self._redis.delete(_REDIS_PREFIX + key)
+            except Exception:
+                self._stats["shared_errors"] += 1
+
+    def stats(self) -> dict:
+        return {**self._stats, "size": len(self._entries), "max_entries": self.max_entries,
+                "shared": self._redis is not None}
+
+    # -- internals ------------------------------------------------------------
+
+    async def _load(self, key: str, loader: Loader) -> dict:
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the exception as retrieved so a failed fetch nobody else awaited stays quiet.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            value = await loader(key)
+            if value.get("ok"):
+                now = time.time()
+                self._local_put(key, now, value)
+                await self._shared_put(key, now, value)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _refresh_in_background(self, key: str, loader: Loader) -> None:
+        if key in self._inflight:
+            return
+        self._stats["refreshes"] += 1
+        task = asyncio.create_task(self._load(key, loader))
+        self._background.add(task)
+        task.add_done_callback(self._background_done)
+
+    def _background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[ProfileCache] Background refresh failed: {task.exception()}")
+
+    def _local_put(self, key: str, fetched_at: float, value: dict) -> None:
+        self._entries[key] = (fetched_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def _shared_get(self, key: str) -> tuple[float, dict] | None:
+        try:
+            raw = await self._redis.get(_REDIS_PREFIX + key)
+        except Exception:
+            self._stats["shared_errors"] += 1
+            return None
+        if raw is None:
+            return None
+        doc = json.loads(raw)
+        return doc["fetched_at"], doc["value"]
+
+    async def _shared_put(self, key: str, fetched_at: float, value: dict) -> None:
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(
+                _REDIS_PREFIX + key,
+                json.dumps({"fetched_at": fetched_at, "value": value}),
+                ex=int(self.stale_ttl),
+            )
+        except Exception:
+            self._stats["shared_errors"] += 1
@@ -1,2 +1,9 @@
-from . import agent
-from .agent import root_agent
+"""MedAssist package; `root_agent` is built on first access."""
+
+
+def __getattr__(name: str):
+    if name == "root_agent":
+        from .agent import build_med_assist_agent
+
+        return build_med_assist_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
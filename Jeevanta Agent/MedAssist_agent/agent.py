@@ -1,32 +1,39 @@
+import functools
 import os
+
 from dotenv import load_dotenv
 from google.adk.agents import Agent
 from google.adk.tools import VertexAiSearchTool
 
+from agent_context import compact_history, inject_profile_context
+from MedAssist_agent.playbook_index import search_playbook
+
 load_dotenv()
 
 DATASTORE_PATH = os.getenv("VERTEX_AI_DATASTORE_PATH")
 
-vertex_search = VertexAiSearchTool(data_store_id=DATASTORE_PATH)
+# "vertex" searches the Vertex AI data store; "local" uses the on-disk
+# Playbook.txt index (offline, no network round trip per lookup).
+MEDASSIST_SEARCH = os.getenv("MEDASSIST_SEARCH", "vertex" if DATASTORE_PATH else "local").lower()
+
 
-med_assist_agent = Agent(
-    name="MedAssist",
-    model="gemini-2.0-flash",
-    description=(
-        "MedAssist conducts a full medical intake conversation and generates a clinical "
-        "EMR summary with health risk flags. Once the report is complete it signals the "
-        "orchestrator to hand off to the Diet & Lifestyle specialist."
-    ),
-    instruction="""You are MedAssist, a warm and professional AI health assistant. Your job is to conduct a full medical intake conversation and generate a clinical health report.
+def _knowledge_tool():
+    if MEDASSIST_SEARCH == "local":
+        return search_playbook
+    return VertexAiSearchTool(data_store_id=DATASTORE_PATH)
+
+
+_INSTRUCTION = """You are MedAssist, a warm and professional AI health assistant. Your job is to conduct a full medical intake conversation and generate a clinical health report.
 
 CONTEXT AWARENESS — VERY IMPORTANT:
-Before asking any question, scan the full conversation history for user profile data.
-This data may appear as a tool result from get_user_profile (look for fullName, age,
-gender, height, weight, bloodGroup, email, phoneNumber fields in any prior message).
-Extract every field that has a real, non-empty value and treat it as already known.
-Do NOT ask the patient for any information already present in the conversation history.
+The patient's known profile fields are listed in the [PATIENT CONTEXT] line at the end
+of these instructions (only fields with a value are shown). Treat them as already known.
+Also check the conversation history for anything the patient has already told you.
+Do NOT ask the patient for any information already present in the context or history.
 Only ask for details that are genuinely missing.
 Greet the patient by their name if it is available in the history.
+Earlier turns may arrive as an "[Earlier conversation — compacted]" message with a
+summary and pinned context (profile, clinical report) — treat it as part of the history.
 
 FOLLOW THIS EXACT ORDER:
 
@@ -91,10 +98,30 @@ RULES:
 - Use the knowledge base to inform follow-up questions, flag drug interactions,
   and strengthen recommendations.
 - Do NOT generate a diet plan or lifestyle coaching — that is handled by DietLifestyleCoach.
-""",
-    tools=[vertex_search],
-    disallow_transfer_to_parent=True,
-    disallow_transfer_to_peers=True,
-)
-
-root_agent = med_assist_agent
+"""
+
+
+@functools.cache
+def build_med_assist_agent() -> Agent:
+    """MedAssist with the knowledge tool selected by MEDASSIST_SEARCH."""
+    return Agent(
+        name="MedAssist",
+        model="gemini-2.0-flash",
+        description=(
+            "MedAssist conducts a full medical intake conversation and generates a clinical "
+            "EMR summary with health risk flags. Once the report is complete it signals the "
+            "orchestrator to hand off to the Diet & Lifestyle specialist."
+        ),
+        instruction=_INSTRUCTION,
+        tools=[_knowledge_tool()],
+        before_model_callback=[inject_profile_context, compact_history],
+        disallow_transfer_to_parent=True,
+        disallow_transfer_to_peers=True,
+    )
+
+
+def __getattr__(name: str):
+    # `med_assist_agent` / `root_agent` are built on first access (old imports, the ADK loader).
+    if name in ("med_assist_agent", "root_agent"):
+        return build_med_assist_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
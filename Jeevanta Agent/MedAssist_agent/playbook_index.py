@@ -0,0 +1,337 @@
+"""Local retrieval index over Playbook.txt — an offline stand-in for Vertex AI Search.
+
+The playbook is split on its own structure: one chunk per "Pattern N —"
+block inside each SYMPTOM: section, plus the section intro and any PART
+without symptoms (e.g. the red-flag table). Each chunk carries its PART /
+SYMPTOM headings so a query like "thunderclap headache" lands on the right
+pattern.
+
+Chunks are ranked with BM25. With PLAYBOOK_EMBEDDINGS=true a second,
+dense index (hashed character-trigram vectors) is kept in a memory-mapped
+float32 file and fused with BM25 by reciprocal rank; it needs numpy.
+
+Per-chunk term counts and vectors are cached in PLAYBOOK_INDEX_DIR keyed by
+the chunk's content hash, so when the playbook changes only edited chunks
+are re-tokenised / re-embedded. The file is re-checked at most every
+PLAYBOOK_RELOAD_CHECK seconds on lookup.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+try:
+    import numpy as np
+except ImportError:  # optional — only needed for the embedding index
+    np = None
+
+load_dotenv()
+
+_ROOT = Path(__file__).resolve().parent.parent
+
+PLAYBOOK_PATH         = Path(os.getenv("PLAYBOOK_PATH", str(_ROOT / "Playbook.txt")))
+PLAYBOOK_INDEX_DIR    = Path(os.getenv("PLAYBOOK_INDEX_DIR", str(_ROOT / ".playbook_index")))
+PLAYBOOK_EMBEDDINGS   = os.getenv("PLAYBOOK_EMBEDDINGS", "false").lower() == "true"
+PLAYBOOK_RELOAD_CHECK = float(os.getenv("PLAYBOOK_RELOAD_CHECK", "5"))
+
+_BM25_K1   = 1.5
+_BM25_B    = 0.75
+_RRF_K     = 60
+_EMBED_DIM = 256
+_MANIFEST  = "manifest.json"
+_VECTORS   = "vectors.f32"
+_INDEX_VERSION = 1
+
+_TOKEN_RE   = re.compile(r"[a-z0-9]+")
+_RULE_RE    = re.compile(r"^[=─\-|\s]+$")
+_PART_RE    = re.compile(r"^PART \d+:\s*(.+)$")
+_SYMPTOM_RE = re.compile(r"^SYMPTOM:\s*(.+)$")
+_PATTERN_RE = re.compile(r"^Pattern \d+\s*[—-]\s*(.+)$")
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from has have i in is it its my of on or "
+    "the to with you your any if not no this that".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+@dataclass
+class Chunk:
+    key: str            # "PART / SYMPTOM / Pattern" path, stable across edits
+    title: str
+    text: str
+    hash: str = ""
+    terms: dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if not self.hash:
+            self.hash = hashlib.sha1(self.text.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Chunking
+# ---------------------------------------------------------------------------
+
+def chunk_playbook(text: str) -> list[Chunk]:
+    """Split the playbook on PART / SYMPTOM / Pattern boundaries."""
+    chunks: list[Chunk] = []
+    part = symptom = pattern = ""
+    body: list[str] = []
+
+    def flush():
+        content = "\n".join(body).strip()
+        body.clear()
+        if not content:
+            return
+        heading = " — ".join(h for h in (part, symptom, pattern) if h) or "Overview"
+        key = " / ".join(h for h in (part, symptom, pattern) if h) or "Overview"
+        if any(c.key == key for c in chunks):
+            key = f"{key} #{len(chunks)}"
+        chunks.append(Chunk(key=key, title=heading, text=f"{heading}\n{content}"))
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and _RULE_RE.match(stripped):
+            continue
+        if m := _PART_RE.match(stripped):
+            flush()
+            part, symptom, pattern = m.group(1).title(), "", ""
+        elif m := _SYMPTOM_RE.match(stripped):
+            flush()
+            symptom, pattern = m.group(1).title(), ""
+        elif m := _PATTERN_RE.match(stripped):
+            flush()
+            pattern = m.group(1)
+        elif stripped.startswith("END OF DOCUMENT"):
+            flush()
+            break
+        else:
+            body.append(line.rstrip())
+    flush()
+    return chunks
+
+
+# ---------------------------------------------------------------------------
+# Dense vectors (optional)
+# ---------------------------------------------------------------------------
+
+def _embed(text: str) -> list[float]:
+    """Hashed character-trigram vector, L2-normalised. Deterministic and offline."""
+    vec = [0.0] * _EMBED_DIM
+    for word in tokenize(text):
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            h = int.from_bytes(hashlib.blake2b(padded[i:i + 3].encode(), digest_size=4).digest(), "little")
+            vec[h % _EMBED_DIM] += 1.0 if h & 0x80000000 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class PlaybookIndex:
+    """BM25 (+ optional memory-mapped dense) index, rebuilt incrementally on change."""
+
+    def __init__(self, path: Path = PLAYBOOK_PATH, index_dir: Path = PLAYBOOK_INDEX_DIR,
+                 embeddings: bool = PLAYBOOK_EMBEDDINGS, reload_check: float = PLAYBOOK_RELOAD_CHECK):
+        self.path = Path(path)
+        self.index_dir = Path(index_dir)
+        self.reload_check = reload_check
+        self.embeddings = embeddings and np is not None
+        if embeddings and np is None:
+            print("[PlaybookIndex] PLAYBOOK_EMBEDDINGS=true but numpy is not installed — using BM25 only.")
+        self._lock = threading.Lock()
+        self._signature: tuple[float, int] | None = None
+        self._checked_at = 0.0
+        self.chunks: list[Chunk] = []
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._idf: dict[str, float] = {}
+        self._lengths: list[int] = []
+        self._avgdl = 0.0
+        self._vectors = None
+        self.last_build: dict = {}
+
+    # -- build ----------------------------------------------------------------
+
+    def _file_signature(self) -> tuple[float, int]:
+        st = self.path.stat()
+        return st.st_mtime, st.st_size
+
+    def _load_cache(self) -> tuple[dict[str, dict], dict[str, int], object]:
+        """Previous chunk terms by hash, vector rows by hash, and the old vector map."""
+        try:
+            manifest = json.loads((self.index_dir / _MANIFEST).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}, {}, None
+        if manifest.get("version") != _INDEX_VERSION:
+            return {}, {}, None
+        terms = {c["hash"]: c["terms"] for c in manifest["chunks"]}
+        rows, vectors = {}, None
+        if self.embeddings and manifest.get("dim") == _EMBED_DIM:
+            try:
+                vectors = np.memmap(self.index_dir / _VECTORS, dtype=np.float32, mode="r",
+                                    shape=(len(manifest["chunks"]), _EMBED_DIM))
+                rows = {c["hash"]: i for i, c in enumerate(manifest["chunks"])}
+            except (OSError, ValueError):
+                vectors = None
+        return terms, rows, vectors
+
+    def build(self) -> dict:
+        """(Re)index the playbook, reusing cached work for unchanged chunks."""
+        started = time.perf_counter()
+        signature = self._file_signature()
+        chunks = chunk_playbook(self.path.read_text(encoding="utf-8"))
+        cached_terms, cached_rows, old_vectors = self._load_cache()
+
+        reused = 0
+        for c in chunks:
+            if c.hash in cached_terms:
+                c.terms = cached_terms[c.hash]
+                reused += 1
+            else:
+                c.terms = dict(Counter(tokenize(c.text)))
+
+        postings: dict[str, list[tuple[int, int]]] = {}
+        lengths = []
+        for i, c in enumerate(chunks):
+            lengths.append(sum(c.terms.values()))
+            for term, tf in c.terms.items():
+                postings.setdefault(term, []).append((i, tf))
+        n = len(chunks)
+        idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in postings.items()}
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        vectors = None
+        embedded = 0
+        if self.embeddings and n:
+            tmp = self.index_dir / (_VECTORS + ".tmp")
+            out = np.memmap(tmp, dtype=np.float32, mode="w+", shape=(n, _EMBED_DIM))
+            for i, c in enumerate(chunks):
+                row = cached_rows.get(c.hash)
+                if row is not None and old_vectors is not None:
+                    out[i] = old_vectors[row]
+                else:
+                    out[i] = _embed(c.text)
+                    embedded += 1
+            out.flush()
+            del out, old_vectors
+            os.replace(tmp, self.index_dir / _VECTORS)
+            vectors = np.memmap(self.index_dir / _VECTORS, dtype=np.float32, mode="r", shape=(n, _EMBED_DIM))
+
+        manifest = {
+            "version": _INDEX_VERSION,
+            "source": str(self.path),
+            "dim": _EMBED_DIM if self.embeddings else 0,
+            "chunks": [{"key": c.key, "hash": c.hash, "terms": c.terms} for c in chunks],
+        }
+        tmp = self.index_dir / (_MANIFEST + ".tmp")
+        tmp.write_text(json.dumps(manifest), encoding="utf-8")
+        os.replace(tmp, self.index_dir / _MANIFEST)
+
+        self.chunks, self._postings, self._idf = chunks, postings, idf
+        self._lengths, self._avgdl = lengths, (sum(lengths) / n if n else 0.0)
+        self._vectors = vectors
+        self._signature = signature
+        self._checked_at = time.monotonic()
+        self.last_build = {
+            "chunks": n,
+            "reused": reused,
+            "embedded": embedded,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        print(f"[PlaybookIndex] Indexed {n} chunks ({reused} reused) in {self.last_build['duration_ms']} ms")
+        return self.last_build
+
+    def _ensure_current(self) -> None:
+        now = time.monotonic()
+        if self._signature is not None and now - self._checked_at < self.reload_check:
+            return
+        with self._lock:
+            if self._signature is not None and now - self._checked_at < self.reload_check:
+                return
+            self._checked_at = now
+            if self._signature is None or self._file_signature() != self._signature:
+                self.build()
+
+    # -- query ----------------------------------------------------------------
+
+    def _bm25(self, query: str) -> list[tuple[int, float]]:
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self._postings[term]:
+                norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * self._lengths[i] / self._avgdl)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (_BM25_K1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+
+    def _dense(self, query: str, limit: int) -> list[tuple[int, float]]:
+        sims = self._vectors @ np.asarray(_embed(query), dtype=np.float32)
+        top = np.argsort(-sims)[:limit]
+        return [(int(i), float(sims[i])) for i in top]
+
+    def search(self, query: str, top_k: int = 3) -> list[dict]:
+        self._ensure_current()
+        ranked = self._bm25(query)
+        if self._vectors is not None:
+            fused: dict[int, float] = {}
+            for ranking in (ranked, self._dense(query, max(top_k * 4, 10))):
+                for rank, (i, _) in enumerate(ranking):
+                    fused[i] = fused.get(i, 0.0) + 1.0 / (_RRF_K + rank + 1)
+            ranked = sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
+        return [
+            {"section": self.chunks[i].title, "score": round(score, 4), "text": self.chunks[i].text}
+            for i, score in ranked[:top_k]
+        ]
+
+
+_index: PlaybookIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> PlaybookIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = PlaybookIndex()
+    return _index
+
+
+# ---------------------------------------------------------------------------
+# ADK tool
+# ---------------------------------------------------------------------------
+
+def search_playbook(query: str, top_k: int = 3) -> dict:
+    """Search the clinical symptom playbook (knowledge base).
+
+    Use this to look up symptom patterns, likely conditions, follow-up
+    questions, red flags and referral recommendations for what the patient
+    has described.
+
+    Args:
+        query: Symptoms or keywords, e.g. "one-sided throbbing headache with nausea".
+        top_k: Number of sections to return (default 3).
+
+    Returns:
+        dict with keys: ok (bool), results (list of {section, score, text}).
+    """
+    try:
+        results = get_index().search(query, max(1, min(int(top_k), 10)))
+    except OSError as e:
+        return {"ok": False, "results": [], "message": f"Knowledge base unavailable: {e}"}
+    return {"ok": True, "results": results}
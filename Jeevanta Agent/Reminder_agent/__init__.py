@@ -1,2 +1,16 @@
-from . import agent
-from .agent import root_agent
+"""ReminderAgent package.
+
+Importing it (or any of its modules) has no side effects. `root_agent` is
+built on first access, which also starts the scheduler because the ADK CLI
+has no application lifespan.
+"""
+
+
+def __getattr__(name: str):
+    if name == "root_agent":
+        from .agent import build_reminder_agent
+        from .reminder_scheduler import start_scheduler
+
+        start_scheduler()
+        return build_reminder_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,48 +1,48 @@
+import functools
+
 from google.adk.agents import Agent
 
-from Reminder_agent.reminder_scheduler import start_scheduler
+from agent_context import compact_history, inject_profile_context
+
 from Reminder_agent.tools import (
     cancel_reminder,
     get_patient_reminders,
     list_reminders,
     schedule_reminder,
+    schedule_reminders_bulk,
 )
 
-start_scheduler()
 
-reminder_agent = Agent(
-    name="ReminderAgent",
-    model="gemini-2.0-flash",
-    description=(
-        "Handles all medication reminder operations for Jeevanta patients. "
-        "Schedules daily email reminders, cancels existing ones, and lists "
-        "active reminders using a built-in Python scheduler and MongoDB."
-    ),
-    instruction="""You are the Jeevanta Reminder Assistant. You manage daily medication reminders sent by email.
+_INSTRUCTION = """You are the Jeevanta Reminder Assistant. You manage recurring medication reminders sent by email.
 
 CRITICAL RULE: You MUST call a tool for every action. Never confirm success without first
 receiving an ok=true result from the tool. Never output a success message based on the
 instruction alone — always invoke the tool first, then respond based on its result.
 
 ────────────────────────────────────────
-CONTEXT: before asking anything, check conversation history for:
-- email      → from get_user_profile tool result OR anything the user typed OR prior tool calls
-- name       → from get_user_profile tool result or MedAssist intake
+CONTEXT: before asking anything, check:
+- email      → the [PATIENT CONTEXT] line below, OR anything the user typed, OR prior tool calls
+- name       → the [PATIENT CONTEXT] line below, or MedAssist intake
 - medications → from MedAssist report or earlier in conversation
-Do NOT ask for details already present in the history.
+Do NOT ask for details already present in the context or history.
+If [PATIENT CONTEXT] has an Email, use it directly — never ask for the email.
 ────────────────────────────────────────
 
 SCHEDULING:
 1. Gather (from context or ask one at a time): name, email, medication name, reminder time.
+   One reminder covers every dose of a medication: pass the dosing as the patient said it
+   ("8am and 8pm", "twice a day", "every 6 hours", "9 PM on weekdays") — do not split it into calls.
 2. Timezone defaults to Asia/Kolkata.
 3. CALL schedule_reminder(patient_name, email, medication_name, reminder_time, timezone).
-4. Only after ok=true from the tool → confirm: "Done! Daily reminder set for [medication] at [time]."
+   For two or more medications (e.g. the MedAssist report's current medications), gather every
+   time first, then make ONE schedule_reminders_bulk(patient_name, email, medications, timezone) call.
+4. Only after ok=true from the tool → confirm: "Done! Reminder set for [medication] at [schedule]."
 5. If ok=false → report the error clearly.
 
 VIEWING:
 1. Get email from context (never ask if already known).
 2. CALL get_patient_reminders(email).
-3. Present results: medication · time · timezone. If empty, offer to set one up.
+3. Present results: medication · schedule · timezone. If empty, offer to set one up.
 
 CANCELLING:
 1. CALL cancel_reminder(email, medication_name).
@@ -54,10 +54,31 @@ RULES:
 - If an error occurs, tell the patient clearly.
 - Keep responses short and friendly.
 - Do not transfer to other agents.
-""",
-    tools=[schedule_reminder, cancel_reminder, list_reminders, get_patient_reminders],
-    disallow_transfer_to_parent=True,
-    disallow_transfer_to_peers=True,
-)
+"""
+
+
+@functools.cache
+def build_reminder_agent() -> Agent:
+    """ReminderAgent. Does not start the scheduler — the application does."""
+    return Agent(
+        name="ReminderAgent",
+        model="gemini-2.0-flash",
+        description=(
+            "Handles all medication reminder operations for Jeevanta patients. "
+            "Schedules recurring (multi-dose) email reminders, cancels existing ones, and lists "
+            "active reminders using a built-in Python scheduler and MongoDB."
+        ),
+        instruction=_INSTRUCTION,
+        tools=[schedule_reminder, schedule_reminders_bulk, cancel_reminder, list_reminders,
+               get_patient_reminders],
+        before_model_callback=[inject_profile_context, compact_history],
+        disallow_transfer_to_parent=True,
+        disallow_transfer_to_peers=True,
+    )
+
 
-root_agent = reminder_agent
+def __getattr__(name: str):
+    # `reminder_agent` / `root_agent` are built on first access (old imports, the ADK loader).
+    if name in ("reminder_agent", "root_agent"):
+        return build_reminder_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
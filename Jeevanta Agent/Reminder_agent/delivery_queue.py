@@ -0,0 +1,465 @@
+"""Durable outbound queue for reminder emails.
+
+Scheduler jobs never talk to SMTP. They enqueue a delivery task keyed by
+(job, fire time), so a re-fired or duplicated trigger cannot send the same
+reminder twice. A small worker pool drains the queue:
+
+  - each worker claims a batch of due tasks under a lease (REMINDER_QUEUE_LEASE);
+    tasks whose worker died are re-claimed once the lease expires,
+  - a failed send is retried with exponential backoff and jitter,
+  - permanent failures, or tasks out of attempts, move to a dead-letter store.
+
+REMINDER_QUEUE_BACKEND selects the store:
+  sqlite  — local file at REMINDER_QUEUE_SQLITE_PATH (default, single node)
+  mongodb — MONGODB_URI / MONGODB_DB_NAME (shared by every worker and node)
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable
+
+from dotenv import load_dotenv
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from mongo_client import get_database
+
+load_dotenv()
+
+REMINDER_QUEUE_BACKEND      = os.getenv("REMINDER_QUEUE_BACKEND", "sqlite").lower()
+REMINDER_QUEUE_SQLITE_PATH  = os.getenv("REMINDER_QUEUE_SQLITE_PATH", "reminder_queue.db")
+REMINDER_QUEUE_WORKERS      = int(os.getenv("REMINDER_QUEUE_WORKERS", "3"))
+REMINDER_QUEUE_BATCH        = int(os.getenv("REMINDER_QUEUE_BATCH", "50"))
+REMINDER_QUEUE_MAX_ATTEMPTS = int(os.getenv("REMINDER_QUEUE_MAX_ATTEMPTS", "6"))
+REMINDER_QUEUE_BACKOFF      = float(os.getenv("REMINDER_QUEUE_BACKOFF", "30"))
+REMINDER_QUEUE_MAX_BACKOFF  = float(os.getenv("REMINDER_QUEUE_MAX_BACKOFF", "3600"))
+REMINDER_QUEUE_LEASE        = float(os.getenv("REMINDER_QUEUE_LEASE", "300"))
+REMINDER_QUEUE_RETENTION    = float(os.getenv("REMINDER_QUEUE_RETENTION", "172800"))
+
+_POLL_INTERVAL  = 1.0     # seconds an idle worker waits before polling again
+_PURGE_INTERVAL = 600.0
+
+
+def task_key(job_id: str, fire_time: float) -> str:
+    """Idempotency key: one task per job per scheduled minute."""
+    minute = time.strftime("%Y-%m-%dT%H:%MZ", time.gmtime(fire_time))
+    return f"{job_id}@{minute}"
+
+
+def backoff_delay(attempts: int, base: float = REMINDER_QUEUE_BACKOFF,
+                  cap: float = REMINDER_QUEUE_MAX_BACKOFF) -> float:
+    """Exponential backoff with equal jitter: half fixed, half random."""
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+# ---------------------------------------------------------------------------
+# Stores (blocking; called from worker threads)
+# ---------------------------------------------------------------------------
+
+class SqliteDeliveryQueue:
+    """Single-file queue for one node. Safe to share across threads."""
+
+    def __init__(self, path: str = REMINDER_QUEUE_SQLITE_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS delivery_tasks (
+                    id              TEXT PRIMARY KEY,
+                    job_id          TEXT NOT NULL,
+                    payload         TEXT NOT NULL,
+                    fire_time       REAL NOT NULL,
+                    status          TEXT NOT NULL,
+                    attempts        INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    lease_until     REAL,
+                    last_error      TEXT,
+                    completed_at    REAL
+                );
+                CREATE INDEX IF NOT EXISTS delivery_tasks_due
+                    ON delivery_tasks (status, next_attempt_at);
+                CREATE TABLE IF NOT EXISTS delivery_dead_letters (
+                    id         TEXT PRIMARY KEY,
+                    job_id     TEXT NOT NULL,
+                    payload    TEXT NOT NULL,
+                    fire_time  REAL NOT NULL,
+                    attempts   INTEGER NOT NULL,
+                    last_error TEXT,
+                    failed_at  REAL NOT NULL
+                );
+            """)
+
+    @staticmethod
+    def _task(row) -> dict:
+        return {"id": row[0], "job_id": row[1], "payload": json.loads(row[2]),
+                "fire_time": row[3], "attempts": row[4]}
+
+    def enqueue(self, job_id: str, payload: dict, fire_time: float) -> bool:
+        """Add a task; False if this (job, fire time) was already enqueued."""
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO delivery_tasks "
+                "(id, job_id, payload, fire_time, status, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, 'pending', ?)",
+                (task_key(job_id, fire_time), job_id, json.dumps(payload), fire_time, fire_time),
+            )
+            return cur.rowcount == 1
+
+    def enqueue_many(self, tasks: list[tuple[str, dict]], fire_time: float) -> int:
+        """Add (job_id, payload) tasks for one fire time; returns how many were new."""
+        if not tasks:
+            return 0
+        rows = [(task_key(job_id, fire_time), job_id, json.dumps(payload), fire_time, fire_time)
+                for job_id, payload in tasks]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self._conn.executemany(
+                    "INSERT OR IGNORE INTO delivery_tasks "
+                    "(id, job_id, payload, fire_time, status, next_attempt_at) "
+                    "VALUES (?, ?, ?, ?, 'pending', ?)", rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return cur.rowcount
+
+    def claim(self, limit: int, lease: float, now: float) -> list[dict]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, job_id, payload, fire_time, attempts FROM delivery_tasks "
+                    "WHERE (status = 'pending' AND next_attempt_at <= ?) "
+                    "   OR (status = 'inflight' AND lease_until < ?) "
+                    "ORDER BY next_attempt_at LIMIT ?", (now, now, limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE delivery_tasks SET status = 'inflight', lease_until = ? WHERE id = ?",
+                    [(now + lease, r[0]) for r in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [self._task(r) for r in rows]
+
+    def complete(self, task_id: str, now: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE delivery_tasks SET status = 'done', completed_at = ?, lease_until = NULL "
+                "WHERE id = ?", (now, task_id))
+
+    def retry(self, task_id: str, error: str, next_attempt_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE delivery_tasks SET status = 'pending', attempts = attempts + 1, "
+                "next_attempt_at = ?, last_error = ?, lease_until = NULL WHERE id = ?",
+                (next_attempt_at, error, task_id))
+
+    def dead_letter(self, task: dict, error: str, now: float) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE delivery_tasks SET status = 'dead', attempts = attempts + 1, "
+                    "last_error = ?, completed_at = ?, lease_until = NULL WHERE id = ?",
+                    (error, now, task["id"]))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO delivery_dead_letters "
+                    "(id, job_id, payload, fire_time, attempts, last_error, failed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (task["id"], task["job_id"], json.dumps(task["payload"]), task["fire_time"],
+                     task["attempts"] + 1, error, now))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def purge(self, before: float) -> int:
+        """Drop finished tasks older than `before` (dead letters are kept)."""
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM delivery_tasks WHERE status IN ('done', 'dead') AND completed_at < ?",
+                (before,))
+            return cur.rowcount
+
+    def dead_letters(self, limit: int = 100) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, job_id, payload, fire_time, attempts, last_error, failed_at "
+                "FROM delivery_dead_letters ORDER BY failed_at DESC LIMIT ?", (limit,),
+            ).fetchall()
+        return [{"id": r[0], "job_id": r[1], "payload": json.loads(r[2]), "fire_time": r[3],
+                 "attempts": r[4], "last_error": r[5], "failed_at": r[6]} for r in rows]
+
+    def stats(self, now: float) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM delivery_tasks GROUP BY status").fetchall())
+            oldest = self._conn.execute(
+                "SELECT MIN(fire_time) FROM delivery_tasks WHERE status = 'pending' "
+                "AND next_attempt_at <= ?", (now,)).fetchone()[0]
+            dead = self._conn.execute("SELECT COUNT(*) FROM delivery_dead_letters").fetchone()[0]
+        return {
+            "depth": counts.get("pending", 0),
+            "inflight": counts.get("inflight", 0),
+            "done": counts.get("done", 0),
+            "dead_letters": dead,
+            "oldest_due_lag_s": round(now - oldest, 3) if oldest is not None else 0.0,
+        }
+
+
+class MongoDeliveryQueue:
+    """Shared queue for multi-worker / multi-node deployments."""
+
+    def __init__(self):
+        db = get_database()
+        self._tasks = db["reminder_delivery_tasks"]
+        self._dead = db["reminder_delivery_dead_letters"]
+        self._tasks.create_index([("status", ASCENDING), ("next_attempt_at", ASCENDING)])
+        self._tasks.create_index([("status", ASCENDING), ("lease_until", ASCENDING)])
+        self._dead.create_index([("failed_at", ASCENDING)])
+
+    @staticmethod
+    def _task(doc: dict) -> dict:
+        return {"id": doc["_id"], "job_id": doc["job_id"], "payload": doc["payload"],
+                "fire_time": doc["fire_time"], "attempts": doc["attempts"]}
+
+    def enqueue(self, job_id: str, payload: dict, fire_time: float) -> bool:
+        try:
+            self._tasks.insert_one({
+                "_id": task_key(job_id, fire_time),
+                "job_id": job_id,
+                "payload": payload,
+                "fire_time": fire_time,
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": fire_time,
+            })
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def enqueue_many(self, tasks: list[tuple[str, dict]], fire_time: float) -> int:
+        if not tasks:
+            return 0
+        docs = [{
+            "_id": task_key(job_id, fire_time),
+            "job_id": job_id,
+            "payload": payload,
+            "fire_time": fire_time,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": fire_time,
+        } for job_id, payload in tasks]
+        try:
+            return len(self._tasks.insert_many(docs, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            # Duplicates are tasks another tick / node already enqueued.
+            return e.details.get("nInserted", 0)
+
+    @staticmethod
+    def _claimable(now: float) -> dict:
+        return {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "inflight", "lease_until": {"$lt": now}},
+        ]}
+
+    def claim(self, limit: int, lease: float, now: float) -> list[dict]:
+        # Pick candidates, then claim them with a token; the filter is re-checked
+        # in the update so a task another worker grabbed in between is skipped.
+        ids = [d["_id"] for d in self._tasks.find(self._claimable(now), {"_id": 1})
+               .sort("next_attempt_at", ASCENDING).limit(limit)]
+        if not ids:
+            return []
+        token = uuid.uuid4().hex
+        self._tasks.update_many(
+            {"_id": {"$in": ids}, **self._claimable(now)},
+            {"$set": {"status": "inflight", "lease_until": now + lease, "claim": token}},
+        )
+        return [self._task(d) for d in self._tasks.find({"claim": token, "status": "inflight"})]
+
+    def complete(self, task_id: str, now: float) -> None:
+        self._tasks.update_one({"_id": task_id}, {
+            "$set": {"status": "done", "completed_at": now},
+            "$unset": {"lease_until": "", "claim": ""},
+        })
+
+    def retry(self, task_id: str, error: str, next_attempt_at: float) -> None:
+        self._tasks.update_one({"_id": task_id}, {
+            "$set": {"status": "pending", "next_attempt_at": next_attempt_at, "last_error": error},
+            "$inc": {"attempts": 1},
+            "$unset": {"lease_until": "", "claim": ""},
+        })
+
+    def dead_letter(self, task: dict, error: str, now: float) -> None:
+        self._dead.replace_one({"_id": task["id"]}, {
+            "_id": task["id"],
+            "job_id": task["job_id"],
+            "payload": task["payload"],
+            "fire_time": task["fire_time"],
+            "attempts": task["attempts"] + 1,
+            "last_error": error,
+            "failed_at": now,
+        }, upsert=True)
+        self._tasks.update_one({"_id": task["id"]}, {
+            "$set": {"status": "dead", "last_error": error, "completed_at": now},
+            "$inc": {"attempts": 1},
+            "$unset": {"lease_until": "", "claim": ""},
+        })
+
+    def purge(self, before: float) -> int:
+        return self._tasks.delete_many(
+            {"status": {"$in": ["done", "dead"]}, "completed_at": {"$lt": before}}).deleted_count
+
+    def dead_letters(self, limit: int = 100) -> list[dict]:
+        docs = self._dead.find().sort("failed_at", -1).limit(limit)
+        return [{"id": d.pop("_id"), **d} for d in docs]
+
+    def stats(self, now: float) -> dict:
+        counts = {d["_id"]: d["n"] for d in self._tasks.aggregate(
+            [{"$group": {"_id": "$status", "n": {"$sum": 1}}}])}
+        oldest = self._tasks.find_one(
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"fire_time": 1}, sort=[("fire_time", ASCENDING)])
+        return {
+            "depth": counts.get("pending", 0),
+            "inflight": counts.get("inflight", 0),
+            "done": counts.get("done", 0),
+            "dead_letters": self._dead.estimated_document_count(),
+            "oldest_due_lag_s": round(now - oldest["fire_time"], 3) if oldest else 0.0,
+        }
+
+
+def build_delivery_queue():
+    """Pick the queue store from REMINDER_QUEUE_BACKEND."""
+    if REMINDER_QUEUE_BACKEND == "mongodb":
+        return MongoDeliveryQueue()
+    if REMINDER_QUEUE_BACKEND != "sqlite":
+        print(f"[DeliveryQueue] Unknown REMINDER_QUEUE_BACKEND '{REMINDER_QUEUE_BACKEND}' — using sqlite.")
+    return SqliteDeliveryQueue()
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+
+class DeliveryWorkers:
+    """Bounded pool of threads that drain the queue.
+
+    `deliver(payload)` sends one task and raises on failure;
+    `is_permanent(exc)` decides whether a failure is worth retrying.
+    """
+
+    def __init__(self, queue, deliver: Callable[[dict], None],
+                 is_permanent: Callable[[Exception], bool] = lambda e: False,
+                 workers: int = REMINDER_QUEUE_WORKERS, batch: int = REMINDER_QUEUE_BATCH,
+                 max_attempts: int = REMINDER_QUEUE_MAX_ATTEMPTS, lease: float = REMINDER_QUEUE_LEASE,
+                 retention: float = REMINDER_QUEUE_RETENTION):
+        self.queue = queue
+        self.deliver = deliver
+        self.is_permanent = is_permanent
+        self.workers = workers
+        self.batch = batch
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.retention = retention
+        self._threads: list[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._stats = {"delivered": 0, "retried": 0, "dead_lettered": 0,
+                       "lag_total_s": 0.0, "last_lag_s": 0.0, "max_lag_s": 0.0}
+        self._stats_lock = threading.Lock()
+        self._purged_at = 0.0
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, args=(i,), name=f"reminder-delivery-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def notify(self) -> None:
+        """Wake idle workers (called right after enqueueing)."""
+        self._wake.set()
+
+    def _record_delivery(self, fire_time: float, now: float) -> None:
+        lag = max(0.0, now - fire_time)
+        with self._stats_lock:
+            self._stats["delivered"] += 1
+            self._stats["lag_total_s"] += lag
+            self._stats["last_lag_s"] = lag
+            self._stats["max_lag_s"] = max(self._stats["max_lag_s"], lag)
+
+    def _handle(self, task: dict) -> None:
+        try:
+            self.deliver(task["payload"])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            now = time.time()
+            if self.is_permanent(e) or task["attempts"] + 1 >= self.max_attempts:
+                self.queue.dead_letter(task, error, now)
+                with self._stats_lock:
+                    self._stats["dead_lettered"] += 1
+                print(f"[DeliveryQueue] Dead-lettered {task['id']}: {error}")
+            else:
+                self.queue.retry(task["id"], error, now + backoff_delay(task["attempts"] + 1))
+                with self._stats_lock:
+                    self._stats["retried"] += 1
+            return
+        now = time.time()
+        self.queue.complete(task["id"], now)
+        self._record_delivery(task["fire_time"], now)
+
+    def _maybe_purge(self) -> None:
+        now = time.time()
+        if now - self._purged_at < _PURGE_INTERVAL:
+            return
+        self._purged_at = now
+        removed = self.queue.purge(now - self.retention)
+        if removed:
+            print(f"[DeliveryQueue] Purged {removed} finished task(s)")
+
+    def _run(self, index: int) -> None:
+        while not self._stop.is_set():
+            try:
+                tasks = self.queue.claim(self.batch, self.lease, time.time())
+                for task in tasks:
+                    self._handle(task)
+                if index == 0:
+                    self._maybe_purge()
+            except Exception as e:
+                print(f"[DeliveryQueue] Worker error: {e}")
+                tasks = []
+            if not tasks:
+                self._wake.wait(_POLL_INTERVAL)
+                self._wake.clear()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lag_total = stats.pop("lag_total_s")
+        stats["avg_lag_s"] = round(lag_total / stats["delivered"], 3) if stats["delivered"] else 0.0
+        stats["last_lag_s"] = round(stats["last_lag_s"], 3)
+        stats["max_lag_s"] = round(stats["max_lag_s"], 3)
+        stats["workers"] = len(self._threads)
+        return {**self.queue.stats(time.time()), **stats}
@@ -0,0 +1,330 @@
+"""Pooled SMTP delivery for reminder emails.
+
+Opening a connection, upgrading it with STARTTLS and logging in costs far
+more than sending one message, and Gmail rate-limits new logins. Instead a
+small pool of long-lived authenticated connections is reused:
+
+  - SmtpPool       — thread-safe sync pool; send() and send_batch().
+  - AsyncSmtpPool  — asyncio counterpart (needs `aiosmtplib`).
+
+Both accept an email.message.Message or a PreparedMessage (already
+serialised bytes, see email_templates) and send the latter as-is.
+
+Dead connections (server timeout, 421, reset) are replaced transparently and
+the message is retried once on a fresh connection. Connections are recycled
+after SMTP_MAX_MESSAGES_PER_CONN messages or SMTP_IDLE_TIMEOUT seconds idle.
+"""
+
+import asyncio
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.message import Message
+
+try:
+    import aiosmtplib
+except ImportError:  # optional — only needed for AsyncSmtpPool
+    aiosmtplib = None
+
+# Errors after which the connection is unusable but the message can be retried.
+_RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError, OSError)
+
+
+def _is_transient(exc: Exception) -> bool:
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code == 421          # service closing transmission channel
+    return isinstance(exc, _RECONNECT_ERRORS) and not isinstance(exc, smtplib.SMTPRecipientsRefused)
+
+
+def is_permanent_failure(exc: Exception) -> bool:
+    """True for rejections that will fail the same way on retry (bad address, 5xx, unsendable header)."""
+    if isinstance(exc, (smtplib.SMTPRecipientsRefused, ValueError)):
+        return True
+    if isinstance(exc, smtplib.SMTPAuthenticationError):
+        return False                         # fixable config — keep retrying
+    return isinstance(exc, smtplib.SMTPResponseException) and 500 <= exc.smtp_code < 600
+
+
+class PreparedMessage:
+    """A message already serialised to wire format (CRLF line endings)."""
+    __slots__ = ("from_addr", "to", "data")
+
+    def __init__(self, from_addr: str, to: str, data: bytes):
+        self.from_addr = from_addr
+        self.to = to
+        self.data = data
+
+    def __getitem__(self, header: str) -> str | None:
+        # send_batch() reports failures by msg["To"], as for a Message.
+        return self.to if header.lower() == "to" else None
+
+
+class _Conn:
+    __slots__ = ("client", "sent", "last_used")
+
+    def __init__(self, client):
+        self.client = client
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+def _split(items: list, parts: int) -> list[list]:
+    parts = max(1, min(parts, len(items)))
+    return [items[i::parts] for i in range(parts)]
+
+
+# ---------------------------------------------------------------------------
+# Sync pool
+# ---------------------------------------------------------------------------
+
+class SmtpPool:
+    """Up to `size` persistent SMTP connections shared across threads."""
+
+    def __init__(self, host: str, port: int, user: str, password: str, size: int = 3,
+                 starttls: bool = True, timeout: float = 30,
+                 max_messages: int = 100, idle_timeout: float = 240):
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.size = size
+        self.starttls = starttls
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self._idle: list[_Conn] = []
+        self._idle_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="smtp")
+        self._stats = {"sent": 0, "failed": 0, "connects": 0, "reconnects": 0, "batches": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def _open(self) -> _Conn:
+        client = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            client.ehlo()
+            if self.starttls:
+                client.starttls()
+                client.ehlo()
+            if self.user and self.password:
+                client.login(self.user, self.password)
+        except Exception:
+            client.close()
+            raise
+        self._count("connects")
+        return _Conn(client)
+
+    @staticmethod
+    def _discard(conn: _Conn) -> None:
+        try:
+            conn.client.quit()
+        except Exception:
+            conn.client.close()
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a connection; it goes back to the pool only if the caller didn't fail."""
+        self._slots.acquire()
+        conn = None
+        try:
+            with self._idle_lock:
+                while self._idle:
+                    candidate = self._idle.pop()
+                    if time.monotonic() - candidate.last_used < self.idle_timeout:
+                        conn = candidate
+                        break
+                    self._discard(candidate)
+            if conn is None:
+                conn = self._open()
+            yield conn
+        except BaseException:
+            if conn is not None:
+                self._discard(conn)
+            raise
+        else:
+            conn.last_used = time.monotonic()
+            if conn.sent >= self.max_messages:
+                self._discard(conn)
+            else:
+                with self._idle_lock:
+                    self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    def _deliver(self, conn: _Conn, msg: Message | PreparedMessage) -> None:
+        if isinstance(msg, PreparedMessage):
+            conn.client.sendmail(self.user or msg.from_addr, [msg.to], msg.data)
+        else:
+            conn.client.send_message(msg, from_addr=self.user or None)
+        conn.sent += 1
+
+    def send(self, msg: Message | PreparedMessage) -> None:
+        """Send one message, retrying once on a fresh connection if the old one died."""
+        for attempt in (0, 1):
+            try:
+                with self._connection() as conn:
+                    self._deliver(conn, msg)
+                self._count("sent")
+                return
+            except Exception as e:
+                if attempt == 0 and _is_transient(e):
+                    # Idle connections usually die together (server restart,
+                    # idle timeout) — drop them so the retry gets a fresh one.
+                    self._drop_idle()
+                    self._count("reconnects")
+                    continue
+                self._count("failed")
+                raise
+
+    def _send_share(self, messages: list[Message]) -> list[tuple[Message, Exception]]:
+        failures = []
+        for msg in messages:
+            try:
+                self.send(msg)
+            except Exception as e:
+                failures.append((msg, e))
+        return failures
+
+    def send_batch(self, messages: list[Message]) -> dict:
+        """Send many messages over up to `size` connections in parallel.
+
+        Returns {"sent": int, "failed": [(recipient, error), ...]}.
+        """
+        if not messages:
+            return {"sent": 0, "failed": []}
+        self._count("batches")
+        futures = [self._executor.submit(self._send_share, share) for share in _split(messages, self.size)]
+        failed = [(msg["To"], str(e)) for f in futures for msg, e in f.result()]
+        return {"sent": len(messages) - len(failed), "failed": failed}
+
+    def _drop_idle(self) -> None:
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+    def close(self) -> None:
+        self._drop_idle()
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["idle_connections"] = len(self._idle)
+        return stats
+
+
+# ---------------------------------------------------------------------------
+# Async pool
+# ---------------------------------------------------------------------------
+
+class AsyncSmtpPool:
+    """asyncio variant of SmtpPool built on aiosmtplib."""
+
+    def __init__(self, host: str, port: int, user: str, password: str, size: int = 3,
+                 starttls: bool = True, timeout: float = 30,
+                 max_messages: int = 100, idle_timeout: float = 240):
+        if aiosmtplib is None:
+            raise RuntimeError("AsyncSmtpPool needs `pip install aiosmtplib`.")
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.size = size
+        self.starttls = starttls
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self._idle: list[_Conn] = []
+        self._slots = asyncio.Semaphore(size)
+        self._stats = {"sent": 0, "failed": 0, "connects": 0, "reconnects": 0, "batches": 0}
+
+    async def _open(self) -> _Conn:
+        client = aiosmtplib.SMTP(hostname=self.host, port=self.port, timeout=self.timeout,
+                                 start_tls=self.starttls)
+        await client.connect()
+        try:
+            if self.user and self.password:
+                await client.login(self.user, self.password)
+        except Exception:
+            client.close()
+            raise
+        self._stats["connects"] += 1
+        return _Conn(client)
+
+    @staticmethod
+    async def _discard(conn: _Conn) -> None:
+        try:
+            await conn.client.quit()
+        except Exception:
+            conn.client.close()
+
+    async def _send_once(self, msg: Message | PreparedMessage) -> None:
+        async with self._slots:
+            conn = None
+            while self._idle and conn is None:
+                candidate = self._idle.pop()
+                if time.monotonic() - candidate.last_used < self.idle_timeout and candidate.client.is_connected:
+                    conn = candidate
+                else:
+                    await self._discard(candidate)
+            if conn is None:
+                conn = await self._open()
+            try:
+                if isinstance(msg, PreparedMessage):
+                    await conn.client.sendmail(self.user or msg.from_addr, [msg.to], msg.data)
+                else:
+                    await conn.client.send_message(msg, sender=self.user or None)
+            except BaseException:
+                await self._discard(conn)
+                raise
+            conn.sent += 1
+            conn.last_used = time.monotonic()
+            if conn.sent >= self.max_messages:
+                await self._discard(conn)
+            else:
+                self._idle.append(conn)
+
+    async def send(self, msg: Message | PreparedMessage) -> None:
+        for attempt in (0, 1):
+            try:
+                await self._send_once(msg)
+                self._stats["sent"] += 1
+                return
+            except Exception as e:
+                transient = isinstance(e, (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError,
+                                           ConnectionError, TimeoutError)) or \
+                    (isinstance(e, aiosmtplib.SMTPResponseException) and e.code == 421)
+                if attempt == 0 and transient:
+                    await self.close()
+                    self._stats["reconnects"] += 1
+                    continue
+                self._stats["failed"] += 1
+                raise
+
+    async def _send_share(self, messages: list[Message]) -> list[tuple[Message, Exception]]:
+        failures = []
+        for msg in messages:
+            try:
+                await self.send(msg)
+            except Exception as e:
+                failures.append((msg, e))
+        return failures
+
+    async def send_batch(self, messages: list[Message]) -> dict:
+        if not messages:
+            return {"sent": 0, "failed": []}
+        self._stats["batches"] += 1
+        results = await asyncio.gather(*(self._send_share(s) for s in _split(messages, self.size)))
+        failed = [(msg["To"], str(e)) for share in results for msg, e in share]
+        return {"sent": len(messages) - len(failed), "failed": failed}
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._discard(conn)
+
+    def stats(self) -> dict:
+        return {**self._stats, "idle_connections": len(self._idle)}
@@ -0,0 +1,229 @@
+"""Reminder email templates, compiled once, and a cache of rendered MIME bodies.
+
+A reminder's medicine, time and timezone only change when it is rescheduled,
+so the HTML and plain-text parts are rendered and MIME-encoded once per
+distinct content and kept in an LRU cache (REMINDER_EMAIL_CACHE_SIZE). Each
+send only prepends the per-message headers (To, Date, Message-ID) to the
+cached bytes. The headers built from patient-supplied text are safe to
+splice: Subject is encoded and folded by email.policy.SMTP when the body is
+rendered, and control characters are refused in it and in To, which must be
+one plain address.
+
+The cache key is the content itself (every medication in the email), so a
+rescheduled or cancelled reminder can never be sent with an old body. Nothing
+is invalidated per reminder: bodies no longer asked for, single or digest,
+simply age out of the LRU.
+"""
+
+import base64
+import html
+import os
+import re
+import string
+import threading
+import uuid
+from collections import OrderedDict
+from email import policy
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+
+from dotenv import load_dotenv
+
+from Reminder_agent.email_delivery import PreparedMessage
+
+load_dotenv()
+
+_CACHE_SIZE = int(os.getenv("REMINDER_EMAIL_CACHE_SIZE", "10000"))
+
+# (medicine, time, timezone) per medication in the email.
+Items = tuple[tuple[str, str, str], ...]
+
+_CELL      = "padding:8px;border:1px solid #ddd"
+_HEAD_CELL = _CELL + ";background:#f8f9fa"
+
+_PAGE = string.Template("""
+    <html>
+    <body style="font-family:Arial,sans-serif;color:#333;max-width:600px;margin:auto">
+      <div style="background:#198754;padding:20px;border-radius:8px 8px 0 0">
+        <h2 style="color:white;margin:0">&#128138; Medication Reminder</h2>
+      </div>
+      <div style="border:1px solid #ddd;padding:24px;border-radius:0 0 8px 8px">
+        <p>$intro</p>
+        <table style="width:100%;border-collapse:collapse;margin:16px 0">$rows
+        </table>
+        <p style="color:#888;font-size:12px">
+          Sent by Jeevanta &middot; Reply to your health assistant to cancel or modify reminders.
+        </p>
+      </div>
+    </body>
+    </html>
+    """)
+
+_SINGLE_ROWS = string.Template(f"""
+          <tr>
+            <td style="{_HEAD_CELL}"><b>Medication</b></td>
+            <td style="{_CELL}">$medicine</td>
+          </tr>
+          <tr>
+            <td style="{_HEAD_CELL}"><b>Scheduled Time</b></td>
+            <td style="{_CELL}">$time ($timezone)</td>
+          </tr>""")
+
+_DIGEST_HEADER = f"""
+          <tr>
+            <th style="{_HEAD_CELL};text-align:left">Medication</th>
+            <th style="{_HEAD_CELL};text-align:left">Scheduled Time</th>
+          </tr>"""
+
+_DIGEST_ROW = string.Template(f"""
+          <tr>
+            <td style="{_CELL}">$medicine</td>
+            <td style="{_CELL}">$time ($timezone)</td>
+          </tr>""")
+
+_TEXT = string.Template("""Medication Reminder
+
+$intro
+
+$rows
+
+--
+Sent by Jeevanta. Reply to your health assistant to cancel or modify reminders.
+""")
+
+_TEXT_ROW = string.Template("- $medicine at $time ($timezone)")
+
+# Header injection / smuggling: refused in To and Subject even where the policy would encode them.
+_CONTROL_CHARS = re.compile(r"[\x00-\x1f\x7f]")
+# One bare ASCII addr-spec: no display name, list separator or whitespace to smuggle in To.
+_ADDRESS = re.compile(r"[^\s@,;:<>()\[\]\"\\]+@[^\s@,;:<>()\[\]\"\\]+", re.ASCII)
+
+# "=_" cannot occur in base64 or in the part headers, so one boundary serves every body.
+_BOUNDARY = f"=_jeevanta_{uuid.uuid4().hex}"
+
+_BODY = string.Template(
+    "MIME-Version: 1.0\r\n"
+    'Content-Type: multipart/alternative; boundary="$boundary"\r\n'
+    "\r\n"
+    "--$boundary\r\n"
+    'Content-Type: text/plain; charset="utf-8"\r\n'
+    "Content-Transfer-Encoding: base64\r\n"
+    "\r\n"
+    "$text"
+    "--$boundary\r\n"
+    'Content-Type: text/html; charset="utf-8"\r\n'
+    "Content-Transfer-Encoding: base64\r\n"
+    "\r\n"
+    "$html"
+    "--$boundary--\r\n"
+)
+
+
+def items_key(items: list[dict]) -> Items:
+    """Cache key for a payload's medications."""
+    return tuple((item["medicine"], item["time"], item["timezone"]) for item in items)
+
+
+def _intro(items: Items) -> str:
+    if len(items) == 1:
+        return "This is your scheduled reminder to take your medication."
+    return f"This is your scheduled reminder to take these {len(items)} medications now."
+
+
+def subject(items: Items) -> str:
+    if len(items) == 1:
+        return f"Reminder: Take {items[0][0]} now"
+    return f"Reminder: Take your {len(items)} medications now"
+
+
+def render_html(items: Items) -> str:
+    """HTML body: one medication as a detail table, several as a list table."""
+    escaped = [{"medicine": html.escape(m), "time": html.escape(t), "timezone": html.escape(tz)}
+               for m, t, tz in items]
+    if len(escaped) == 1:
+        rows = _SINGLE_ROWS.substitute(escaped[0])
+    else:
+        rows = _DIGEST_HEADER + "".join(_DIGEST_ROW.substitute(e) for e in escaped)
+    return _PAGE.substitute(intro=_intro(items), rows=rows)
+
+
+def render_text(items: Items) -> str:
+    """Plain-text alternative for clients (and spam filters) that skip the HTML."""
+    rows = "\n".join(_TEXT_ROW.substitute(medicine=m, time=t, timezone=tz) for m, t, tz in items)
+    return _TEXT.substitute(intro=_intro(items), rows=rows)
+
+
+def _header(name: str, value: str) -> bytes:
+    """One encoded, folded header line. Raises ValueError for control characters."""
+    if _CONTROL_CHARS.search(value):
+        raise ValueError(f"Control characters in the {name} header.")
+    msg = EmailMessage(policy=policy.SMTP)
+    msg[name] = value
+    # A header-only message serialises as its header plus the blank separator line.
+    return bytes(msg)[:-2]
+
+
+def _b64(text: str) -> str:
+    return base64.encodebytes(text.encode("utf-8")).decode("ascii").replace("\n", "\r\n")
+
+
+class RenderedEmail:
+    """Subject header line and MIME body (headers from MIME-Version on) for one content."""
+    __slots__ = ("subject", "body")
+
+    def __init__(self, items: Items):
+        self.subject = _header("Subject", subject(items))
+        self.body = _BODY.substitute(boundary=_BOUNDARY, text=_b64(render_text(items)),
+                                     html=_b64(render_html(items))).encode("ascii")
+
+
+class MessageCache:
+    """Thread-safe LRU of RenderedEmail by content; builds ready-to-send messages."""
+
+    def __init__(self, sender: str, display_name: str = "Jeevanta Reminders",
+                 max_entries: int = _CACHE_SIZE):
+        self.sender = sender
+        self.from_header = _header("From", f"{display_name} <{sender}>")
+        self.max_entries = max_entries
+        # make_msgid() would otherwise resolve the host name on every call.
+        self._msgid_domain = sender.rpartition("@")[2] or "jeevanta.local"
+        self._entries: OrderedDict[Items, RenderedEmail] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def rendered(self, items: Items) -> RenderedEmail:
+        with self._lock:
+            entry = self._entries.get(items)
+            if entry is not None:
+                self._entries.move_to_end(items)
+                self._stats["hits"] += 1
+                return entry
+        entry = RenderedEmail(items)          # render outside the lock
+        with self._lock:
+            self._stats["misses"] += 1
+            self._entries[items] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return entry
+
+    def message(self, to_email: str, items: list[dict]) -> PreparedMessage:
+        """The full message for one send: fresh per-send headers + the cached body.
+
+        Raises ValueError when to_email is not one plain address or a medicine
+        name has control characters, so nothing reaches the headers unchecked.
+        """
+        if not _ADDRESS.fullmatch(to_email):
+            raise ValueError(f"Reminder email needs one plain recipient address, got {to_email!r}.")
+        rendered = self.rendered(items_key(items))
+        headers = (
+            f"To: {to_email}\r\n"
+            f"Date: {formatdate(usegmt=True)}\r\n"
+            f"Message-ID: {make_msgid(domain=self._msgid_domain)}\r\n"
+        )
+        return PreparedMessage(self.sender, to_email,
+                               self.from_header + headers.encode("ascii") + rendered.subject + rendered.body)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "max_entries": self.max_entries}
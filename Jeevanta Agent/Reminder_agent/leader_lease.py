@@ -0,0 +1,117 @@
+"""Leader election through a lease document in MongoDB.
+
+Every process that imports Reminder_agent runs the scheduler. With
+REMINDER_COORDINATION=mongodb only the holder of the lease enqueues due
+reminders; the others keep their index warm so one of them can take over
+within REMINDER_LEADER_TTL seconds if the leader dies.
+
+The lease is one document in `scheduler_leases`:
+
+    {"_id": "reminder-scheduler", "owner": "<host>:<pid>:<rand>",
+     "expires_at": <epoch>, "renewed_at": <epoch>, "last_tick": <epoch minute>}
+
+It is taken with a single find_one_and_update that only matches when this
+instance already owns it or it has expired, so at most one instance wins.
+Expiry uses the instances' wall clocks, which should be NTP-synced. Locally
+the lease is treated as lost a third of the TTL before it expires, so a slow
+renewal never leaves two leaders.
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from mongo_client import get_database
+
+_COLLECTION = "scheduler_leases"
+
+
+def instance_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class MongoLease:
+    """A renewable, expiring lease; call renew() every ttl / 3 seconds."""
+
+    def __init__(self, name: str, owner: str | None = None, ttl: float = 30):
+        self.name = name
+        self.owner = owner or instance_id()
+        self.ttl = ttl
+        self._valid_until = 0.0          # time.monotonic()
+        self._state: dict = {}
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "lost": 0, "renew_errors": 0}
+
+    @staticmethod
+    def _col():
+        return get_database()[_COLLECTION]
+
+    @property
+    def is_leader(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    def renew(self) -> bool:
+        """Take or extend the lease. Returns True if this instance holds it.
+
+        On a fresh acquisition the previous holder's state (e.g. last_tick)
+        is available from state() so the new leader can resume from it.
+        """
+        was_leader = self.is_leader
+        started = time.monotonic()
+        now = time.time()
+        try:
+            doc = self._col().find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expires_at": now + self.ttl, "renewed_at": now}},
+                upsert=True, return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            doc = None                   # held by someone else (upsert lost the race)
+        except Exception as e:
+            self._stats["renew_errors"] += 1
+            print(f"[LeaderLease] Could not renew '{self.name}': {e}")
+            doc = None
+
+        with self._lock:
+            if doc is not None:
+                self._valid_until = started + self.ttl * 2 / 3
+                self._state = doc
+            else:
+                self._valid_until = 0.0
+        if doc is not None and not was_leader:
+            self._stats["acquired"] += 1
+            print(f"[LeaderLease] {self.owner} is now leader of '{self.name}'.")
+        elif doc is None and was_leader:
+            self._stats["lost"] += 1
+            print(f"[LeaderLease] {self.owner} lost leadership of '{self.name}'.")
+        return doc is not None
+
+    def record(self, **fields) -> None:
+        """Store progress (e.g. last_tick) on the lease while still holding it."""
+        if not self.is_leader:
+            return
+        self._col().update_one({"_id": self.name, "owner": self.owner}, {"$set": fields})
+        with self._lock:
+            self._state.update(fields)
+
+    def state(self) -> dict:
+        with self._lock:
+            return dict(self._state)
+
+    def release(self) -> None:
+        """Give the lease up so another instance can take over immediately."""
+        if not self.is_leader:
+            return
+        self._valid_until = 0.0
+        try:
+            self._col().update_one({"_id": self.name, "owner": self.owner}, {"$set": {"expires_at": 0}})
+        except Exception as e:
+            print(f"[LeaderLease] Could not release '{self.name}': {e}")
+
+    def stats(self) -> dict:
+        return {"owner": self.owner, "is_leader": self.is_leader, **self._stats}
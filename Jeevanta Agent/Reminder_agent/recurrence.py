@@ -0,0 +1,285 @@
+"""Reminder recurrence: the doses of one medication, and a parser for how patients say them.
+
+A Recurrence is a set of local times of day plus a day-of-week mask, stored
+on the reminder's one document:
+
+    {"time": "08:00", "times": ["08:00", "20:00"], "days": 31, "every_hours": 12}
+
+`time` repeats the first dose for readers that predate `times`; documents
+without `times` are single daily reminders. `every_hours` is null unless the
+times came from an interval. `days` has bit 0 for Monday up
+to bit 6 for Sunday, in the reminder's own timezone (127 = every day).
+"every N hours" is kept as the times it expands to, so N must divide 24 —
+the index buckets reminders by minute of day.
+
+parse_schedule() turns phrases like "8am and 8pm", "twice a day",
+"every 6 hours from 6am" or "9:30 pm on weekdays" into a Recurrence.
+"""
+
+import re
+from datetime import datetime
+
+ALL_DAYS = 0b1111111
+WEEKDAYS = 0b0011111
+WEEKENDS = 0b1100000
+
+_DAY_LABELS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+_DAY_NAMES = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tue": 1, "tues": 1, "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thur": 3, "thurs": 3, "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5, "sunday": 6, "sun": 6,
+}
+_NUMBERS = {"one": 1, "two": 2, "three": 3, "four": 4, "six": 6, "eight": 8, "twelve": 12}
+_TIMES_PER_DAY = {"once": 1, "twice": 2, "thrice": 3}
+
+# Doses for "N times a day" when no times are given.
+_DEFAULT_DOSES = {
+    1: ["08:00"],
+    2: ["08:00", "20:00"],
+    3: ["08:00", "14:00", "20:00"],
+    4: ["08:00", "12:00", "16:00", "20:00"],
+}
+_PARTS_OF_DAY = {"morning": "08:00", "noon": "12:00", "midday": "12:00", "afternoon": "14:00",
+                 "evening": "19:00", "night": "21:00", "bedtime": "21:00", "midnight": "00:00"}
+_INTERVAL_START = "08:00"
+# Words that may be left once days, intervals, counts and times are taken out.
+_CONNECTORS = frozenset({"and", "&", ",", ".", "at", "on", "from", "starting", "in", "the", "a",
+                         "every", "each", "per", "day", "daily", "everyday"})
+
+_DAY = r"(?:%s)" % "|".join(sorted(_DAY_NAMES, key=len, reverse=True))
+_DAY_RANGE_RE = re.compile(rf"\b({_DAY})s?\s*(?:-|to|through|thru|till|until)\s*({_DAY})s?\b")
+_DAY_RE = re.compile(rf"\b({_DAY})s?\b")
+_INTERVAL_RE = re.compile(r"\bevery\s+(\d+|%s)?\s*(?:hours?|hrs?|h)\b|\bhourly\b" % "|".join(_NUMBERS))
+_FREQUENCY_RE = re.compile(
+    r"\b(?:(?P<word>once|twice|thrice)|(?P<count>\d+|one|two|three|four)\s*(?:x|times))\b"
+    r"\s*(?:a|per|each|every)?\s*(?:day|daily)?\b")
+_PART = r"(?:%s)" % "|".join(_PARTS_OF_DAY)
+_TIME_RE = re.compile(
+    # "7 in the morning", "10 at night", "8 pm at night": the part of day only sets AM/PM.
+    rf"\b(?:at\s+)?(?P<hp>\d{{1,2}})(?:[:.](?P<mp>\d{{2}}))?\s*(?P<ampmp>a\.?m\.?|p\.?m\.?)?"
+    rf"\s*(?:o'?clock\s*)?(?:in\s+the\s+|at\s+|this\s+)?(?P<partp>{_PART})\b"
+    r"|\b(?P<h12>\d{1,2})(?:[:.](?P<m12>\d{2}))?\s*(?P<ampm>a\.?m\.?|p\.?m\.?)(?![a-z])"
+    r"|\b(?P<h24>\d{1,2}):(?P<m24>\d{2})\b"
+    r"|\bat\s+(?P<hour>\d{1,2})\b(?!\s*(?:[:.]?\d|a\.?m|p\.?m))"
+    r"|\b(?P<part>%s)\b" % "|".join(_PARTS_OF_DAY))
+
+
+def to_24h(time_str: str) -> str | None:
+    """Convert any common time string to HH:MM (24-hour).
+
+    Accepts: '9 PM', '9:30 AM', '21:00', '9pm', '9:30pm'
+    """
+    t = time_str.strip()
+    for fmt in ("%I:%M %p", "%I %p", "%H:%M", "%H"):
+        try:
+            return datetime.strptime(t.upper(), fmt).strftime("%H:%M")
+        except ValueError:
+            continue
+    m = re.match(r"^(\d{1,2})(?::(\d{2}))?\s*(am|pm)$", t, re.IGNORECASE)
+    if m:
+        hour   = int(m.group(1))
+        minute = int(m.group(2) or 0)
+        suffix = m.group(3).lower()
+        if not 1 <= hour <= 12 or minute > 59:
+            return None
+        if suffix == "pm" and hour != 12:
+            hour += 12
+        if suffix == "am" and hour == 12:
+            hour = 0
+        return f"{hour:02d}:{minute:02d}"
+    return None
+
+
+class Recurrence:
+    """Local dose times (sorted "HH:MM") on the days in a Monday-first bit mask."""
+    __slots__ = ("times", "days", "every_hours")
+
+    def __init__(self, times, days: int = ALL_DAYS, every_hours: int | None = None):
+        times = tuple(sorted(set(times)))
+        if not times:
+            raise ValueError("A reminder needs at least one time.")
+        for t in times:
+            if not re.fullmatch(r"([01]\d|2[0-3]):[0-5]\d", t):
+                raise ValueError(f"Invalid time '{t}'.")
+        if not 0 < days <= ALL_DAYS:
+            raise ValueError("A reminder needs at least one day of the week.")
+        self.times = times
+        self.days = days
+        self.every_hours = every_hours
+
+    @classmethod
+    def coerce(cls, schedule: "Recurrence | str") -> "Recurrence":
+        """A Recurrence as is, or a single "HH:MM" as a daily reminder."""
+        return schedule if isinstance(schedule, Recurrence) else cls([schedule])
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "Recurrence":
+        """Read a reminder document, including ones written before `times` existed."""
+        return cls(doc.get("times") or [doc["time"]], doc.get("days", ALL_DAYS), doc.get("every_hours"))
+
+    def to_doc(self) -> dict:
+        # Every field is always written, so an update fully replaces the old schedule.
+        return {"time": self.times[0], "times": list(self.times), "days": self.days,
+                "every_hours": self.every_hours}
+
+    def runs_on(self, weekday: int) -> bool:
+        return bool(self.days >> weekday & 1)
+
+    def describe(self) -> str:
+        """e.g. "08:00 and 20:00 on weekdays", "every 6 hours (02:00, 08:00, 14:00 and 20:00)"."""
+        times = self.times[0] if len(self.times) == 1 else \
+            ", ".join(self.times[:-1]) + " and " + self.times[-1]
+        if self.every_hours:
+            every = "every hour" if self.every_hours == 1 else f"every {self.every_hours} hours"
+            text = f"{every} ({times})"
+        else:
+            text = times
+        if self.days == ALL_DAYS:
+            return text + " daily"
+        if self.days == WEEKDAYS:
+            return text + " on weekdays"
+        if self.days == WEEKENDS:
+            return text + " on weekends"
+        labels = [label for i, label in enumerate(_DAY_LABELS) if self.runs_on(i)]
+        days = labels[0] if len(labels) == 1 else ", ".join(labels[:-1]) + " and " + labels[-1]
+        return f"{text} on {days}"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Recurrence) and \
+            (self.times, self.days, self.every_hours) == (other.times, other.days, other.every_hours)
+
+    def __hash__(self) -> int:
+        return hash((self.times, self.days, self.every_hours))
+
+    def __repr__(self) -> str:
+        return f"Recurrence({self.describe()!r})"
+
+
+# ---------------------------------------------------------------------------
+# Natural-language parser
+# ---------------------------------------------------------------------------
+
+def _number(word: str) -> int:
+    if word.isdigit():
+        return int(word)
+    if word not in _NUMBERS:
+        raise ValueError(f"Could not understand the number '{word}'.")
+    return _NUMBERS[word]
+
+
+def _hour_in_part(hour: int, part: str) -> int:
+    """24-hour clock hour for "<hour> in the <part>", e.g. (7, "evening") -> 19."""
+    if hour > 12:                       # already 24-hour ("20:00 in the evening")
+        return hour
+    if part in ("morning", "midnight"):
+        return hour % 12
+    if part in ("night", "bedtime"):
+        return 0 if hour == 12 else hour if hour < 5 else hour + 12
+    return hour if hour == 12 else hour + 12    # noon, midday, afternoon, evening
+
+
+def _parse_days(text: str) -> tuple[int, str]:
+    """Day mask named in text (default every day), and text with those words removed."""
+    if re.search(r"\b(every other day|alternate days?)\b", text):
+        raise ValueError("Reminders repeat on days of the week; 'every other day' is not supported.")
+    mask = 0
+    if re.search(r"\bweekdays?\b", text):
+        mask |= WEEKDAYS
+        text = re.sub(r"\bweekdays?\b", " ", text)
+    if re.search(r"\bweekends?\b", text):
+        mask |= WEEKENDS
+        text = re.sub(r"\bweekends?\b", " ", text)
+    for m in _DAY_RANGE_RE.finditer(text):
+        first, last = _DAY_NAMES[m.group(1)], _DAY_NAMES[m.group(2)]
+        for i in range((last - first) % 7 + 1):
+            mask |= 1 << (first + i) % 7
+    text = _DAY_RANGE_RE.sub(" ", text)
+    for m in _DAY_RE.finditer(text):
+        mask |= 1 << _DAY_NAMES[m.group(1)]
+    text = _DAY_RE.sub(" ", text)
+    return mask or ALL_DAYS, text
+
+
+def _parse_times(text: str) -> list[str]:
+    times = []
+    for m in _TIME_RE.finditer(text):
+        if m["part"]:
+            times.append(_PARTS_OF_DAY[m["part"]])
+            continue
+        if m["partp"]:
+            hour, minute = int(m["hp"]), int(m["mp"] or 0)
+            if m["ampmp"]:                      # "8 pm at night": the explicit suffix wins
+                if not 1 <= hour <= 12:
+                    raise ValueError(f"Invalid time '{m.group(0).strip()}'.")
+                hour = hour % 12 + (12 if m["ampmp"].startswith("p") else 0)
+            else:
+                hour = _hour_in_part(hour, m["partp"])
+        elif m["ampm"]:
+            hour, minute = int(m["h12"]), int(m["m12"] or 0)
+            if not 1 <= hour <= 12:
+                raise ValueError(f"Invalid time '{m.group(0).strip()}'.")
+            hour = hour % 12 + (12 if m["ampm"].startswith("p") else 0)
+        elif m["h24"]:
+            hour, minute = int(m["h24"]), int(m["m24"])
+        else:
+            hour, minute = int(m["hour"]), 0         # "at 8" / "at 20"
+        if hour > 23 or minute > 59:
+            raise ValueError(f"Invalid time '{m.group(0).strip()}'.")
+        times.append(f"{hour:02d}:{minute:02d}")
+    return times
+
+
+def parse_schedule(text: str) -> Recurrence:
+    """Parse a dosing phrase. Raises ValueError with a patient-readable reason.
+
+    Understands single times ("8 AM", "21:00"), lists ("8am and 8pm",
+    "morning and night"), counts ("twice a day" → 08:00 and 20:00), intervals
+    dividing 24 hours ("every 6 hours", "every 8 hours from 7am") and days
+    ("on weekdays", "weekends", "mon, wed and fri", "monday to friday").
+    Any other word ("except", "until", "tomorrow", "for 5 days") is refused.
+    """
+    single = to_24h(text)
+    if single:
+        return Recurrence([single])
+
+    t = " " + text.strip().lower().replace(",", " , ") + " "
+    days, t = _parse_days(t)
+
+    every_hours = None
+    interval = _INTERVAL_RE.search(t)
+    if interval:
+        every_hours = _number(interval.group(1)) if interval.group(1) else 1
+        t = t[:interval.start()] + " " + t[interval.end():]
+        if every_hours <= 0 or 24 % every_hours:
+            raise ValueError(f"'Every {every_hours} hours' does not repeat at the same times each day; "
+                             "use 1, 2, 3, 4, 6, 8 or 12 hours, or list the times.")
+
+    per_day = None
+    frequency = _FREQUENCY_RE.search(t)
+    if frequency:
+        per_day = _TIMES_PER_DAY[frequency["word"]] if frequency["word"] else _number(frequency["count"])
+        t = t[:frequency.start()] + " " + t[frequency.end():]
+
+    times = _parse_times(t)
+    # "8am except sunday", "tomorrow 8am", "for 5 days": refuse rather than guess.
+    for word in _TIME_RE.sub(" ", t).split():
+        if word not in _CONNECTORS:
+            raise ValueError(f"Could not understand '{word}' in '{text}'. Use times like '8 AM', "
+                             "'8am and 8pm on weekdays', 'twice a day' or 'every 6 hours'.")
+    if every_hours:
+        start = times[0] if times else _INTERVAL_START
+        if len(times) > 1:
+            raise ValueError("Give one starting time for an interval, e.g. 'every 8 hours from 7am'.")
+        h, m = map(int, start.split(":"))
+        times = [f"{(h + k * every_hours) % 24:02d}:{m:02d}" for k in range(24 // every_hours)]
+    elif per_day:
+        if not times:
+            if per_day not in _DEFAULT_DOSES:
+                raise ValueError(f"Please give the {per_day} times of day.")
+            times = _DEFAULT_DOSES[per_day]
+        elif len(set(times)) != per_day:
+            raise ValueError(f"That is {per_day} time(s) a day but {len(set(times))} time(s) were given.")
+    if not times:
+        raise ValueError(f"Could not understand '{text}'. Use times like '8 AM', '8am and 8pm', "
+                         "'twice a day' or 'every 6 hours'.")
+    return Recurrence(times, days, every_hours)
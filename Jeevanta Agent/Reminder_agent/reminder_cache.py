@@ -0,0 +1,101 @@
+"""Per-patient read cache for the reminder tools.
+
+get_patient_reminders runs on every "what are my reminders?" turn and right
+after schedule/cancel to confirm, so the reminders of recently active
+patients are kept here, keyed by email. Writes made through the async store
+are applied to a cached entry in place (write-through) instead of dropping
+it, so the confirming read after a write is served from memory too.
+
+Entries expire after REMINDER_CACHE_TTL seconds, which bounds how long a
+write made elsewhere (another worker or instance) can go unseen,
+and at most REMINDER_CACHE_MAX_ENTRIES patients are kept (least recently
+used first out). Used from the event loop only, like ProfileCache.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from dotenv import load_dotenv
+
+from Reminder_agent.reminder_store import normalize_medicine
+
+load_dotenv()
+
+_MAX_ENTRIES = int(os.getenv("REMINDER_CACHE_MAX_ENTRIES", "10000"))
+_TTL         = float(os.getenv("REMINDER_CACHE_TTL", "300"))
+
+Loader = Callable[[str], Awaitable[list[dict]]]
+
+
+class ReminderCache:
+    """TTL + LRU cache of reminder documents by patient email."""
+
+    def __init__(self, max_entries: int = _MAX_ENTRIES, ttl: float = _TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # email -> (fetched_at, {medicine_normalized: doc})
+        self._entries: OrderedDict[str, tuple[float, dict[str, dict]]] = OrderedDict()
+        # Counts writes, so a read that overlapped one is returned but not cached.
+        self._writes = 0
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0,
+                       "writes": 0, "invalidations": 0}
+
+    async def get(self, email: str, loader: Loader) -> list[dict]:
+        """Reminders for email, calling loader(email) on a miss or after the TTL."""
+        entry = self._entries.get(email)
+        if entry is not None:
+            if time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(email)
+                self._stats["hits"] += 1
+                return [dict(doc) for doc in entry[1].values()]
+            del self._entries[email]
+            self._stats["expired"] += 1
+
+        self._stats["misses"] += 1
+        writes = self._writes
+        docs = await loader(email)
+        if self.ttl > 0 and self._writes == writes:
+            self._put(email, {doc.get("medicine_normalized") or normalize_medicine(doc["medicine"]): doc
+                              for doc in docs})
+        return [dict(doc) for doc in docs]
+
+    def write(self, email: str, doc: dict) -> None:
+        """Apply an upserted reminder to email's entry, if cached."""
+        self._writes += 1
+        entry = self._entries.get(email)
+        if entry is not None:
+            previous = entry[1].get(doc["medicine_normalized"], {})
+            entry[1][doc["medicine_normalized"]] = {**previous, **doc}
+            self._stats["writes"] += 1
+
+    def discard(self, email: str, medicine_normalized: str) -> None:
+        """Apply a deleted reminder to email's entry, if cached."""
+        self._writes += 1
+        entry = self._entries.get(email)
+        if entry is not None:
+            entry[1].pop(medicine_normalized, None)
+            self._stats["writes"] += 1
+
+    def invalidate(self, email: str | None = None) -> None:
+        """Drop one patient's entry, or every entry when email is None."""
+        self._writes += 1
+        if email is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(email, None)
+        self._stats["invalidations"] += 1
+
+    def stats(self) -> dict:
+        return {**self._stats, "size": len(self._entries), "max_entries": self.max_entries,
+                "ttl": self.ttl}
+
+    # -- internals ------------------------------------------------------------
+
+    def _put(self, email: str, docs: dict[str, dict]) -> None:
+        self._entries[email] = (time.monotonic(), docs)
+        self._entries.move_to_end(email)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
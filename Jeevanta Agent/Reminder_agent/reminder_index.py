@@ -0,0 +1,304 @@
+"""In-memory index of daily reminders, bucketed by UTC minute of day.
+
+Every dose of a reminder (local HH:MM + timezone, see recurrence) is
+normalised to a UTC minute (0–1439) when it is added, and the reminder is
+placed in each of those buckets, so the scheduler needs just one tick per
+minute that reads a single bucket — no per-reminder trigger, no wakeup
+computation over every job. Day-of-week masks are checked when a bucket is
+read. When a zone's UTC offset changes (daylight saving) its reminders are
+moved to their new buckets by refresh_offsets().
+
+Secondary indexes by user and by medicine, plus the buckets read in order
+from the next minute, let query() page through reminders by next run
+without sorting or scanning the whole index.
+"""
+
+import base64
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_tz
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from Reminder_agent.recurrence import ALL_DAYS, Recurrence
+
+MINUTES_PER_DAY = 1440
+
+
+class Reminder:
+    __slots__ = ("job_id", "user_id", "email", "medicine", "schedule", "timezone", "minutes")
+
+    def __init__(self, job_id: str, user_id: str, email: str, medicine: str,
+                 schedule: Recurrence, timezone: str, minutes: tuple[int, ...]):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.email = email
+        self.medicine = medicine
+        self.schedule = schedule
+        self.timezone = timezone
+        self.minutes = minutes      # UTC minute of day of each dose, in schedule.times order
+
+    @property
+    def times(self) -> tuple[str, ...]:
+        return self.schedule.times
+
+    def dose_time(self, minute: int) -> str:
+        """Local HH:MM of the dose that fires in UTC minute-of-day `minute`."""
+        return self.schedule.times[self.minutes.index(minute)]
+
+    def runs_at(self, epoch: float) -> bool:
+        """Whether the schedule's day mask includes the local date at `epoch`."""
+        if self.schedule.days == ALL_DAYS:
+            return True
+        return self.schedule.runs_on(datetime.fromtimestamp(epoch, _zone(self.timezone)).weekday())
+
+    def payload(self, minute: int | None = None) -> dict:
+        """Delivery payload for the dose in `minute` (the first dose if None)."""
+        return {"email": self.email, "medicine": self.medicine,
+                "time": self.dose_time(minute) if minute is not None else self.schedule.times[0],
+                "timezone": self.timezone}
+
+
+@lru_cache(maxsize=None)
+def _zone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone '{name}'.")
+
+
+def check_timezone(name: str) -> None:
+    """Raise ValueError unless `name` is a known IANA timezone."""
+    _zone(name)
+
+
+def _offset_minutes(tz_name: str, at: datetime) -> int:
+    return int(at.astimezone(_zone(tz_name)).utcoffset().total_seconds() // 60)
+
+
+def _local_minute(time_24h: str) -> int:
+    hour, minute = map(int, time_24h.split(":"))
+    return hour * 60 + minute
+
+
+def minute_of_day(epoch: float) -> int:
+    return int(epoch // 60) % MINUTES_PER_DAY
+
+
+def _medicine_key(medicine: str) -> str:
+    # Same normalisation as reminder_store.normalize_medicine.
+    return medicine.strip().lower()
+
+
+def _encode_cursor(base: int, offset: int, job_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{base}:{offset}:{job_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> tuple[int, int, str]:
+    try:
+        base, offset, job_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":", 2)
+        return int(base) % MINUTES_PER_DAY, int(offset), job_id
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+
+class ReminderIndex:
+    """Thread-safe job_id → Reminder map plus 1440 UTC-minute buckets."""
+
+    def __init__(self):
+        self._buckets: list[dict[str, Reminder]] = [{} for _ in range(MINUTES_PER_DAY)]
+        self._jobs: dict[str, Reminder] = {}
+        self._by_zone: dict[str, set[str]] = {}
+        self._by_user: dict[str, set[str]] = {}
+        self._by_medicine: dict[str, set[str]] = {}
+        self._offsets: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def _utc_minutes(self, schedule: Recurrence, tz_name: str) -> tuple[int, ...]:
+        offset = self._offsets.get(tz_name)
+        if offset is None:
+            offset = self._offsets[tz_name] = _offset_minutes(tz_name, datetime.now(dt_tz.utc))
+        return tuple((_local_minute(t) - offset) % MINUTES_PER_DAY for t in schedule.times)
+
+    def upsert(self, job_id: str, user_id: str, email: str, medicine: str,
+               schedule: Recurrence | str, timezone: str) -> Reminder:
+        """Add or replace a reminder; `schedule` may be a single "HH:MM".
+
+        Raises ValueError for an unknown timezone or a bad time.
+        """
+        return self.upsert_many([(job_id, user_id, email, medicine, schedule, timezone)])[0]
+
+    def upsert_many(self, entries: list[tuple]) -> list[Reminder]:
+        """upsert() for (job_id, user_id, email, medicine, schedule, timezone) tuples under one lock.
+
+        Every entry is checked first, so a ValueError leaves the index unchanged.
+        """
+        checked = []
+        for job_id, user_id, email, medicine, schedule, timezone in entries:
+            _zone(timezone)
+            checked.append((job_id, user_id, email, medicine, Recurrence.coerce(schedule), timezone))
+        with self._lock:
+            return [self._upsert(*entry) for entry in checked]
+
+    def _upsert(self, job_id: str, user_id: str, email: str, medicine: str,
+                schedule: Recurrence, timezone: str) -> Reminder:
+        self._remove(job_id)
+        reminder = Reminder(job_id, user_id, email, medicine, schedule, timezone,
+                            self._utc_minutes(schedule, timezone))
+        self._jobs[job_id] = reminder
+        for minute in reminder.minutes:
+            self._buckets[minute][job_id] = reminder
+        self._by_zone.setdefault(timezone, set()).add(job_id)
+        self._by_user.setdefault(user_id, set()).add(job_id)
+        self._by_medicine.setdefault(_medicine_key(medicine), set()).add(job_id)
+        return reminder
+
+    def _remove(self, job_id: str) -> bool:
+        reminder = self._jobs.pop(job_id, None)
+        if reminder is None:
+            return False
+        for minute in reminder.minutes:
+            self._buckets[minute].pop(job_id, None)
+        for secondary, key in ((self._by_zone, reminder.timezone), (self._by_user, reminder.user_id),
+                               (self._by_medicine, _medicine_key(reminder.medicine))):
+            members = secondary.get(key)
+            if members is not None:
+                members.discard(job_id)
+                if not members:
+                    del secondary[key]
+        return True
+
+    def remove(self, job_id: str) -> bool:
+        with self._lock:
+            return self._remove(job_id)
+
+    def get(self, job_id: str) -> Reminder | None:
+        return self._jobs.get(job_id)
+
+    def due(self, minute: int, at: float | None = None) -> list[Reminder]:
+        """Reminders in one UTC minute-of-day bucket.
+
+        With `at` (the epoch the bucket fires for), reminders whose day mask
+        excludes that local date are left out.
+        """
+        with self._lock:
+            due = list(self._buckets[minute].values())
+        if at is not None:
+            due = [r for r in due if r.runs_at(at)]
+        return due
+
+    def all(self) -> list[Reminder]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def query(self, user_id: str | None = None, medicine: str | None = None,
+              due_within: int | None = None, limit: int = 50, cursor: str | None = None,
+              count_only: bool = False, now: float | None = None) -> dict:
+        """One page of reminders in next-run order, optionally filtered.
+
+        user_id / medicine (any case) use the secondary indexes; due_within
+        keeps reminders firing in the next N minutes. A multi-dose reminder
+        is listed once, at its first dose from now (day masks are not
+        applied to the order). Pass the returned next_cursor back to
+        continue — the order stays anchored to the minute of the first
+        page. Returns {"total", "reminders", "next_cursor"} ("reminders" is
+        empty with count_only). Raises ValueError for a bad cursor.
+        """
+        if cursor:
+            base, start_offset, after = _decode_cursor(cursor)
+        else:
+            # Reminders of the current minute have already fired, so start at the next one.
+            base, start_offset, after = (minute_of_day(now or time.time()) + 1) % MINUTES_PER_DAY, 0, ""
+        limit = max(1, limit)
+        horizon = MINUTES_PER_DAY if due_within is None else max(0, min(due_within, MINUTES_PER_DAY))
+
+        with self._lock:
+            candidates = None
+            filters = ((self._by_user, user_id), (self._by_medicine, medicine and _medicine_key(medicine)))
+            for secondary, key in filters:
+                if not key:
+                    continue
+                members = secondary.get(key, set())
+                candidates = members if candidates is None else candidates & members
+
+            def offset_of(job_id: str) -> int:
+                return min((m - base) % MINUTES_PER_DAY for m in self._jobs[job_id].minutes)
+
+            def listed_at(offset: int) -> list[str]:
+                # A reminder sits in one bucket per dose; list it at its first one only.
+                bucket = self._buckets[(base + offset) % MINUTES_PER_DAY]
+                return [j for j, r in bucket.items() if len(r.minutes) == 1 or offset_of(j) == offset]
+
+            if candidates is not None:
+                ordered = sorted(p for p in ((offset_of(j), j) for j in candidates) if p[0] < horizon)
+                total = len(ordered)
+                if count_only:
+                    return {"total": total, "reminders": [], "next_cursor": None}
+                page = [(o, j) for o, j in ordered if (o, j) > (start_offset, after)][:limit + 1]
+            else:
+                if due_within is None:
+                    total = len(self._jobs)
+                else:
+                    total = sum(len(listed_at(o)) for o in range(horizon))
+                if count_only:
+                    return {"total": total, "reminders": [], "next_cursor": None}
+                page = []
+                for offset in range(start_offset, horizon):
+                    ids = sorted(j for j in listed_at(offset) if offset > start_offset or j > after)
+                    page.extend((offset, j) for j in ids[:limit + 1 - len(page)])
+                    if len(page) > limit:
+                        break
+            reminders = [self._jobs[j] for _, j in page[:limit]]
+
+        next_cursor = None
+        if len(page) > limit:
+            offset, job_id = page[limit - 1]
+            next_cursor = _encode_cursor(base, offset, job_id)
+        return {"total": total, "reminders": reminders, "next_cursor": next_cursor}
+
+    def refresh_offsets(self, now: datetime | None = None) -> int:
+        """Re-bucket reminders of zones whose UTC offset changed. Returns how many moved."""
+        now = now or datetime.now(dt_tz.utc)
+        moved = 0
+        with self._lock:
+            for tz_name, job_ids in self._by_zone.items():
+                offset = _offset_minutes(tz_name, now)
+                if offset == self._offsets.get(tz_name):
+                    continue
+                self._offsets[tz_name] = offset
+                for job_id in job_ids:
+                    reminder = self._jobs[job_id]
+                    for minute in reminder.minutes:
+                        self._buckets[minute].pop(job_id, None)
+                    reminder.minutes = self._utc_minutes(reminder.schedule, tz_name)
+                    for minute in reminder.minutes:
+                        self._buckets[minute][job_id] = reminder
+                    moved += 1
+        return moved
+
+    @staticmethod
+    def next_run(reminder: Reminder, now: datetime | None = None) -> datetime:
+        """Next fire time of any dose on an included day, in the reminder's own timezone."""
+        now = now or datetime.now(dt_tz.utc)
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        minutes = sorted(reminder.minutes)
+        for day in range(8):
+            for minute in minutes:
+                run = today + timedelta(days=day, minutes=minute)
+                if run > now and reminder.runs_at(run.timestamp()):
+                    return run.astimezone(_zone(reminder.timezone))
+        raise ValueError(f"Reminder {reminder.job_id} has no run day.")   # unreachable: days != 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            sizes = [len(b) for b in self._buckets]
+            return {
+                "reminders": len(self._jobs),
+                "timezones": len(self._by_zone),
+                "doses": sum(sizes),
+                "busy_minutes": sum(1 for s in sizes if s),
+                "largest_minute": max(sizes),
+            }
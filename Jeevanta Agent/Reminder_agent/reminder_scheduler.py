@@ -1,16 +1,41 @@
-"""APScheduler-based reminder scheduler with smtplib email delivery."""
+"""Minute-tick reminder scheduler with queued, pooled SMTP email delivery.
 
+Reminders live in an in-memory ReminderIndex bucketed by UTC minute of day
+(a multi-dose reminder sits in one bucket per dose, see recurrence) and are
+streamed from MongoDB by a background thread at start (see reload_status).
+A single APScheduler job ticks once a minute, pulls the due bucket and
+enqueues its delivery tasks in one batch (see delivery_queue), one per
+recipient: a patient's reminders due together go out as a single digest.
+Worker threads send the emails over the shared SMTP pool. When several
+instances run, REMINDER_COORDINATION=mongodb lets only the elected leader
+enqueue.
+"""
+
+import atexit
+import hashlib
 import os
-import smtplib
 import threading
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import time
+from datetime import datetime, timedelta, timezone as dt_tz
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from dotenv import load_dotenv
 
-from Reminder_agent.reminder_store import fetch_all_reminders
+from Reminder_agent.delivery_queue import REMINDER_QUEUE_BACKEND, DeliveryWorkers, build_delivery_queue
+from Reminder_agent.email_delivery import SmtpPool, is_permanent_failure
+from Reminder_agent.email_templates import MessageCache
+from Reminder_agent.leader_lease import MongoLease
+from Reminder_agent.recurrence import Recurrence
+from Reminder_agent.reminder_index import ReminderIndex, minute_of_day
+from Reminder_agent.reminder_store import (
+    count_reminders,
+    ensure_indexes,
+    fetch_reminders_by_keys,
+    fetch_reminders_changed_since,
+    iter_reminder_batches,
+    normalize_medicine,
+)
 
 load_dotenv()
 
@@ -18,132 +43,521 @@ _SMTP_SERVER   = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 _SMTP_PORT     = int(os.getenv("SMTP_PORT", "587"))
 _EMAIL_USER    = os.getenv("EMAIL_USER", "")
 _EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD", "")
+_SMTP_STARTTLS  = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+
+# Persistent connections shared by all delivery workers.
+_SMTP_POOL_SIZE    = int(os.getenv("SMTP_POOL_SIZE", "3"))
+_SMTP_MAX_PER_CONN = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONN", "100"))
+_SMTP_IDLE_TIMEOUT = float(os.getenv("SMTP_IDLE_TIMEOUT", "240"))
+
+# Minutes a late tick (process paused, clock jump) looks back to catch up.
+_REMINDER_TICK_CATCHUP = int(os.getenv("REMINDER_TICK_CATCHUP_MINUTES", "5"))
+# Send one digest per recipient for reminders due in the same minute.
+_REMINDER_DIGEST = os.getenv("REMINDER_DIGEST", "true").lower() == "true"
+
+# Startup reload: documents per cursor batch, seconds between attempts if MongoDB is down.
+_REMINDER_RELOAD_BATCH = int(os.getenv("REMINDER_RELOAD_BATCH", "1000"))
+_REMINDER_RELOAD_RETRY = float(os.getenv("REMINDER_RELOAD_RETRY", "30"))
+# Seconds between passes that repair drift between MongoDB and the index (0 = off).
+_REMINDER_RECONCILE_INTERVAL = float(os.getenv("REMINDER_RECONCILE_INTERVAL", "900"))
+
+# Multi-instance: "mongodb" elects one leader to enqueue reminders (see leader_lease).
+_REMINDER_COORDINATION = os.getenv("REMINDER_COORDINATION", "none").lower()
+_REMINDER_LEADER_TTL   = float(os.getenv("REMINDER_LEADER_TTL", "30"))
 
 _scheduler = BackgroundScheduler(daemon=True)
-_lock = threading.Lock()
+_index = ReminderIndex()
+_lease = MongoLease("reminder-scheduler", ttl=_REMINDER_LEADER_TTL) \
+    if _REMINDER_COORDINATION == "mongodb" else None
+
+_smtp_pool = SmtpPool(
+    _SMTP_SERVER, _SMTP_PORT, _EMAIL_USER, _EMAIL_PASSWORD,
+    size=_SMTP_POOL_SIZE, starttls=_SMTP_STARTTLS,
+    max_messages=_SMTP_MAX_PER_CONN, idle_timeout=_SMTP_IDLE_TIMEOUT,
+)
 
 
 # ---------------------------------------------------------------------------
 # Email
 # ---------------------------------------------------------------------------
 
-def _build_email_html(medicine: str, time_str: str, timezone: str) -> str:
-    return f"""
-    <html>
-    <body style="font-family:Arial,sans-serif;color:#333;max-width:600px;margin:auto">
-      <div style="background:#198754;padding:20px;border-radius:8px 8px 0 0">
-        <h2 style="color:white;margin:0">&#128138; Medication Reminder</h2>
-      </div>
-      <div style="border:1px solid #ddd;padding:24px;border-radius:0 0 8px 8px">
-        <p>This is your scheduled reminder to take your medication.</p>
-        <table style="width:100%;border-collapse:collapse;margin:16px 0">
-          <tr>
-            <td style="padding:8px;border:1px solid #ddd;background:#f8f9fa"><b>Medication</b></td>
-            <td style="padding:8px;border:1px solid #ddd">{medicine}</td>
-          </tr>
-          <tr>
-            <td style="padding:8px;border:1px solid #ddd;background:#f8f9fa"><b>Scheduled Time</b></td>
-            <td style="padding:8px;border:1px solid #ddd">{time_str} ({timezone})</td>
-          </tr>
-        </table>
-        <p style="color:#888;font-size:12px">
-          Sent by Jeevanta &middot; Reply to your health assistant to cancel or modify reminders.
-        </p>
-      </div>
-    </body>
-    </html>
+_messages = MessageCache(_EMAIL_USER)
+
+
+def _deliver(payload: dict) -> None:
+    """Delivery worker callback — raises so the queue can retry or dead-letter."""
+    items = payload.get("items") or [payload]
+    _smtp_pool.send(_messages.message(payload["email"], items))
+    medicines = ", ".join(item["medicine"] for item in items)
+    print(f"[ReminderScheduler] Email sent — {medicines} to {payload['email']} at {items[0]['time']}")
+
+
+def _delivery_tasks(due: list, minute: int) -> tuple[list[tuple[str, dict]], int]:
+    """Queue tasks for the reminders due in UTC minute-of-day `minute`, one per recipient.
+
+    Several reminders for the same email (whatever their timezones) become a
+    single digest task with an "items" list; a lone reminder keeps its job id
+    and payload. A digest's id names the recipient and the reminders in it,
+    so re-enqueueing the same minute is still a no-op — if the set changed in
+    between (catch-up after a reload), a reminder can repeat but not drop.
+    Returns (tasks, reminders folded into digests).
     """
+    if not _REMINDER_DIGEST:
+        return [(r.job_id, r.payload(minute)) for r in due], 0
+    by_email: dict[str, list] = {}
+    for r in due:
+        by_email.setdefault(r.email.lower(), []).append(r)
+    tasks, coalesced = [], 0
+    for email, reminders in by_email.items():
+        if len(reminders) == 1:
+            tasks.append((reminders[0].job_id, reminders[0].payload(minute)))
+            continue
+        reminders.sort(key=lambda r: r.medicine.lower())
+        members = ",".join(sorted(r.job_id for r in reminders))
+        digest_id = f"digest:{email}:{hashlib.sha1(members.encode()).hexdigest()[:12]}"
+        tasks.append((digest_id, {
+            "email": reminders[0].email,
+            "items": [{"medicine": r.medicine, "time": r.dose_time(minute), "timezone": r.timezone}
+                      for r in reminders],
+        }))
+        coalesced += len(reminders) - 1
+    return tasks, coalesced
 
 
-def _send_email(to_email: str, medicine: str, time_str: str, timezone: str) -> None:
-    if not _EMAIL_USER or not _EMAIL_PASSWORD:
-        print(f"[ReminderScheduler] SMTP not configured — skipping email to {to_email}")
+# Built by start_scheduler() so importing this module opens no file or connection.
+_queue = None
+_workers: DeliveryWorkers | None = None
+
+
+_tick_lock = threading.Lock()
+_last_tick: float | None = None
+_tick_stats = {"ticks": 0, "enqueued": 0, "coalesced": 0, "last_tick_ms": 0.0, "rebucketed": 0,
+               "follower_ticks": 0, "pulled": 0, "dropped_stale": 0}
+_last_pull: datetime | None = None
+
+
+def _pull_changes() -> None:
+    """Apply reminders other instances created or rescheduled since the last pull."""
+    global _last_pull
+    started = datetime.now(dt_tz.utc)
+    if _last_pull is None:
+        _last_pull = started
         return
+    # Overlap by a minute to absorb clock skew between instances; re-applying is harmless.
+    docs = fetch_reminders_changed_since(_last_pull - timedelta(minutes=1))
+    _last_pull = started
+    for doc in docs:
+        job_id = _job_id(doc["user_id"], doc["medicine"])
+        if _touched(job_id):
+            continue
+        try:
+            _index_doc(job_id, doc)
+        except (KeyError, ValueError):
+            continue
+    with _tick_lock:
+        _tick_stats["pulled"] += len(docs)
+
+
+def _confirm_due(due: list, minute: int) -> list:
+    """Drop due reminders another instance deleted or moved since they were indexed."""
+    keys = [(r.user_id, normalize_medicine(r.medicine)) for r in due]
     try:
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = f"Reminder: Take {medicine} now"
-        msg["From"]    = f"Jeevanta Reminders <{_EMAIL_USER}>"
-        msg["To"]      = to_email
-        msg.attach(MIMEText(_build_email_html(medicine, time_str, timezone), "html"))
-
-        with smtplib.SMTP(_SMTP_SERVER, _SMTP_PORT) as server:
-            server.ehlo()
-            server.starttls()
-            server.login(_EMAIL_USER, _EMAIL_PASSWORD)
-            server.sendmail(_EMAIL_USER, to_email, msg.as_string())
-
-        print(f"[ReminderScheduler] Email sent — {medicine} to {to_email} at {time_str}")
+        docs = fetch_reminders_by_keys(keys)
     except Exception as e:
-        print(f"[ReminderScheduler] Email failed for {to_email}: {e}")
+        print(f"[ReminderScheduler] Could not confirm due reminders ({e}) — using the index as is")
+        return due
+    confirmed = []
+    for reminder, key in zip(due, keys):
+        doc = docs.get(key)
+        if doc is None:
+            if not _touched(reminder.job_id):
+                _index.remove(reminder.job_id)
+        elif not _same_reminder(reminder, doc):
+            try:
+                _index_doc(reminder.job_id, doc)
+            except (KeyError, ValueError):
+                continue
+            updated = _index.get(reminder.job_id)
+            if updated is not None and minute_of_day(minute) in updated.minutes and updated.runs_at(minute):
+                confirmed.append(updated)
+        else:
+            confirmed.append(reminder)
+    with _tick_lock:
+        _tick_stats["dropped_stale"] += len(due) - len(confirmed)
+    return confirmed
+
+
+def _tick() -> None:
+    """Once a minute: enqueue every reminder due this UTC minute (and any missed ones).
+
+    With REMINDER_COORDINATION=mongodb only the lease holder enqueues; every
+    instance pulls the others' changes so a follower can take over warm.
+    """
+    global _last_tick
+    started = time.perf_counter()
+    now_minute = int(time.time() // 60 * 60)
+    if _lease is not None:
+        try:
+            _pull_changes()
+        except Exception as e:
+            print(f"[ReminderScheduler] Could not pull reminder changes: {e}")
+        if not _lease.is_leader:
+            with _tick_lock:
+                _tick_stats["follower_ticks"] += 1
+            return
+    with _tick_lock:
+        if _last_tick is None:
+            first = now_minute
+        else:
+            first = max(_last_tick + 60, now_minute - _REMINDER_TICK_CATCHUP * 60)
+        _last_tick = now_minute
+    moved = _index.refresh_offsets()
+
+    enqueued = coalesced = 0
+    if not _EMAIL_USER or not _EMAIL_PASSWORD:
+        due = sum(len(_index.due(minute_of_day(m), at=m)) for m in range(first, now_minute + 60, 60))
+        if due:
+            print(f"[ReminderScheduler] SMTP not configured — skipping {due} reminder email(s)")
+    else:
+        for minute in range(first, now_minute + 60, 60):
+            due = _index.due(minute_of_day(minute), at=minute)
+            if due and _lease is not None:
+                due = _confirm_due(due, minute)
+            if not due:
+                continue
+            tasks, folded = _delivery_tasks(due, minute_of_day(minute))
+            try:
+                enqueued += _queue.enqueue_many(tasks, minute)
+                coalesced += folded
+            except Exception as e:
+                print(f"[ReminderScheduler] Could not enqueue {len(due)} reminder email(s): {e}")
+        if enqueued:
+            _workers.notify()
+    if _lease is not None:
+        try:
+            _lease.record(last_tick=now_minute)
+        except Exception as e:
+            print(f"[ReminderScheduler] Could not record tick on the lease: {e}")
+
+    with _tick_lock:
+        _tick_stats["ticks"] += 1
+        _tick_stats["enqueued"] += enqueued
+        _tick_stats["coalesced"] += coalesced
+        _tick_stats["rebucketed"] += moved
+        _tick_stats["last_tick_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+
+def _renew_lease() -> None:
+    """Keep (or try to take) the leader lease; a new leader resumes from the old one's last tick."""
+    global _last_tick
+    was_leader = _lease.is_leader
+    if _lease.renew() and not was_leader:
+        with _tick_lock:
+            _last_tick = _lease.state().get("last_tick")
+
+
+def delivery_stats() -> dict:
+    """Queue depth / lag, worker outcomes, SMTP pool and rendered-body cache counters."""
+    return {"queue": _workers.stats() if _workers is not None else None, "smtp": _smtp_pool.stats(),
+            "rendered": _messages.stats()}
+
+
+def dead_letters(limit: int = 100) -> list[dict]:
+    """Most recent reminders that could not be delivered."""
+    return _queue.dead_letters(limit) if _queue is not None else []
+
+
+def scheduler_stats() -> dict:
+    """Index size / bucket spread, tick counters, reload progress, reconcile results, leadership."""
+    with _tick_lock:
+        ticks = dict(_tick_stats)
+        reconciled = dict(_reconcile_stats)
+    leader = _lease.stats() if _lease is not None else {"coordination": "none", "is_leader": True}
+    return {"index": _index.stats(), "tick": ticks, "reload": reload_status(),
+            "reconcile": reconciled, "leader": leader}
 
 
 # ---------------------------------------------------------------------------
 # Scheduling
 # ---------------------------------------------------------------------------
 
+# While a reload or reconcile pass streams the DB, job ids the tools touch are
+# recorded here; a batch read earlier must not revive or overwrite them.
+_sync_lock = threading.Lock()
+_sync_active = 0
+_sync_touched: set[str] = set()
+
+
+def _begin_sync() -> None:
+    global _sync_active
+    with _sync_lock:
+        _sync_active += 1
+
+
+def _end_sync() -> None:
+    global _sync_active
+    with _sync_lock:
+        _sync_active -= 1
+        if not _sync_active:
+            _sync_touched.clear()
+
+
+def _touch(job_id: str) -> None:
+    with _sync_lock:
+        if _sync_active:
+            _sync_touched.add(job_id)
+
+
+def _touched(job_id: str) -> bool:
+    with _sync_lock:
+        return job_id in _sync_touched
+
+
 def _job_id(user_id: str, medicine: str) -> str:
-    return f"{user_id}:{medicine.lower()}"
+    return f"{user_id}:{normalize_medicine(medicine)}"
+
+
+def _index_doc(job_id: str, doc: dict) -> None:
+    _index.upsert(job_id, doc["user_id"], doc["email"], doc["medicine"],
+                  Recurrence.from_doc(doc), doc.get("timezone", "Asia/Kolkata"))
+
+
+def _same_reminder(reminder, doc: dict) -> bool:
+    """Whether an indexed reminder matches its MongoDB document."""
+    try:
+        schedule = Recurrence.from_doc(doc)
+    except (KeyError, ValueError):
+        return False
+    return (reminder.email, reminder.medicine, reminder.schedule, reminder.timezone) == \
+        (doc["email"], doc["medicine"], schedule, doc.get("timezone", "Asia/Kolkata"))
 
 
 def add_job(user_id: str, email: str, medicine: str,
-            time_24h: str, timezone: str) -> str:
-    """Register a daily cron job. Replaces any existing job for the same key."""
-    hour, minute = map(int, time_24h.split(":"))
-    job_id = _job_id(user_id, medicine)
+            schedule: Recurrence | str, timezone: str) -> str:
+    """Register a reminder ("HH:MM" for once daily). Replaces any existing one for the same key."""
+    return add_jobs(user_id, email, [(medicine, schedule, timezone)])[0]
 
-    with _lock:
-        _scheduler.add_job(
-            _send_email,
-            CronTrigger(hour=hour, minute=minute, timezone=timezone),
-            id=job_id,
-            args=[email, medicine, time_24h, timezone],
-            replace_existing=True,
-        )
-    return job_id
+
+def add_jobs(user_id: str, email: str, entries: list[tuple[str, Recurrence | str, str]]) -> list[str]:
+    """Register one patient's (medicine, schedule, timezone) reminders in one index update."""
+    job_ids = [_job_id(user_id, medicine) for medicine, _, _ in entries]
+    for job_id in job_ids:
+        _touch(job_id)
+    _index.upsert_many([(job_id, user_id, email, medicine, schedule, timezone)
+                        for job_id, (medicine, schedule, timezone) in zip(job_ids, entries)])
+    return job_ids
 
 
 def remove_job(user_id: str, medicine: str) -> bool:
-    """Stop and remove the cron job. Returns True if it existed."""
+    """Remove the reminder from the index. Returns True if it existed."""
     job_id = _job_id(user_id, medicine)
-    with _lock:
-        if _scheduler.get_job(job_id):
-            _scheduler.remove_job(job_id)
-            return True
-    return False
-
-
-def list_jobs() -> list[dict]:
-    """Return a summary of all active scheduled jobs."""
-    results = []
-    for job in _scheduler.get_jobs():
-        parts = job.id.split(":", 1)
-        results.append({
-            "id": job.id,
-            "userId": parts[0],
-            "medicationName": parts[1] if len(parts) > 1 else "",
-            "nextRun": str(job.next_run_time),
-        })
-    return results
+    _touch(job_id)
+    return _index.remove(job_id)
+
+
+def list_jobs(user_id: str | None = None, medicine: str | None = None,
+              due_within: int | None = None, limit: int = 50, cursor: str | None = None,
+              count_only: bool = False) -> dict:
+    """One page of scheduled reminders in next-run order (see ReminderIndex.query).
+
+    Returns {"total": int, "reminders": [summaries], "next_cursor": str | None}.
+    """
+    page = _index.query(user_id=user_id, medicine=medicine, due_within=due_within,
+                        limit=limit, cursor=cursor, count_only=count_only)
+    now = datetime.now(dt_tz.utc)
+    page["reminders"] = [{
+        "id": r.job_id,
+        "userId": r.user_id,
+        "medicationName": r.medicine,
+        "time": r.times[0],
+        "times": list(r.times),
+        "schedule": r.schedule.describe(),
+        "timezone": r.timezone,
+        "nextRun": str(_index.next_run(r, now)),
+    } for r in page["reminders"]]
+    return page
+
+
+# ---------------------------------------------------------------------------
+# Reconcile
+# ---------------------------------------------------------------------------
+
+_reconcile_stats: dict = {"runs": 0, "last": None}
+
+
+def reconcile() -> dict:
+    """Make the in-memory index match MongoDB, the source of truth.
+
+    Adds reminders missing from the index, updates ones whose schedule, timezone
+    or email differ, and drops index entries with no document — whatever a
+    failed write, a crash between the DB write and add_job, or another node
+    left behind. Reminders the tools change mid-pass are left alone.
+    """
+    started = time.time()
+    result = {"added": 0, "updated": 0, "removed": 0, "skipped": 0}
+    seen: set[str] = set()
+    _begin_sync()
+    try:
+        for batch in iter_reminder_batches(_REMINDER_RELOAD_BATCH):
+            for doc in batch:
+                job_id = _job_id(doc["user_id"], doc["medicine"])
+                seen.add(job_id)
+                if _touched(job_id):
+                    continue
+                current = _index.get(job_id)
+                if current is not None and _same_reminder(current, doc):
+                    continue
+                try:
+                    _index_doc(job_id, doc)
+                    result["added" if current is None else "updated"] += 1
+                except (KeyError, ValueError):
+                    result["skipped"] += 1
+        for reminder in _index.all():
+            if reminder.job_id not in seen and not _touched(reminder.job_id):
+                _index.remove(reminder.job_id)
+                result["removed"] += 1
+    finally:
+        _end_sync()
+    result["duration_ms"] = round((time.time() - started) * 1000, 1)
+    with _tick_lock:
+        _reconcile_stats["runs"] += 1
+        _reconcile_stats["last"] = {**result, "at": started}
+    if result["added"] or result["updated"] or result["removed"]:
+        print(f"[ReminderScheduler] Reconciled index with DB — {result}")
+    return result
+
+
+def _scheduled_reconcile() -> None:
+    if not is_ready():
+        return
+    try:
+        reconcile()
+    except Exception as e:
+        print(f"[ReminderScheduler] Reconcile failed: {e}")
 
 
 # ---------------------------------------------------------------------------
 # Startup
 # ---------------------------------------------------------------------------
 
+_reload_lock = threading.Lock()
+_reload = {"state": "pending", "loaded": 0, "skipped": 0, "estimated_total": None,
+           "attempts": 0, "started_at": None, "finished_at": None, "error": None,
+           "indexes": None}
+
+
+def _load_reminders() -> None:
+    """Stream reminders from MongoDB into the index, retrying until it succeeds."""
+    global _last_tick, _last_pull
+    while True:
+        with _reload_lock:
+            _reload.update(state="loading", loaded=0, skipped=0, error=None,
+                           started_at=time.time(), attempts=_reload["attempts"] + 1)
+        load_started = int(time.time() // 60 * 60)
+        _last_pull = datetime.now(dt_tz.utc)
+        try:
+            indexes = ensure_indexes()
+            with _reload_lock:
+                _reload["indexes"] = indexes
+            if indexes["missing"]:
+                print(f"[ReminderScheduler] Reminder indexes missing: {indexes['missing']}")
+            estimated = count_reminders()
+            with _reload_lock:
+                _reload["estimated_total"] = estimated
+            print(f"[ReminderScheduler] Reloading ~{estimated} reminder(s) from DB ...")
+            for batch in iter_reminder_batches(_REMINDER_RELOAD_BATCH):
+                loaded = skipped = 0
+                for doc in batch:
+                    job_id = _job_id(doc["user_id"], doc["medicine"])
+                    if _touched(job_id):
+                        skipped += 1
+                        continue
+                    try:
+                        _index_doc(job_id, doc)
+                        loaded += 1
+                    except (KeyError, ValueError) as e:
+                        skipped += 1
+                        print(f"[ReminderScheduler] Skipping bad reminder {job_id}: {e}")
+                with _reload_lock:
+                    _reload["loaded"] += loaded
+                    _reload["skipped"] += skipped
+            break
+        except Exception as e:
+            with _reload_lock:
+                _reload.update(state="retrying", error=str(e))
+            print(f"[ReminderScheduler] Could not load reminders ({e}) — "
+                  f"retrying in {_REMINDER_RELOAD_RETRY:.0f}s")
+            time.sleep(_REMINDER_RELOAD_RETRY)
+
+    _end_sync()
+    # Reminders that came due while loading were not in the index yet; let the
+    # next tick catch up from the start of the load (task keys prevent repeats).
+    with _tick_lock:
+        if _last_tick is not None:
+            _last_tick = min(_last_tick, load_started - 60)
+    with _reload_lock:
+        _reload.update(state="ready", finished_at=time.time())
+        took = _reload["finished_at"] - _reload["started_at"]
+        print(f"[ReminderScheduler] {_reload['loaded']} reminder(s) loaded from DB in {took:.1f}s.")
+
+
+def reload_status() -> dict:
+    """Progress of the startup reload: state, loaded / estimated total, attempts, error."""
+    with _reload_lock:
+        return dict(_reload)
+
+
+def is_ready() -> bool:
+    """True once every persisted reminder is in the index."""
+    with _reload_lock:
+        return _reload["state"] == "ready"
+
+
 def start_scheduler() -> None:
-    """Start the background scheduler and reload persisted reminders from MongoDB."""
+    """Start the minute tick and delivery workers, then reload reminders in the background.
+
+    Returns immediately; use reload_status() / is_ready() to follow the reload.
+    """
+    global _queue, _workers
     if _scheduler.running:
         return
 
+    if _queue is None:
+        _queue = build_delivery_queue()
+        _workers = DeliveryWorkers(_queue, _deliver, is_permanent=is_permanent_failure)
     _scheduler.start()
+    _scheduler.add_job(
+        _tick, CronTrigger(second=0, timezone="UTC"), id="reminder-tick",
+        coalesce=True, max_instances=1, misfire_grace_time=60, replace_existing=True,
+    )
+    if _REMINDER_RECONCILE_INTERVAL > 0:
+        _scheduler.add_job(
+            _scheduled_reconcile, "interval", seconds=_REMINDER_RECONCILE_INTERVAL,
+            id="reminder-reconcile", coalesce=True, max_instances=1, replace_existing=True,
+        )
+    if _lease is not None:
+        if REMINDER_QUEUE_BACKEND != "mongodb":
+            print("[ReminderScheduler] REMINDER_COORDINATION=mongodb with a local queue — only the "
+                  "leader will send; set REMINDER_QUEUE_BACKEND=mongodb to share delivery.")
+        _scheduler.add_job(
+            _renew_lease, "interval", seconds=_REMINDER_LEADER_TTL / 3, id="reminder-lease",
+            next_run_time=datetime.now(dt_tz.utc), coalesce=True, max_instances=1, replace_existing=True,
+        )
+        atexit.register(_lease.release)
+    _workers.start()
+    _begin_sync()
+    threading.Thread(target=_load_reminders, name="reminder-reload", daemon=True).start()
+    print("[ReminderScheduler] Started — reloading reminders in the background.")
 
-    try:
-        reminders = fetch_all_reminders()
-        for r in reminders:
-            add_job(
-                r["user_id"], r["email"], r["medicine"],
-                r["time"], r.get("timezone", "Asia/Kolkata"),
-            )
-        print(f"[ReminderScheduler] Started — {len(reminders)} reminder(s) loaded from DB.")
-    except Exception as e:
-        print(f"[ReminderScheduler] Started (could not load existing reminders: {e})")
+
+def stop_scheduler() -> None:
+    """Stop the tick and delivery workers and hand the leader lease over (app shutdown)."""
+    if not _scheduler.running:
+        return
+    _scheduler.shutdown(wait=False)
+    if _workers is not None:
+        _workers.stop()
+    if _lease is not None:
+        _lease.release()
+    _smtp_pool.close()
+    print("[ReminderScheduler] Stopped.")
@@ -1,60 +1,240 @@
-"""MongoDB persistence for medication reminders using pymongo."""
+"""MongoDB persistence for medication reminders using pymongo.
 
-import os
-import re
+Every document carries `medicine_normalized` (trimmed, lower-case) so lookups
+by user + medicine are exact-match index scans instead of a case-insensitive
+regex, and writes are upserts on that key. ensure_indexes() backfills the
+field on older documents, removes duplicates left by the old insert-only
+writes, and creates:
+
+    email_1                          — fetch_reminders_by_email
+    user_id_1_medicine_normalized_1  — unique; deletes and updates by user + medicine
+    updated_at_1                     — fetch_reminders_changed_since
+
+A reminder's doses (times of day, day mask) live on its one document, see
+recurrence.Recurrence.to_doc.
+
+This module is blocking and serves the scheduler's threads; the agent tools
+use the same operations from reminder_store_async.
+"""
+
+from collections.abc import Iterator
 from datetime import datetime, timezone as dt_tz
 
-from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import OperationFailure
 
-load_dotenv()
+from mongo_client import get_database
+from Reminder_agent.recurrence import Recurrence
 
 _COLLECTION = "Users_medical_reminder"
-_client: MongoClient | None = None
+
+_INDEXES = {
+    "email_1": [("email", ASCENDING)],
+    "user_id_1_medicine_normalized_1": [("user_id", ASCENDING), ("medicine_normalized", ASCENDING)],
+    "updated_at_1": [("updated_at", ASCENDING)],
+}
 
 
 def _col():
     """Return the reminders collection, connecting lazily on first call."""
-    global _client
-    if _client is None:
-        uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-        db_name = os.getenv("MONGODB_DB_NAME", "Users")
-        _client = MongoClient(uri, serverSelectionTimeoutMS=5000)
-        _client[db_name].command("ping")  # fail fast if unreachable
-    db_name = os.getenv("MONGODB_DB_NAME", "Users")
-    return _client[db_name][_COLLECTION]
-
-
-def insert_reminder(user_id: str, email: str, medicine: str,
-                    time_24h: str, timezone: str) -> None:
-    """Persist a new reminder document."""
-    _col().insert_one({
-        "user_id": user_id,
-        "email": email.lower(),
-        "medicine": medicine,
-        "time": time_24h,
-        "timezone": timezone,
-        "created_at": datetime.now(dt_tz.utc),
-    })
-
-
-def fetch_all_reminders() -> list[dict]:
-    """Return all stored reminders (used to reload jobs on startup)."""
-    return list(_col().find({}, {"_id": 0}))
+    return get_database()[_COLLECTION]
+
+
+def normalize_medicine(medicine: str) -> str:
+    """Key used to match a medicine regardless of case or surrounding spaces."""
+    return medicine.strip().lower()
+
+
+# ---------------------------------------------------------------------------
+# Indexes
+# ---------------------------------------------------------------------------
+
+def _backfill_normalized(col, batch_size: int = 1000) -> int:
+    """Add medicine_normalized to documents written before the field existed."""
+    updated = 0
+    ops = []
+    for doc in col.find({"medicine_normalized": {"$exists": False}}, {"medicine": 1}):
+        ops.append(UpdateOne({"_id": doc["_id"]},
+                             {"$set": {"medicine_normalized": normalize_medicine(doc.get("medicine", ""))}}))
+        if len(ops) >= batch_size:
+            updated += col.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += col.bulk_write(ops, ordered=False).modified_count
+    return updated
+
+
+def dedup_reminders(dry_run: bool = False) -> int:
+    """Keep only the newest document per (user_id, medicine_normalized).
+
+    One-shot migration for data written before upserts; returns how many
+    documents were (or, with dry_run, would be) deleted.
+    """
+    col = _col()
+    duplicates = col.aggregate([
+        {"$sort": {"created_at": -1, "_id": -1}},
+        {"$group": {"_id": {"user_id": "$user_id", "medicine": "$medicine_normalized"},
+                    "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True)
+    stale = [doc_id for group in duplicates for doc_id in group["ids"][1:]]
+    if dry_run:
+        return len(stale)
+    deleted = 0
+    for i in range(0, len(stale), 1000):
+        deleted += col.delete_many({"_id": {"$in": stale[i:i + 1000]}}).deleted_count
+    return deleted
+
+
+def ensure_indexes() -> dict:
+    """Backfill medicine_normalized, remove duplicates, create the indexes and check them.
+
+    Returns {"backfilled": int, "deduplicated": int, "missing": [index names], "unique": bool}.
+    The backfill and deduplication are the migration to the unique index, so
+    they only run while it is absent, i.e. once — every write since carries
+    medicine_normalized, and the backfill's $exists filter has no index.
+    """
+    col = _col()
+    migrate = "user_id_1_medicine_normalized_1" in verify_indexes()
+    col.create_index(_INDEXES["email_1"], name="email_1")
+    col.create_index(_INDEXES["updated_at_1"], name="updated_at_1")
+    backfilled = deduplicated = 0
+    if migrate:
+        backfilled = _backfill_normalized(col)
+        deduplicated = dedup_reminders()
+        if deduplicated:
+            print(f"[ReminderStore] Removed {deduplicated} duplicate reminder document(s).")
+    unique = True
+    try:
+        col.create_index(_INDEXES["user_id_1_medicine_normalized_1"],
+                         name="user_id_1_medicine_normalized_1", unique=True)
+    except OperationFailure as e:
+        # A duplicate written between the dedup and the index build.
+        unique = False
+        print(f"[ReminderStore] Unique (user_id, medicine_normalized) index not created: {e}")
+    return {"backfilled": backfilled, "deduplicated": deduplicated,
+            "missing": verify_indexes(), "unique": unique}
+
+
+def verify_indexes() -> list[str]:
+    """Names of expected indexes that are missing or have a different key pattern."""
+    existing = {name: [tuple(k) for k in info["key"]] for name, info in _col().index_information().items()}
+    return [name for name, keys in _INDEXES.items() if existing.get(name) != keys]
+
+
+def _plan_stages(plan: dict) -> list[tuple[str, str | None]]:
+    stages = [(plan.get("stage", "?"), plan.get("indexName"))]
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            stages += _plan_stages(child)
+    return stages
+
+
+def explain_queries(email: str = "plan@example.com", user_id: str = "plan_user",
+                    medicine: str = "plan-medicine") -> dict:
+    """Winning-plan stages of the store's lookups, e.g. {"by_email": [("FETCH", None), ("IXSCAN", "email_1")]}.
+
+    "due_confirm" is the fetch_reminders_by_keys query the tick runs for a
+    due minute's reminders. Needs a real mongod (explain is a server command).
+    """
+    col = _col()
+    key = {"user_id": user_id, "medicine_normalized": normalize_medicine(medicine)}
+    queries = {
+        "by_email": {"email": email.lower()},
+        "by_user_medicine": key,
+        "due_confirm": {"$or": [key, {**key, "user_id": user_id + "_2"}]},
+        "changed_since": {"updated_at": {"$gte": datetime.now(dt_tz.utc)}},
+    }
+    plans = {}
+    for name, query in queries.items():
+        explain = col.find(query).explain()
+        plans[name] = _plan_stages(explain["queryPlanner"]["winningPlan"])
+    return plans
+
+
+# ---------------------------------------------------------------------------
+# CRUD
+# ---------------------------------------------------------------------------
+
+def _reminder_key(user_id: str, medicine: str) -> dict:
+    """Filter matching the one reminder for (user_id, medicine)."""
+    return {"user_id": user_id, "medicine_normalized": normalize_medicine(medicine)}
+
+
+def _reminder_update(email: str, medicine: str, schedule: Recurrence | str, timezone: str) -> dict:
+    now = datetime.now(dt_tz.utc)
+    return {
+        "$set": {
+            "email": email.lower(),
+            "medicine": medicine.strip(),
+            **Recurrence.coerce(schedule).to_doc(),
+            "timezone": timezone,
+            "updated_at": now,
+        },
+        "$setOnInsert": {"created_at": now},
+    }
+
+
+def upsert_reminder(user_id: str, email: str, medicine: str,
+                    schedule: Recurrence | str, timezone: str) -> bool:
+    """Create or update the one reminder for (user_id, medicine). Returns True if it was new.
+
+    `schedule` is a Recurrence, or a single "HH:MM" for a once-daily reminder.
+    """
+    result = _col().update_one(
+        _reminder_key(user_id, medicine),
+        _reminder_update(email, medicine, schedule, timezone),
+        upsert=True,
+    )
+    return result.upserted_id is not None
+
+
+_RELOAD_FIELDS = {"_id": 0, "user_id": 1, "email": 1, "medicine": 1, "time": 1, "times": 1,
+                  "days": 1, "every_hours": 1, "timezone": 1}
+
+
+def count_reminders() -> int:
+    """Fast, metadata-based estimate of the number of stored reminders."""
+    return _col().estimated_document_count()
+
+
+def iter_reminder_batches(batch_size: int = 1000) -> Iterator[list[dict]]:
+    """Stream every reminder from a cursor, `batch_size` documents at a time.
+
+    Only the fields the scheduler needs are projected, so a reload never
+    holds more than one batch of documents in memory.
+    """
+    batch = []
+    for doc in _col().find({}, _RELOAD_FIELDS, batch_size=batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def fetch_reminders_changed_since(since: datetime) -> list[dict]:
+    """Reminders created or rescheduled at or after `since` (other instances' writes)."""
+    return list(_col().find({"updated_at": {"$gte": since}}, _RELOAD_FIELDS))
+
+
+def fetch_reminders_by_keys(keys: list[tuple[str, str]]) -> dict[tuple[str, str], dict]:
+    """Current documents for (user_id, medicine_normalized) keys; missing keys were deleted."""
+    found = {}
+    for i in range(0, len(keys), 500):
+        query = {"$or": [{"user_id": u, "medicine_normalized": m} for u, m in keys[i:i + 500]]}
+        for doc in _col().find(query, {**_RELOAD_FIELDS, "medicine_normalized": 1}):
+            found[(doc["user_id"], doc["medicine_normalized"])] = doc
+    return found
 
 
 def fetch_reminders_by_email(email: str) -> list[dict]:
     """Return all reminders belonging to a specific patient email."""
-    return list(_col().find(
-        {"email": email.lower()},
-        {"_id": 0}
-    ))
+    return list(_col().find({"email": email.lower()}, {"_id": 0}))
 
 
 def delete_reminder(user_id: str, medicine: str) -> bool:
     """Delete a reminder document. Returns True if a document was removed."""
-    result = _col().delete_one({
-        "user_id": user_id,
-        "medicine": re.compile(f"^{re.escape(medicine)}$", re.IGNORECASE),
-    })
+    result = _col().delete_one(_reminder_key(user_id, medicine))
     return result.deleted_count > 0
@@ -0,0 +1,76 @@
+"""Async reminder persistence for the agent tools, on pymongo's AsyncMongoClient.
+
+Same operations, filters and documents as reminder_store (which stays the
+blocking API for the scheduler threads), but awaited on the shared async
+client so a tool call yields the event loop instead of blocking a worker
+thread while MongoDB answers.
+
+Reads by email go through `reminder_cache`; the writes below keep it current,
+so writes to this collection should go through this module.
+"""
+
+from pymongo import UpdateOne
+
+from mongo_client import get_async_database
+from Reminder_agent.recurrence import Recurrence
+from Reminder_agent.reminder_cache import ReminderCache
+from Reminder_agent.reminder_store import _COLLECTION, _reminder_key, _reminder_update
+
+reminder_cache = ReminderCache()
+
+
+def _col():
+    """Return the reminders collection on the process-wide async client."""
+    return get_async_database()[_COLLECTION]
+
+
+async def upsert_reminder(user_id: str, email: str, medicine: str,
+                          schedule: Recurrence | str, timezone: str) -> bool:
+    """Create or update the one reminder for (user_id, medicine). Returns True if it was new."""
+    key = _reminder_key(user_id, medicine)
+    update = _reminder_update(email, medicine, schedule, timezone)
+    result = await _col().update_one(key, update, upsert=True)
+    created = result.upserted_id is not None
+    reminder_cache.write(email.lower(), {**key, **update["$set"],
+                                         **(update["$setOnInsert"] if created else {})})
+    return created
+
+
+async def upsert_reminders(user_id: str, email: str,
+                           entries: list[tuple[str, Recurrence | str, str]]) -> int:
+    """upsert_reminder() for several (medicine, schedule, timezone) in one bulk_write.
+
+    Returns how many reminders were new.
+    """
+    keys = [_reminder_key(user_id, medicine) for medicine, _, _ in entries]
+    updates = [_reminder_update(email, *entry) for entry in entries]
+    try:
+        result = await _col().bulk_write(
+            [UpdateOne(key, update, upsert=True) for key, update in zip(keys, updates)], ordered=False)
+    except Exception:
+        reminder_cache.invalidate(email.lower())   # some writes may have landed
+        raise
+    created = set(result.upserted_ids)           # positions of the new documents
+    for i, (key, update) in enumerate(zip(keys, updates)):
+        reminder_cache.write(email.lower(), {**key, **update["$set"],
+                                             **(update["$setOnInsert"] if i in created else {})})
+    return len(created)
+
+
+async def fetch_reminders_by_email(email: str) -> list[dict]:
+    """Return all reminders belonging to a specific patient email."""
+    return await reminder_cache.get(email.lower(), _fetch_reminders_by_email)
+
+
+async def _fetch_reminders_by_email(email: str) -> list[dict]:
+    return await _col().find({"email": email}, {"_id": 0}).to_list()
+
+
+async def delete_reminder(user_id: str, medicine: str) -> bool:
+    """Delete a reminder document. Returns True if a document was removed."""
+    key = _reminder_key(user_id, medicine)
+    doc = await _col().find_one_and_delete(key, projection={"_id": 0, "email": 1})
+    if doc is None:
+        return False
+    reminder_cache.discard(doc["email"], key["medicine_normalized"])
+    return True
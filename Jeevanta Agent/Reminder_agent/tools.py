@@ -1,90 +1,81 @@
-"""Agent tool functions for medication reminders — pure Python, no HTTP dependency."""
+"""Agent tool functions for medication reminders — pure Python, no HTTP dependency.
 
-import re
-from datetime import datetime
+The tools that touch MongoDB are coroutines (ADK awaits them) and use the
+async store, so a slow database never blocks the event loop or a thread.
+"""
 
-from Reminder_agent.reminder_store import (
-    insert_reminder,
+from Reminder_agent.recurrence import Recurrence, parse_schedule
+from Reminder_agent.reminder_index import check_timezone
+from Reminder_agent.reminder_store_async import (
+    upsert_reminder,
+    upsert_reminders,
     fetch_reminders_by_email,
     delete_reminder,
 )
-from Reminder_agent.reminder_scheduler import add_job, remove_job, list_jobs
+from Reminder_agent.reminder_scheduler import add_job, add_jobs, remove_job, list_jobs
 
 
 # ---------------------------------------------------------------------------
-# Internal helper
+# Internal helpers
 # ---------------------------------------------------------------------------
 
-def _to_24h(time_str: str) -> str | None:
-    """Convert any common time string to HH:MM (24-hour).
-
-    Accepts: '9 PM', '9:30 AM', '21:00', '9pm', '9:30pm'
-    """
-    t = time_str.strip()
-    for fmt in ("%I:%M %p", "%I %p", "%H:%M", "%H"):
-        try:
-            return datetime.strptime(t.upper(), fmt).strftime("%H:%M")
-        except ValueError:
-            continue
-    m = re.match(r"^(\d{1,2})(?::(\d{2}))?\s*(am|pm)$", t, re.IGNORECASE)
-    if m:
-        hour   = int(m.group(1))
-        minute = int(m.group(2) or 0)
-        suffix = m.group(3).lower()
-        if suffix == "pm" and hour != 12:
-            hour += 12
-        if suffix == "am" and hour == 12:
-            hour = 0
-        return f"{hour:02d}:{minute:02d}"
-    return None
-
-
 def _user_id(email: str) -> str:
     """Derive a stable user ID from an email address."""
     return email.strip().lower().replace("@", "_at_").replace(".", "_")
 
 
+def _summary(schedule: Recurrence, timezone: str) -> dict:
+    return {"schedule": schedule.describe(), "times": list(schedule.times), "timezone": timezone}
+
+
 # ---------------------------------------------------------------------------
 # Agent tools
 # ---------------------------------------------------------------------------
 
-def schedule_reminder(
+async def schedule_reminder(
     patient_name: str,
     email: str,
     medication_name: str,
     reminder_time: str,
     timezone: str = "Asia/Kolkata",
 ) -> dict:
-    print(f"[schedule_reminder] CALLED — patient={patient_name}, email={email}, med={medication_name}, time={reminder_time}")
-    """Schedule a daily medication reminder for a patient.
+    """Schedule a recurring medication reminder for a patient.
 
     Args:
         patient_name: The patient's full name.
-        email: Email address where the daily reminder will be sent.
+        email: Email address where the reminders will be sent.
         medication_name: Name of the medication (e.g. "Metformin 500mg").
-        reminder_time: Time for the daily reminder in any common format
-            (e.g. "8 AM", "9:30 PM", "21:00").
+        reminder_time: When to remind, as the patient said it: one time
+            ("8 AM", "21:00"), several doses ("8am and 8pm", "twice a day",
+            "every 6 hours", "every 8 hours from 7am") and optionally days
+            ("9 PM on weekdays", "8am mon, wed and fri").
         timezone: IANA timezone string. Defaults to "Asia/Kolkata".
 
     Returns:
         dict with keys: ok (bool), message (str).
     """
-    time_24h = _to_24h(reminder_time)
-    if not time_24h:
-        return {
-            "ok": False,
-            "message": f"Could not parse '{reminder_time}'. Use formats like '8 AM', '9:30 PM', or '21:00'.",
-        }
+    print(f"[schedule_reminder] CALLED — patient={patient_name}, email={email}, med={medication_name}, time={reminder_time}")
+    try:
+        schedule = parse_schedule(reminder_time)
+    except ValueError as e:
+        return {"ok": False, "message": str(e)}
 
     user_id = _user_id(email)
 
     try:
-        insert_reminder(user_id, email, medication_name, time_24h, timezone)
-        job_id = add_job(user_id, email, medication_name, time_24h, timezone)
+        check_timezone(timezone)
+    except ValueError as e:
+        return {"ok": False, "message": f"{e} Use an IANA name like 'Asia/Kolkata'."}
+
+    # Validated above, so add_job cannot fail after the DB write; the periodic
+    # reconcile pass repairs the index if the process dies in between.
+    try:
+        await upsert_reminder(user_id, email, medication_name, schedule, timezone)
+        job_id = add_job(user_id, email, medication_name, schedule, timezone)
         return {
             "ok": True,
             "message": (
-                f"Daily reminder set for {medication_name} at {time_24h} ({timezone}). "
+                f"Reminder set for {medication_name} at {schedule.describe()} ({timezone}). "
                 f"Reminders will be sent to {email}. Job ID: {job_id}"
             ),
         }
@@ -92,11 +83,78 @@ def schedule_reminder(
         return {"ok": False, "message": f"Failed to schedule reminder: {e}"}
 
 
-def cancel_reminder(
+async def schedule_reminders_bulk(
+    patient_name: str,
+    email: str,
+    medications: list[dict],
+    timezone: str = "Asia/Kolkata",
+) -> dict:
+    """Schedule recurring reminders for several medications in one call.
+
+    Use this instead of repeated schedule_reminder calls when the patient has
+    more than one medication (e.g. the current medications from MedAssist).
+    Nothing is scheduled unless every entry is valid.
+
+    Args:
+        patient_name: The patient's full name.
+        email: Email address where the reminders will be sent.
+        medications: One entry per medication, e.g.
+            [{"medication_name": "Metformin 500mg", "reminder_time": "8am and 8pm"},
+             {"medication_name": "Atorvastatin", "reminder_time": "21:00", "timezone": "Asia/Dubai"}].
+            "reminder_time" takes the same phrases as in schedule_reminder.
+            "timezone" is optional per entry and defaults to the timezone argument.
+        timezone: IANA timezone for entries without their own. Defaults to "Asia/Kolkata".
+
+    Returns:
+        dict with keys: ok (bool), message (str), scheduled (list of dicts) or errors (list of str).
+    """
+    print(f"[schedule_reminders_bulk] CALLED — patient={patient_name}, email={email}, count={len(medications)}")
+    entries, errors, seen = [], [], set()
+    for i, item in enumerate(medications, 1):
+        name = str(item.get("medication_name") or "").strip()
+        raw_time = str(item.get("reminder_time") or "")
+        tz = item.get("timezone") or timezone
+        if not name:
+            errors.append(f"Entry {i}: missing medication_name.")
+            continue
+        if name.lower() in seen:
+            errors.append(f"Entry {i}: {name} is listed more than once.")
+            continue
+        seen.add(name.lower())
+        try:
+            schedule = parse_schedule(raw_time)
+        except ValueError as e:
+            errors.append(f"{name}: {e}")
+            continue
+        try:
+            check_timezone(tz)
+        except ValueError as e:
+            errors.append(f"{name}: {e} Use an IANA name like 'Asia/Kolkata'.")
+            continue
+        entries.append((name, schedule, tz))
+    if errors or not entries:
+        return {"ok": False, "message": "No reminders were scheduled.",
+                "errors": errors or ["No medications given."]}
+
+    user_id = _user_id(email)
+    try:
+        await upsert_reminders(user_id, email, entries)
+        job_ids = add_jobs(user_id, email, entries)
+    except Exception as e:
+        return {"ok": False, "message": f"Failed to schedule reminders: {e}"}
+    return {
+        "ok": True,
+        "message": f"{len(entries)} reminder(s) set. Reminders will be sent to {email}.",
+        "scheduled": [{"medication": m, **_summary(s, tz), "job_id": j}
+                      for (m, s, tz), j in zip(entries, job_ids)],
+    }
+
+
+async def cancel_reminder(
     email: str,
     medication_name: str,
 ) -> dict:
-    """Cancel an active daily medication reminder.
+    """Cancel an active medication reminder (all of its doses).
 
     Args:
         email: The patient's email address used when the reminder was created.
@@ -107,28 +165,59 @@ def cancel_reminder(
     """
     user_id = _user_id(email)
 
-    removed_job = remove_job(user_id, medication_name)
-    removed_db  = delete_reminder(user_id, medication_name)
+    try:
+        removed_db  = await delete_reminder(user_id, medication_name)
+        removed_job = remove_job(user_id, medication_name)
+    except Exception as e:
+        return {"ok": False, "message": f"Failed to cancel reminder: {e}"}
 
     if removed_job or removed_db:
         return {"ok": True, "message": f"Reminder for {medication_name} has been cancelled."}
     return {"ok": False, "message": f"No active reminder found for {medication_name}."}
 
 
-def list_reminders() -> dict:
-    """List all currently scheduled medication reminders across all patients.
+# Page size cap for list_reminders — the whole result lands in the model's context.
+_LIST_MAX_LIMIT = 50
+
+
+def list_reminders(
+    email: str = "",
+    medication_name: str = "",
+    due_within_minutes: int = 0,
+    limit: int = 20,
+    cursor: str = "",
+    count_only: bool = False,
+) -> dict:
+    """List scheduled medication reminders, soonest first, one page at a time.
+
+    Args:
+        email: Only this patient's reminders (optional).
+        medication_name: Only reminders for this medication, any case (optional).
+        due_within_minutes: Only reminders firing in the next N minutes (0 = any time).
+        limit: Reminders per page (at most 50).
+        cursor: next_cursor from the previous call, to get the following page.
+        count_only: Return only the number of matching reminders.
 
     Returns:
-        dict with keys: ok (bool), count (int), reminders (list of dicts).
+        dict with keys: ok (bool), total (int, all matches), count (int, this page),
+        reminders (list of dicts), next_cursor (str, empty on the last page).
     """
     try:
-        jobs = list_jobs()
-        return {"ok": True, "count": len(jobs), "reminders": jobs}
+        page = list_jobs(
+            user_id=_user_id(email) if email else None,
+            medicine=medication_name or None,
+            due_within=due_within_minutes or None,
+            limit=max(1, min(limit, _LIST_MAX_LIMIT)),
+            cursor=cursor or None,
+            count_only=count_only,
+        )
+        return {"ok": True, "total": page["total"], "count": len(page["reminders"]),
+                "reminders": page["reminders"], "next_cursor": page["next_cursor"] or ""}
     except Exception as e:
         return {"ok": False, "message": str(e)}
 
 
-def get_patient_reminders(email: str) -> dict:
+async def get_patient_reminders(email: str) -> dict:
     """List all scheduled reminders for a specific patient.
 
     Args:
@@ -138,12 +227,11 @@ def get_patient_reminders(email: str) -> dict:
         dict with keys: ok (bool), count (int), reminders (list of dicts).
     """
     try:
-        docs = fetch_reminders_by_email(email)
+        docs = await fetch_reminders_by_email(email)
         reminders = [
             {
                 "medication": d["medicine"],
-                "time": d["time"],
-                "timezone": d.get("timezone", "Asia/Kolkata"),
+                **_summary(Recurrence.from_doc(d), d.get("timezone", "Asia/Kolkata")),
                 "email": d["email"],
             }
             for d in docs
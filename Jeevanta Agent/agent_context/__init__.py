@@ -0,0 +1,4 @@
+"""Shared request-shaping callbacks used by every Jeevanta agent."""
+
+from .history import compact_history, compaction_stats
+from .profile import AUTH_STATE_KEY, PROFILE_STATE_KEY, PatientProfile, inject_profile_context
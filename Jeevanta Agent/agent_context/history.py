@@ -0,0 +1,164 @@
+"""Conversation history compaction, run as a before_model_callback.
+
+Keeps the most recent HISTORY_RECENT_CONTENTS messages verbatim and folds
+everything older into one compact summary message at the front of the
+request. Two things are never summarised: the get_user_profile result and
+the MedAssist clinical report — they are pinned verbatim in that message.
+The whole request is then held under HISTORY_MAX_TOKENS (estimated).
+"""
+
+import json
+import os
+import threading
+
+from dotenv import load_dotenv
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+from google.genai import types
+
+load_dotenv()
+
+HISTORY_MAX_TOKENS      = int(os.getenv("HISTORY_MAX_TOKENS", "6000"))
+HISTORY_RECENT_CONTENTS = int(os.getenv("HISTORY_RECENT_CONTENTS", "12"))
+
+_MIN_RECENT        = 4
+_CHARS_PER_TOKEN   = 4      # rough estimate for English text
+_QUESTION_CHARS    = 100    # agent turns are mostly questions — keep them short
+_ANSWER_CHARS      = 300    # patient answers carry the clinical detail
+_PROFILE_TOOL      = "get_user_profile"
+_REPORT_MARKERS    = ("EMR SUMMARY", "HEALTH PREDICTIONS", "Your clinical summary is ready")
+
+_stats = {"requests": 0, "compacted": 0, "tokens_before": 0, "tokens_after": 0}
+_stats_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _part_chars(part: types.Part) -> int:
+    if part.text:
+        return len(part.text)
+    if part.function_call:
+        return len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+    if part.function_response:
+        return len(part.function_response.name or "") + len(json.dumps(part.function_response.response or {}, default=str))
+    return 0
+
+
+def estimate_tokens(contents: list[types.Content]) -> int:
+    return sum(_part_chars(p) for c in contents for p in (c.parts or [])) // _CHARS_PER_TOKEN
+
+
+def _text(content: types.Content) -> str:
+    return " ".join(p.text.strip() for p in (content.parts or []) if p.text and p.text.strip())
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _pinned(content: types.Content) -> list[str]:
+    """Verbatim blocks from this message that must survive compaction."""
+    blocks = []
+    for part in content.parts or []:
+        fr = part.function_response
+        if fr and fr.name == _PROFILE_TOOL:
+            blocks.append(f"{_PROFILE_TOOL} result: {json.dumps(fr.response, default=str)}")
+        elif part.text and f"`{_PROFILE_TOOL}`" in part.text and "returned result" in part.text:
+            blocks.append(part.text.strip())      # relayed from another agent
+        elif part.text and any(m in part.text for m in _REPORT_MARKERS):
+            blocks.append(part.text.strip())
+    return blocks
+
+
+def _summary_line(content: types.Content) -> str | None:
+    calls = [p.function_call.name for p in content.parts or [] if p.function_call]
+    if calls:
+        return f"- (tool call: {', '.join(calls)})"
+    if any(p.function_response for p in content.parts or []):
+        return None
+    text = _text(content)
+    if not text:
+        return None
+    if content.role == "user":
+        return f"- Patient: {_clip(text, _ANSWER_CHARS)}"
+    return f"- Assistant: {_clip(text, _QUESTION_CHARS)}"
+
+
+def _window_start(contents: list[types.Content], keep: int) -> int:
+    """First index of the verbatim window; never starts on an orphaned tool response."""
+    start = max(0, len(contents) - keep)
+    while start < len(contents) and any(p.function_response for p in contents[start].parts or []):
+        start += 1
+    return start
+
+
+def _summary_content(lines: list[str], pinned: list[str]) -> types.Content:
+    text = "[Earlier conversation — compacted]\n"
+    if lines:
+        text += "Summary of earlier turns:\n" + "\n".join(lines) + "\n"
+    if pinned:
+        text += "\nPinned context (verbatim):\n" + "\n\n".join(pinned) + "\n"
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def _compact(contents: list[types.Content], keep: int) -> list[types.Content]:
+    start = _window_start(contents, keep)
+    if start == 0:
+        if keep > _MIN_RECENT and estimate_tokens(contents) > HISTORY_MAX_TOKENS:
+            return _compact(contents, min(keep, len(contents)) - 2)
+        return contents
+    older, recent = contents[:start], contents[start:]
+    pinned, lines = [], []
+    for c in older:
+        blocks = _pinned(c)
+        if blocks:
+            pinned.extend(blocks)
+        elif line := _summary_line(c):
+            lines.append(line)
+
+    compacted = [_summary_content(lines, pinned)] + recent
+    # Over budget: shorten the window first, then drop the oldest summary lines.
+    while estimate_tokens(compacted) > HISTORY_MAX_TOKENS:
+        if keep > _MIN_RECENT:
+            return _compact(contents, keep - 2)
+        if not lines:
+            break
+        lines = lines[1:]
+        compacted = [_summary_content(lines, pinned)] + recent
+    return compacted
+
+
+# ---------------------------------------------------------------------------
+# Callback
+# ---------------------------------------------------------------------------
+
+def compact_history(callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+    """before_model_callback: rewrite llm_request.contents in place."""
+    contents = llm_request.contents or []
+    before = estimate_tokens(contents)
+    compacted = _compact(contents, HISTORY_RECENT_CONTENTS)
+    after = estimate_tokens(compacted) if compacted is not contents else before
+
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["tokens_before"] += before
+        _stats["tokens_after"] += after
+        if compacted is not contents:
+            _stats["compacted"] += 1
+
+    if compacted is not contents:
+        llm_request.contents = compacted
+        print(f"[HistoryCompactor] {callback_context.agent_name}: "
+              f"~{before} → ~{after} tokens ({len(contents)} → {len(compacted)} messages)")
+    return None
+
+
+def compaction_stats() -> dict:
+    """Totals since start-up, including estimated prompt tokens saved."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+    return stats
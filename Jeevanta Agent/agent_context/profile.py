@@ -0,0 +1,95 @@
+"""Typed patient profile kept in session state, and the callback that injects it.
+
+get_user_profile stores the profile once under PROFILE_STATE_KEY. Every agent
+then receives a one-line [PATIENT CONTEXT] block in its system instruction,
+listing only the fields that have a value, instead of re-reading the raw
+tool JSON from history.
+"""
+
+import re
+from dataclasses import asdict, dataclass, fields
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+
+PROFILE_STATE_KEY = "patient_profile"
+AUTH_STATE_KEY    = "auth"      # written by the login fast path in auth_flow.py
+
+# (attribute, profile API key, label in the context block, unit added to a bare number)
+_FIELDS = (
+    ("name",        "fullName",    "Name",       ""),
+    ("age",         "age",         "Age",        ""),
+    ("gender",      "gender",      "Gender",     ""),
+    ("dob",         "dob",         "DOB",        ""),
+    ("height",      "height",      "Height",     "cm"),
+    ("weight",      "weight",      "Weight",     "kg"),
+    ("blood_group", "bloodGroup",  "BloodGroup", ""),
+    ("email",       "email",       "Email",      ""),
+    ("phone",       "phoneNumber", "Phone",      ""),
+)
+
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _with_unit(value: str, unit: str) -> str:
+    """"170" -> "170cm"; values that already carry text ("170 cm", "5'7\"") pass through."""
+    return value + unit if unit and _NUMBER.fullmatch(value) else value
+
+
+def _clean(value) -> str:
+    if value is None:
+        return ""
+    text = str(value).strip()
+    return "" if text.lower() in ("null", "none", "n/a") else text
+
+
+@dataclass(frozen=True)
+class PatientProfile:
+    name: str = ""
+    age: str = ""
+    gender: str = ""
+    dob: str = ""
+    height: str = ""
+    weight: str = ""
+    blood_group: str = ""
+    email: str = ""
+    phone: str = ""
+
+    @classmethod
+    def from_api(cls, profile: dict) -> "PatientProfile":
+        """Build from the profile dict returned by the user profile service."""
+        return cls(**{attr: _clean(profile.get(key)) for attr, key, _, _ in _FIELDS})
+
+    @classmethod
+    def from_state(cls, state) -> "PatientProfile | None":
+        data = state.get(PROFILE_STATE_KEY)
+        if not data:
+            return None
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+    def to_state(self) -> dict:
+        """JSON-safe dict of the non-empty fields, for session state."""
+        return {k: v for k, v in asdict(self).items() if v}
+
+    def context_block(self) -> str:
+        values = asdict(self)
+        items = [f"{label}={_with_unit(values[attr], unit)}" for attr, _, label, unit in _FIELDS if values[attr]]
+        return "[PATIENT CONTEXT] " + " ".join(items) if items else ""
+
+
+def inject_profile_context(callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+    """before_model_callback: append the login status and patient context to the system instruction."""
+    lines = []
+    auth = callback_context.state.get(AUTH_STATE_KEY) or {}
+    if auth.get("stage") == "verified":
+        lines.append("[AUTHENTICATED] The user's phone number is already verified by OTP — "
+                     "do not ask for it or send another OTP.")
+    profile = PatientProfile.from_state(callback_context.state)
+    block = profile.context_block() if profile else ""
+    if block:
+        lines.append(block + "\nThese details are already known — never ask the patient for them again.")
+    if lines:
+        llm_request.append_instructions(lines)
+    return None
@@ -1,18 +1,21 @@
 """Jeevanta API Server — FastAPI wrapper around the Jeevanta ADK agent."""
 
 import asyncio
+import hmac
+import json
 import os
 import sys
 import uuid
-from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
 from google.genai import types as genai_types
 from pydantic import BaseModel
 
@@ -20,7 +23,25 @@ load_dotenv()
 
 sys.path.insert(0, str(Path(__file__).parent))
 
-from Jeevanta_agent.agent import root_agent
+import auth_flow
+from agent_context import compaction_stats
+from Jeevanta_agent import http_client
+from Jeevanta_agent.auth_tools import invalidate_user_profile, profile_cache
+from Jeevanta_agent.agent import build_root_agent
+from mongo_client import close_async_database, close_database
+from Reminder_agent.reminder_scheduler import (
+    dead_letters,
+    delivery_stats,
+    is_ready,
+    list_jobs,
+    reload_status,
+    scheduler_stats,
+    start_scheduler,
+    stop_scheduler,
+)
+from Reminder_agent.reminder_store_async import reminder_cache
+from session_manager import SessionManager
+from session_store import CachedSessionService, build_session_service
 
 # ---------------------------------------------------------------------------
 # ADK setup
@@ -30,24 +51,53 @@ APP_NAME    = "Jeevanta"
 HOST        = os.getenv("API_HOST", "0.0.0.0")
 PORT        = int(os.getenv("API_PORT", "8000"))
 
-session_service = InMemorySessionService()
-runner = Runner(
-    agent=root_agent,
-    app_name=APP_NAME,
-    session_service=session_service,
-)
-_executor = ThreadPoolExecutor(max_workers=10)
-
-# Maps user_id -> session_id so the server maintains continuity automatically.
-# Client can always send session_id="-1"; the server reuses the existing session.
-_user_sessions: dict[str, str] = {}
-
+# Max agent turns in flight per worker, and how long a request may wait for a
+# free slot before it is rejected with 503 instead of queueing indefinitely.
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "200"))
+CHAT_QUEUE_TIMEOUT   = float(os.getenv("CHAT_QUEUE_TIMEOUT", "10"))
+
+# Shared secret for the /admin routes and cache controls, which expose patients'
+# emails and medications. Unset = those routes are disabled.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Created in lifespan() — importing this module connects to nothing.
+session_service: CachedSessionService | None = None
+session_manager: SessionManager | None = None
+runner: Runner | None = None
+_chat_slots = asyncio.Semaphore(CHAT_MAX_CONCURRENCY)
+_stream_config = RunConfig(streaming_mode=StreamingMode.SSE)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the agent graph and open stores on startup; release them on shutdown."""
+    global session_service, session_manager, runner
+    # Backend chosen by SESSION_BACKEND (memory | sqlite | mongodb) — see session_store.
+    session_service = await asyncio.to_thread(build_session_service)
+    session_manager = SessionManager(session_service)
+    runner = Runner(
+        agent=build_root_agent(),
+        app_name=APP_NAME,
+        session_service=session_service,
+    )
+    session_manager.start()
+    # Returns at once; stored reminders stream in the background (see /ready).
+    start_scheduler()
+    try:
+        yield
+    finally:
+        await session_manager.stop()
+        await asyncio.to_thread(stop_scheduler)
+        await http_client.aclose()
+        await asyncio.to_thread(close_database)
+        await close_async_database()
 
 
 app = FastAPI(
     title="Jeevanta Health API",
     description="API gateway for the Jeevanta multi-agent health platform.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -78,45 +128,216 @@ class ChatResponse(BaseModel):
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _ensure_session(user_id: str, session_id: str) -> None:
-    existing = session_service.get_session_sync(
+async def _resolve_session_id(user_id: str, session_id: str | None) -> str:
+    # -1 / None / empty → reuse the user's most recent session, or start a new one.
+    # Client can always send session_id="-1"; continuity survives restarts and
+    # works across workers because the lookup goes through the session store.
+    if not session_id or session_id == "-1":
+        existing = await session_service.latest_session_id(APP_NAME, user_id)
+        return existing or str(uuid.uuid4())
+    return session_id
+
+
+async def _ensure_session(user_id: str, session_id: str) -> None:
+    existing = await session_service.get_session(
         app_name=APP_NAME, user_id=user_id, session_id=session_id
     )
     if existing is None:
-        session_service.create_session_sync(
+        await session_service.create_session(
             app_name=APP_NAME, user_id=user_id, session_id=session_id
         )
 
 
-def _run_agent(user_id: str, session_id: str, message: str) -> str:
-    _ensure_session(user_id, session_id)
-    content = genai_types.Content(
+async def _login_turn(user_id: str, session_id: str, message: str) -> str | None:
+    """Deterministic OTP login (AUTH_FAST_PATH); None once the user is verified."""
+    if not auth_flow.AUTH_FAST_PATH:
+        return None
+    await _ensure_session(user_id, session_id)
+    session = await session_service.get_session(
+        app_name=APP_NAME, user_id=user_id, session_id=session_id
+    )
+    return await auth_flow.handle(session_service, session, runner.agent.name, message)
+
+
+_BUSY_MESSAGE = "Server busy, please retry shortly."
+
+
+async def _acquire_chat_slot() -> None:
+    """Wait for a free agent slot, failing fast with 503 when the worker is saturated."""
+    try:
+        await asyncio.wait_for(_chat_slots.acquire(), timeout=CHAT_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail=_BUSY_MESSAGE)
+
+
+def _user_content(message: str) -> genai_types.Content:
+    return genai_types.Content(
         role="user",
         parts=[genai_types.Part(text=message)],
     )
+
+
+def _event_text(event) -> str:
+    if not event.content or not event.content.parts:
+        return ""
+    return "".join(part.text for part in event.content.parts if getattr(part, "text", None))
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _run_agent(user_id: str, session_id: str, message: str) -> str:
+    await _ensure_session(user_id, session_id)
     response_text = ""
-    for event in runner.run(
+    async for event in runner.run_async(
         user_id=user_id,
         session_id=session_id,
-        new_message=content,
+        new_message=_user_content(message),
     ):
-        if event.is_final_response() and event.content:
-            for part in event.content.parts:
-                if hasattr(part, "text") and part.text:
-                    response_text += part.text
+        if event.is_final_response():
+            response_text += _event_text(event)
     return response_text.strip()
 
 
+async def _stream_agent(user_id: str, session_id: str, message: str):
+    """Yield SSE frames for every chunk, tool call and transfer as the runner emits them.
+
+    Frames: session · text · tool_call · tool_result · transfer · done | error.
+    The chat slot is taken inside the generator so it is always released, even
+    if the client disconnects before the first frame.
+    """
+    yield _sse("session", {"user_id": user_id, "session_id": session_id})
+    try:
+        reply = await _login_turn(user_id, session_id, message)
+    except Exception as e:
+        yield _sse("error", {"message": str(e)})
+        return
+    if reply is not None:
+        yield _sse("text", {"agent": runner.agent.name, "text": reply})
+        yield _sse("done", {"response": reply})
+        return
+
+    try:
+        await _acquire_chat_slot()
+    except HTTPException:
+        yield _sse("error", {"message": _BUSY_MESSAGE})
+        return
+
+    try:
+        await _ensure_session(user_id, session_id)
+
+        response_text = ""
+        streamed = False   # partial chunks already sent for the current model turn
+        async for event in runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=_user_content(message),
+            run_config=_stream_config,
+        ):
+            text = _event_text(event)
+            if event.partial:
+                if text:
+                    streamed = True
+                    yield _sse("text", {"agent": event.author, "text": text})
+                continue
+
+            for call in event.get_function_calls():
+                yield _sse("tool_call", {"agent": event.author, "id": call.id, "name": call.name})
+            for resp in event.get_function_responses():
+                yield _sse("tool_result", {"agent": event.author, "id": resp.id, "name": resp.name})
+            if event.actions and event.actions.transfer_to_agent:
+                yield _sse("transfer", {"from": event.author, "to": event.actions.transfer_to_agent})
+
+            if event.is_final_response() and text:
+                response_text += text
+                if not streamed:   # model answered without partial chunks
+                    yield _sse("text", {"agent": event.author, "text": text})
+            streamed = False
+
+        yield _sse("done", {"response": response_text.strip()})
+    except Exception as e:
+        yield _sse("error", {"message": str(e)})
+    finally:
+        _chat_slots.release()
+
+
 # ---------------------------------------------------------------------------
 # Routes
 # ---------------------------------------------------------------------------
 
+async def require_admin(authorization: str = Header(default="")) -> None:
+    """Allow the request only with `Authorization: Bearer <ADMIN_TOKEN>`; 404 when no token is configured."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Admin token required.",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
 @app.get("/health", tags=["System"])
 async def health():
-    """Check that the API server is running."""
+    """Liveness probe — the process is up and serving requests."""
     return {"ok": True, "agent": APP_NAME, "status": "healthy"}
 
 
+@app.get("/ready", tags=["System"])
+async def ready():
+    """Readiness probe — 503 until persisted reminders are loaded into the scheduler.
+
+    /health only says the process is alive; route traffic on /ready.
+    """
+    status = reload_status()
+    if not is_ready():
+        return JSONResponse(status_code=503, content={"ok": False, "status": "loading", "reminders": status})
+    return {"ok": True, "status": "ready", "reminders": status}
+
+
+@app.get("/metrics", tags=["System"])
+async def metrics():
+    """Runtime counters for outbound HTTP pools, retries, breakers and caches."""
+    return {
+        "ok": True,
+        "http": http_client.metrics(),
+        "profile_cache": profile_cache.stats(),
+        "history": compaction_stats(),
+        "auth_fast_path": auth_flow.stats(),
+        "email": await asyncio.to_thread(delivery_stats),
+        "reminders": scheduler_stats(),
+        "reminder_cache": reminder_cache.stats(),
+    }
+
+
+@app.get("/admin/sessions", tags=["System"], dependencies=[Depends(require_admin)])
+async def session_stats():
+    """Cached session count, approximate memory use and eviction totals."""
+    return {"ok": True, **session_manager.report()}
+
+
+@app.get("/admin/reminders", tags=["System"], dependencies=[Depends(require_admin)])
+async def scheduled_reminders(user_id: str | None = None, medication: str | None = None,
+                              due_within: int | None = None, limit: int = 100,
+                              cursor: str | None = None, count_only: bool = False):
+    """Scheduled reminders in next-run order, filtered and paginated from the in-memory index.
+
+    Pass `next_cursor` back as `cursor` for the following page; `count_only=true`
+    returns just the total.
+    """
+    try:
+        page = list_jobs(user_id=user_id, medicine=medication, due_within=due_within,
+                         limit=max(1, min(limit, 1000)), cursor=cursor, count_only=count_only)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ok": True, **page}
+
+
+@app.get("/admin/reminders/dead-letters", tags=["System"], dependencies=[Depends(require_admin)])
+async def reminder_dead_letters(limit: int = 100):
+    """Reminder emails that exhausted their retries or were rejected permanently."""
+    return {"ok": True, "dead_letters": await asyncio.to_thread(dead_letters, limit)}
+
+
 @app.post("/chat", response_model=ChatResponse, tags=["Agent"])
 async def chat(req: ChatRequest):
     """Send a message to the Jeevanta agent and receive a response.
@@ -127,23 +348,21 @@ async def chat(req: ChatRequest):
       message to continue the same conversation.
     - **message**: The user's message text.
     """
-    # -1 / None / empty → look up or create a session for this user
-    if not req.session_id or req.session_id == "-1":
-        if req.user_id in _user_sessions:
-            session_id = _user_sessions[req.user_id]   # reuse existing
-        else:
-            session_id = str(uuid.uuid4())             # brand new session
-            _user_sessions[req.user_id] = session_id
-    else:
-        session_id = req.session_id
-        _user_sessions[req.user_id] = session_id       # register if client provides one
-    loop = asyncio.get_event_loop()
+    session_id = await _resolve_session_id(req.user_id, req.session_id)
     try:
-        response = await loop.run_in_executor(
-            _executor, _run_agent, req.user_id, session_id, req.message
-        )
+        reply = await _login_turn(req.user_id, session_id, req.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if reply is not None:
+        return ChatResponse(ok=True, user_id=req.user_id, session_id=session_id, response=reply)
+
+    await _acquire_chat_slot()
+    try:
+        response = await _run_agent(req.user_id, session_id, req.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        _chat_slots.release()
 
     return ChatResponse(
         ok=True,
@@ -153,19 +372,48 @@ async def chat(req: ChatRequest):
     )
 
 
+@app.post("/chat/stream", tags=["Agent"])
+async def chat_stream(req: ChatRequest):
+    """Stream the agent's reply as Server-Sent Events while the turn is running.
+
+    Takes the same body as `/chat`. Events, each with a JSON `data` payload:
+
+    - **session**: `{user_id, session_id}` — sent first; store and reuse `session_id`.
+    - **text**: `{agent, text}` — a chunk of the reply; append chunks in order.
+    - **tool_call** / **tool_result**: `{agent, id, name}` — a tool started / finished.
+    - **transfer**: `{from, to}` — the conversation moved to another agent.
+    - **done**: `{response}` — the full reply, same as `/chat` would return.
+    - **error**: `{message}` — the turn failed; no `done` follows.
+    """
+    if _chat_slots.locked():
+        raise HTTPException(status_code=503, detail=_BUSY_MESSAGE)
+    session_id = await _resolve_session_id(req.user_id, req.session_id)
+    return StreamingResponse(
+        _stream_agent(req.user_id, session_id, req.message),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.delete("/session/{user_id}/{session_id}", tags=["Session"])
 async def clear_session(user_id: str, session_id: str):
     """Delete a conversation session, clearing all history."""
     try:
-        session_service.delete_session_sync(
+        await session_service.delete_session(
             app_name=APP_NAME, user_id=user_id, session_id=session_id
         )
-        _user_sessions.pop(user_id, None)
         return {"ok": True, "message": f"Session {session_id} deleted."}
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 
+@app.delete("/profile-cache/{phone_number}", tags=["Session"], dependencies=[Depends(require_admin)])
+async def clear_cached_profile(phone_number: str):
+    """Drop a cached user profile so the next login re-fetches it from the backend."""
+    await invalidate_user_profile(phone_number)
+    return {"ok": True, "message": f"Cached profile for {phone_number} cleared."}
+
+
 # ---------------------------------------------------------------------------
 # Entry point
 # ---------------------------------------------------------------------------
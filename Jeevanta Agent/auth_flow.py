@@ -0,0 +1,193 @@
+"""Deterministic login front-end for the Jeevanta API.
+
+Phase 1 of the root agent (collect name + phone → send_otp → verify_otp) is a
+fixed state machine, so with AUTH_FAST_PATH=true the API runs it here instead
+of through the LLM. Messages are parsed with plain validation, auth_tools is
+called directly, and every turn is written to the session as ordinary events
+so the agent sees the full conversation once it takes over. The agent graph
+is only invoked after the phone number has been verified.
+
+Login state lives in session state under AUTH_STATE_KEY:
+    {"stage": "need_contact" | "otp_sent" | "verified",
+     "name": str, "phone": str, "attempts": int}
+"""
+
+import os
+import re
+import threading
+import time
+import uuid
+
+from dotenv import load_dotenv
+from google.adk.events import Event, EventActions
+from google.adk.sessions import BaseSessionService, Session
+from google.genai import types
+
+from agent_context import AUTH_STATE_KEY, PROFILE_STATE_KEY, PatientProfile
+from Jeevanta_agent.auth_tools import load_user_profile, send_otp, verify_otp
+
+load_dotenv()
+
+AUTH_FAST_PATH            = os.getenv("AUTH_FAST_PATH", "false").lower() == "true"
+AUTH_DEFAULT_COUNTRY_CODE = os.getenv("AUTH_DEFAULT_COUNTRY_CODE", "+91")
+AUTH_MAX_OTP_ATTEMPTS     = int(os.getenv("AUTH_MAX_OTP_ATTEMPTS", "3"))
+
+_PHONE_RE  = re.compile(r"(\+?\d[\d\s\-()]{8,16}\d)")
+_OTP_RE    = re.compile(r"^\D*(\d{4,8})\D*$")
+_NAME_FILLER = re.compile(
+    r"\b(hi|hello|hey|my|name|is|i am|i'm|im|this is|phone|number|mobile|no|and|it's|its)\b[:.,]?",
+    re.IGNORECASE,
+)
+_RESEND_RE = re.compile(r"\b(resend|send again|didn'?t (get|receive))\b", re.IGNORECASE)
+
+_WELCOME = (
+    "Welcome to Jeevanta! Before we begin, I need to verify your identity.\n"
+    "Could you please share your full name and phone number "
+    "(with country code, e.g. +91XXXXXXXXXX)?"
+)
+
+_stats = {"turns": 0, "otp_sent": 0, "verified": 0, "failed": 0, "handed_to_agent": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+
+def parse_phone(text: str) -> str | None:
+    """Return the phone number in text as +<digits>, or None if there is no valid one."""
+    match = _PHONE_RE.search(text)
+    if not match:
+        return None
+    raw = match.group(1)
+    digits = re.sub(r"\D", "", raw)
+    if raw.startswith("+"):
+        phone = "+" + digits
+    elif len(digits) == 10:
+        phone = AUTH_DEFAULT_COUNTRY_CODE + digits
+    else:
+        phone = "+" + digits
+    return phone if 11 <= len(phone) <= 16 else None
+
+
+def parse_name(text: str) -> str:
+    """Best-effort name from a message like "I'm Asha Rao, +91 98765 43210"."""
+    text = _PHONE_RE.sub(" ", text)
+    text = _NAME_FILLER.sub(" ", text)
+    words = [w for w in re.split(r"[\s,;:.!]+", text) if w.isalpha()]
+    return " ".join(w.capitalize() if w.islower() else w for w in words[:4])
+
+
+def parse_otp(text: str) -> str | None:
+    match = _OTP_RE.match(text.strip())
+    return match.group(1) if match else None
+
+
+# ---------------------------------------------------------------------------
+# State machine
+# ---------------------------------------------------------------------------
+
+async def _step(auth: dict, message: str) -> tuple[str, dict, dict]:
+    """Advance the login state for one user message.
+
+    Returns (reply, new auth state, extra state delta).
+    """
+    auth = dict(auth)
+    extra: dict = {}
+    phone = parse_phone(message)
+
+    if auth["stage"] == "otp_sent" and not phone:
+        otp = parse_otp(message)
+        if otp is None:
+            if _RESEND_RE.search(message):
+                phone = auth["phone"]
+            else:
+                return (f"Please enter the OTP sent to {auth['phone']} "
+                        "(or type \"resend\" to get a new one)."), auth, extra
+        else:
+            result = await verify_otp(auth["phone"], otp)
+            if not result.get("verified"):
+                auth["attempts"] = auth.get("attempts", 0) + 1
+                _count("failed")
+                if auth["attempts"] >= AUTH_MAX_OTP_ATTEMPTS:
+                    return ("Too many incorrect attempts. Please restart by sharing "
+                            "your name and phone number again."), {"stage": "need_contact"}, extra
+                left = AUTH_MAX_OTP_ATTEMPTS - auth["attempts"]
+                return f"{result.get('message', 'Incorrect OTP.')} ({left} attempt(s) left)", auth, extra
+
+            _count("verified")
+            auth = {"stage": "verified", "name": auth.get("name", ""), "phone": auth["phone"],
+                    "verified_at": time.time()}
+            profile = await load_user_profile(auth["phone"])
+            name = auth["name"]
+            if profile.get("ok"):
+                patient = PatientProfile.from_api(profile["profile"])
+                extra[PROFILE_STATE_KEY] = patient.to_state()
+                name = patient.name or name
+            greeting = f"Great, {name}! " if name else "Great! "
+            return (greeting + "You're all set. What's been bothering you lately, "
+                    "or how can our health team help you today?"), auth, extra
+
+    # need_contact (or a new phone number mid-login)
+    phone = phone or auth.get("phone")
+    if not phone:
+        return _WELCOME, {"stage": "need_contact"}, extra
+    name = parse_name(message) or auth.get("name", "")
+    if not name:
+        return "Thanks! Could you also share your full name?", {"stage": "need_contact", "phone": phone}, extra
+
+    result = await send_otp(name, phone)
+    if not result.get("ok"):
+        return (f"{result.get('message', 'Failed to send OTP.')} Please try again."), \
+            {"stage": "need_contact", "name": name, "phone": phone}, extra
+    _count("otp_sent")
+    return "An OTP has been sent to your phone. Please enter it here.", \
+        {"stage": "otp_sent", "name": name, "phone": phone, "attempts": 0}, extra
+
+
+async def _append_turn(service: BaseSessionService, session: Session, author: str,
+                       message: str, reply: str, state_delta: dict) -> None:
+    invocation_id = f"auth-{uuid.uuid4()}"
+    await service.append_event(session, Event(
+        invocation_id=invocation_id, author="user",
+        content=types.Content(role="user", parts=[types.Part(text=message)]),
+    ))
+    await service.append_event(session, Event(
+        invocation_id=invocation_id, author=author,
+        content=types.Content(role="model", parts=[types.Part(text=reply)]),
+        actions=EventActions(state_delta=state_delta),
+    ))
+
+
+async def handle(service: BaseSessionService, session: Session, author: str, message: str) -> str | None:
+    """Run one login turn without the LLM.
+
+    Returns the reply to send, or None when the user is already verified (or
+    the fast path is off) and the message should go to the agent graph.
+    """
+    if not AUTH_FAST_PATH:
+        return None
+    auth = session.state.get(AUTH_STATE_KEY)
+    if auth is None:
+        # Sessions that logged in through the agent itself carry a profile already.
+        if session.state.get(PROFILE_STATE_KEY):
+            return None
+        auth = {"stage": "need_contact"}
+    if auth.get("stage") == "verified":
+        _count("handed_to_agent")
+        return None
+
+    _count("turns")
+    reply, auth, extra = await _step(auth, message)
+    await _append_turn(service, session, author, message, reply, {AUTH_STATE_KEY: auth, **extra})
+    return reply
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return {"enabled": AUTH_FAST_PATH, **_stats}
@@ -0,0 +1,108 @@
+"""Cost of building reminder emails: per-send MIME rendering vs the cached bodies.
+
+Builds `messages` ready-to-send reminders spread over `distinct` reminder
+contents (a real day sends each reminder once, so repeats come from retries,
+digests and following days while the body stays cached):
+
+  legacy      — the old path: f-string HTML, MIMEMultipart, as_string() per send
+  uncached    — compiled templates + hand-built MIME, cache disabled (every send renders)
+  cached      — MessageCache: render once per content, then only per-send headers
+
+    python benchmarks/bench_email_render.py [messages=100000] [distinct=10000]
+"""
+
+import sys
+import time
+import tracemalloc
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Reminder_agent.email_templates import MessageCache
+
+SENDER = "reminders@example.com"
+
+
+def _legacy_html(medicine: str, time_str: str, timezone: str) -> str:
+    return f"""
+    <html>
+    <body style="font-family:Arial,sans-serif;color:#333;max-width:600px;margin:auto">
+      <div style="background:#198754;padding:20px;border-radius:8px 8px 0 0">
+        <h2 style="color:white;margin:0">&#128138; Medication Reminder</h2>
+      </div>
+      <div style="border:1px solid #ddd;padding:24px;border-radius:0 0 8px 8px">
+        <p>This is your scheduled reminder to take your medication.</p>
+        <table style="width:100%;border-collapse:collapse;margin:16px 0">
+          <tr>
+            <td style="padding:8px;border:1px solid #ddd;background:#f8f9fa"><b>Medication</b></td>
+            <td style="padding:8px;border:1px solid #ddd">{medicine}</td>
+          </tr>
+          <tr>
+            <td style="padding:8px;border:1px solid #ddd;background:#f8f9fa"><b>Scheduled Time</b></td>
+            <td style="padding:8px;border:1px solid #ddd">{time_str} ({timezone})</td>
+          </tr>
+        </table>
+        <p style="color:#888;font-size:12px">
+          Sent by Jeevanta &middot; Reply to your health assistant to cancel or modify reminders.
+        </p>
+      </div>
+    </body>
+    </html>
+    """
+
+
+def _legacy(to_email: str, item: dict) -> bytes:
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = f"Reminder: Take {item['medicine']} now"
+    msg["From"]    = f"Jeevanta Reminders <{SENDER}>"
+    msg["To"]      = to_email
+    msg.attach(MIMEText(_legacy_html(item["medicine"], item["time"], item["timezone"]), "html"))
+    return msg.as_string().encode()
+
+
+def _workload(messages: int, distinct: int) -> list[tuple[str, list[dict]]]:
+    zones = ["Asia/Kolkata", "UTC", "Europe/Berlin", "America/New_York"]
+    contents = [[{"medicine": f"Medicine {i} 500mg", "time": f"{i % 24:02d}:{i % 60:02d}",
+                  "timezone": zones[i % len(zones)]}] for i in range(distinct)]
+    return [(f"patient{i % distinct}@example.com", contents[i % distinct]) for i in range(messages)]
+
+
+def _run(name: str, build, work) -> None:
+    started = time.perf_counter()
+    size = 0
+    for to_email, items in work:
+        size += len(build(to_email, items))
+    seconds = time.perf_counter() - started
+    print(f"{name:9s} {len(work):8,d} msgs  {seconds:7.2f}s  {seconds / len(work) * 1e6:7.1f}µs/msg  "
+          f"avg {size // len(work):,d} bytes")
+
+
+def _cache_memory(work, distinct: int) -> float:
+    """MB held by a cache filled with every distinct body (measured separately; tracing is slow)."""
+    tracemalloc.start()
+    cache = MessageCache(SENDER, max_entries=distinct)
+    for to_email, items in work[:distinct]:
+        cache.message(to_email, items)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / 1e6
+
+
+def main() -> None:
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    work = _workload(messages, distinct)
+    print(f"{messages:,d} messages over {distinct:,d} distinct reminders")
+
+    _run("legacy", lambda to, items: _legacy(to, items[0]), work)
+    uncached = MessageCache(SENDER, max_entries=0)
+    _run("uncached", lambda to, items: uncached.message(to, items).data, work)
+    cached = MessageCache(SENDER, max_entries=distinct)
+    _run("cached", lambda to, items: cached.message(to, items).data, work)
+    print(f"cache     {cached.stats()}  ~{_cache_memory(work, distinct):.1f}MB for {distinct:,d} bodies")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Cold import time of a module, and which imports dominate it.
+
+Each run is a fresh interpreter. Also reports how many threads the import
+left running — importing api_server or an agent package should start none
+(the scheduler, session sweeper and DB clients start in the FastAPI lifespan).
+Exits 1 if the median exceeds `budget_ms`, so it can guard cold start in CI.
+
+    python benchmarks/bench_import_time.py [module=api_server] [budget_ms=0 (no limit)] [runs=5]
+"""
+
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = """
+import sys, threading, time
+started = time.perf_counter()
+import {module}
+print(f"{{(time.perf_counter() - started) * 1000:.1f}} {{threading.active_count() - 1}}")
+"""
+
+
+def _run(module: str) -> tuple[float, int]:
+    out = subprocess.run([sys.executable, "-c", CHILD.format(module=module)], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stdout.split("\n")
+    ms, threads = out[-2].split()
+    return float(ms), int(threads)
+
+
+def _top_imports(module: str, n: int = 12) -> list[tuple[int, str]]:
+    """Largest direct imports of `module` by cumulative time (from `python -X importtime`)."""
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:                          # imported directly by `module`
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+def main() -> int:
+    module = sys.argv[1] if len(sys.argv) > 1 else "api_server"
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    runs = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    results = [_run(module) for _ in range(runs)]
+    median = statistics.median(ms for ms, _ in results)
+    threads = max(t for _, t in results)
+    print(f"import {module}: median={median:.0f}ms min={min(ms for ms, _ in results):.0f}ms "
+          f"({runs} runs), background threads after import={threads}")
+    for cumulative, name in _top_imports(module):
+        print(f"  {cumulative / 1000:8.1f}ms  {name}")
+    if budget and median > budget:
+        print(f"over budget: {median:.0f}ms > {budget:.0f}ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
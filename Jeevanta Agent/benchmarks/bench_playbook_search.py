@@ -0,0 +1,60 @@
+"""Lookup latency of the local Playbook.txt index (BM25, and hybrid if numpy is installed).
+
+    python benchmarks/bench_playbook_search.py [iterations]
+"""
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from MedAssist_agent.playbook_index import PLAYBOOK_PATH, PlaybookIndex, np
+
+QUERIES = [
+    "sudden worst headache of my life",
+    "room spinning when I roll over in bed",
+    "chest pain spreading to left arm with sweating",
+    "always thirsty and urinating a lot at night",
+    "burning pain when passing urine",
+    "can't fall asleep and wake up tired",
+    "joint swollen hot and red with fever",
+    "low mood no interest in anything for weeks",
+]
+
+
+def _bench(index: PlaybookIndex, iterations: int) -> dict:
+    samples = []
+    for _ in range(iterations):
+        for q in QUERIES:
+            started = time.perf_counter()
+            index.search(q, 3)
+            samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return {
+        "queries": len(samples),
+        "mean_us": round(statistics.fmean(samples), 1),
+        "p50_us": round(samples[len(samples) // 2], 1),
+        "p99_us": round(samples[int(len(samples) * 0.99)], 1),
+    }
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        modes = [("bm25", False)] + ([("hybrid", True)] if np is not None else [])
+        for name, embeddings in modes:
+            index = PlaybookIndex(PLAYBOOK_PATH, Path(tmp) / name, embeddings=embeddings)
+            cold = index.build()
+            warm = PlaybookIndex(PLAYBOOK_PATH, Path(tmp) / name, embeddings=embeddings).build()
+            print(f"{name:7s} build cold={cold['duration_ms']}ms warm={warm['duration_ms']}ms "
+                  f"({warm['reused']}/{warm['chunks']} chunks reused)")
+            print(f"{name:7s} search {_bench(index, iterations)}")
+        if np is None:
+            print("hybrid  skipped (numpy not installed)")
+
+
+if __name__ == "__main__":
+    main()
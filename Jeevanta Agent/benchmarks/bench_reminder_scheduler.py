@@ -0,0 +1,122 @@
+"""Memory and per-minute tick cost: one APScheduler CronTrigger job per reminder
+versus the UTC minute-bucket ReminderIndex.
+
+Reminders are spread evenly over the day and a handful of timezones. The
+"tick" is the work done when a minute comes due, without the enqueue itself:
+  - apscheduler — get_due_jobs() plus computing and storing every due job's
+                  next fire time (what BackgroundScheduler._process_jobs does).
+  - index       — reading the due bucket and building the delivery payloads.
+
+APScheduler's memory job store keeps a sorted list, so building it is
+quadratic; sizes above `apscheduler_max` (default 100000) skip that side.
+
+    python benchmarks/bench_reminder_scheduler.py [sizes] [apscheduler_max]
+    python benchmarks/bench_reminder_scheduler.py 10000,100000,1000000 100000
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone as dt_tz
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from Reminder_agent.reminder_index import ReminderIndex, minute_of_day
+
+ZONES = ["Asia/Kolkata", "UTC", "Europe/London", "America/New_York", "Asia/Singapore"]
+TICKS = 20
+
+
+def _reminders(n: int):
+    for i in range(n):
+        local = (i * 7) % 1440
+        yield (f"user{i}:medicine{i % 50}", f"user{i}", f"user{i}@example.com",
+               f"Medicine{i % 50}", f"{local // 60:02d}:{local % 60:02d}", ZONES[i % len(ZONES)])
+
+
+def _noop(*args) -> None:
+    pass
+
+
+def _measure(build) -> tuple[object, float, float]:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    obj = build()
+    seconds = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, seconds, current / 2**20
+
+
+def _build_apscheduler(n: int) -> BackgroundScheduler:
+    scheduler = BackgroundScheduler()
+    scheduler.start(paused=True)
+    for job_id, _, email, medicine, hhmm, tz in _reminders(n):
+        hour, minute = map(int, hhmm.split(":"))
+        scheduler.add_job(_noop, CronTrigger(hour=hour, minute=minute, timezone=tz),
+                          id=job_id, args=[job_id, email, medicine, hhmm, tz])
+    return scheduler
+
+
+def _build_index(n: int) -> ReminderIndex:
+    index = ReminderIndex()
+    for reminder in _reminders(n):
+        index.upsert(*reminder)
+    return index
+
+
+def _tick_apscheduler(scheduler: BackgroundScheduler) -> tuple[float, int]:
+    store = scheduler._lookup_jobstore("default")
+    now = store.get_next_run_time()
+    started = time.perf_counter()
+    due = store.get_due_jobs(now)
+    for job in due:
+        run_times = job._get_run_times(now)
+        next_run = job.trigger.get_next_fire_time(run_times[-1], now)
+        job._modify(next_run_time=next_run)
+        store.update_job(job)
+    return time.perf_counter() - started, len(due)
+
+
+def _tick_index(index: ReminderIndex, epoch: float) -> tuple[float, int]:
+    started = time.perf_counter()
+    minute = minute_of_day(epoch)
+    tasks = [(r.job_id, r.payload(minute)) for r in index.due(minute, at=epoch)]
+    return time.perf_counter() - started, len(tasks)
+
+
+def _ms(samples: list[float]) -> str:
+    samples = sorted(samples)
+    return f"p50={samples[len(samples) // 2] * 1000:.2f}ms max={samples[-1] * 1000:.2f}ms"
+
+
+def main() -> None:
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [10_000, 100_000, 1_000_000]
+    apscheduler_max = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    start = datetime.now(dt_tz.utc).replace(second=0, microsecond=0)
+    for n in sizes:
+        index, build_s, mem_mb = _measure(lambda: _build_index(n))
+        ticks = [_tick_index(index, (start + timedelta(minutes=m)).timestamp()) for m in range(TICKS)]
+        print(f"{n:>9,} index        build={build_s:7.2f}s  mem={mem_mb:8.1f}MB  "
+              f"tick {_ms([t for t, _ in ticks])} due/min≈{ticks[0][1]}")
+        del index
+
+        if n > apscheduler_max:
+            print(f"{n:>9,} apscheduler  skipped (above apscheduler_max={apscheduler_max:,})")
+            continue
+        scheduler, build_s, mem_mb = _measure(lambda: _build_apscheduler(n))
+        ticks = [_tick_apscheduler(scheduler) for _ in range(TICKS)]
+        print(f"{n:>9,} apscheduler  build={build_s:7.2f}s  mem={mem_mb:8.1f}MB  "
+              f"tick {_ms([t for t, _ in ticks])} due/min≈{ticks[0][1]}")
+        scheduler.shutdown(wait=False)
+        del scheduler
+
+
+if __name__ == "__main__":
+    main()
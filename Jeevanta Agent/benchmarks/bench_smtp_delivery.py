@@ -0,0 +1,98 @@
+"""Reminder email throughput against a local SMTP stand-in (needs `aiosmtpd`).
+
+Compares the old one-connection-per-message path with SmtpPool.send_batch
+and AsyncSmtpPool.send_batch (if `aiosmtplib` is installed). The stand-in has
+no TLS or AUTH, so it understates the per-connection cost of a real server —
+against Gmail every avoided connection also saves a STARTTLS handshake and a
+login.
+
+    python benchmarks/bench_smtp_delivery.py [messages] [pool_size]
+"""
+
+import asyncio
+import smtplib
+import sys
+import time
+from email.mime.text import MIMEText
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiosmtpd.controller import Controller
+
+from Reminder_agent.email_delivery import AsyncSmtpPool, SmtpPool, aiosmtplib
+
+HOST, PORT = "127.0.0.1", 8025
+
+
+class _CountingHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def _messages(n: int) -> list[MIMEText]:
+    msgs = []
+    for i in range(n):
+        msg = MIMEText(f"<p>Take medicine #{i}</p>", "html")
+        msg["Subject"] = "Reminder"
+        msg["From"] = "reminders@example.com"
+        msg["To"] = f"patient{i}@example.com"
+        msgs.append(msg)
+    return msgs
+
+
+def _one_connection_per_message(msgs) -> None:
+    for msg in msgs:
+        with smtplib.SMTP(HOST, PORT) as server:
+            server.ehlo()
+            server.send_message(msg)
+
+
+def _report(name: str, n: int, seconds: float, extra: str = "") -> None:
+    print(f"{name:26s} {n:6d} msgs  {seconds:7.2f}s  {n / seconds:8.0f} msg/s  {extra}")
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    handler = _CountingHandler()
+    controller = Controller(handler, hostname=HOST, port=PORT)
+    controller.start()
+    try:
+        msgs = _messages(n)
+
+        started = time.perf_counter()
+        _one_connection_per_message(msgs)
+        _report("connection per message", n, time.perf_counter() - started)
+
+        pool = SmtpPool(HOST, PORT, "", "", size=size, starttls=False, max_messages=10_000)
+        started = time.perf_counter()
+        result = pool.send_batch(msgs)
+        _report(f"SmtpPool(size={size})", result["sent"], time.perf_counter() - started,
+                f"connects={pool.stats()['connects']}")
+        pool.close()
+
+        if aiosmtplib is not None:
+            async def run_async():
+                apool = AsyncSmtpPool(HOST, PORT, "", "", size=size, starttls=False, max_messages=10_000)
+                started = time.perf_counter()
+                result = await apool.send_batch(msgs)
+                elapsed = time.perf_counter() - started
+                await apool.close()
+                return result, elapsed, apool.stats()
+            result, elapsed, stats = asyncio.run(run_async())
+            _report(f"AsyncSmtpPool(size={size})", result["sent"], elapsed, f"connects={stats['connects']}")
+        else:
+            print("AsyncSmtpPool skipped (aiosmtplib not installed)")
+
+        print(f"server received {handler.received} messages")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""End-to-end check that reminders fire exactly once across several instances.
+
+Needs a local mongod (MONGODB_URI) and `aiosmtpd`. Seeds reminders due two
+minutes from now into a scratch database, starts N scheduler processes with
+REMINDER_COORDINATION=mongodb and a shared MongoDB queue, kills the elected
+leader half-way through, and counts the emails a local SMTP stand-in receives.
+Exits 1 unless every reminder arrived exactly once.
+
+    python benchmarks/check_multi_instance.py [instances] [reminders]
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_tz
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+from pymongo import MongoClient
+
+HOST, PORT = "127.0.0.1", 8026
+DB_NAME = "jeevanta_multi_instance_check"
+LEADER_TTL = 9
+
+CHILD = """
+import time
+import Reminder_agent.reminder_scheduler as rs
+rs.start_scheduler()
+while True:
+    time.sleep(1)
+"""
+
+
+class _Recorder:
+    def __init__(self):
+        self.received = Counter()
+
+    async def handle_DATA(self, server, session, envelope):
+        for rcpt in envelope.rcpt_tos:
+            self.received[rcpt] += 1
+        return "250 OK"
+
+
+def _accept_any(server, session, envelope, mechanism, auth_data):
+    return AuthResult(success=True)
+
+
+def _leader_pid(db) -> int | None:
+    lease = db["scheduler_leases"].find_one({"_id": "reminder-scheduler"})
+    if not lease or lease["expires_at"] < time.time():
+        return None
+    return int(lease["owner"].split(":")[1])
+
+
+def main() -> int:
+    instances = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    reminders = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+    client = MongoClient(uri)
+    client.drop_database(DB_NAME)
+    db = client[DB_NAME]
+
+    due = (datetime.now(dt_tz.utc) + timedelta(minutes=2)).strftime("%H:%M")
+    db["Users_medical_reminder"].insert_many([{
+        "user_id": f"user{i}", "email": f"user{i}@example.com", "medicine": f"Medicine{i}",
+        "medicine_normalized": f"medicine{i}", "time": due, "timezone": "UTC",
+        "updated_at": datetime.now(dt_tz.utc),
+    } for i in range(reminders)])
+
+    recorder = _Recorder()
+    smtp = Controller(recorder, hostname=HOST, port=PORT,
+                      authenticator=_accept_any, auth_require_tls=False)
+    smtp.start()
+
+    env = {**os.environ, "PYTHONPATH": str(ROOT), "MONGODB_URI": uri, "MONGODB_DB_NAME": DB_NAME,
+           "REMINDER_COORDINATION": "mongodb", "REMINDER_LEADER_TTL": str(LEADER_TTL),
+           "REMINDER_QUEUE_BACKEND": "mongodb", "SMTP_SERVER": HOST, "SMTP_PORT": str(PORT),
+           "SMTP_STARTTLS": "false", "EMAIL_USER": "reminders@example.com", "EMAIL_PASSWORD": "x"}
+    procs = [subprocess.Popen([sys.executable, "-c", CHILD], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+             for _ in range(instances)]
+    print(f"{instances} instances, {reminders} reminders due at {due} UTC")
+    try:
+        deadline = time.time() + 150
+        killed = False
+        while time.time() < deadline and sum(recorder.received.values()) < reminders:
+            leader = _leader_pid(db)
+            if not killed and leader and time.time() > deadline - 120:
+                os.kill(leader, signal.SIGKILL)
+                killed = True
+                print(f"killed leader pid {leader}")
+            time.sleep(1)
+        time.sleep(LEADER_TTL)       # give any duplicate a chance to show up
+    finally:
+        for p in procs:
+            p.kill()
+        smtp.stop()
+        client.drop_database(DB_NAME)
+
+    duplicates = sum(1 for n in recorder.received.values() if n > 1)
+    missing = reminders - len(recorder.received)
+    print(f"received={sum(recorder.received.values())} unique={len(recorder.received)} "
+          f"duplicates={duplicates} missing={missing}")
+    return 0 if not duplicates and not missing else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
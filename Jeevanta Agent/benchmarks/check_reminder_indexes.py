@@ -0,0 +1,31 @@
+"""Create / verify the Users_medical_reminder indexes and print the query plans.
+
+Runs against MONGODB_URI (explain needs a real mongod). Exits 1 if an index
+is missing or a lookup falls back to a collection scan.
+
+    python benchmarks/check_reminder_indexes.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from Reminder_agent.reminder_store import ensure_indexes, explain_queries
+
+
+def main() -> int:
+    result = ensure_indexes()
+    print(f"indexes  backfilled={result['backfilled']} unique={result['unique']} "
+          f"missing={result['missing'] or 'none'}")
+    failed = bool(result["missing"])
+    for name, stages in explain_queries().items():
+        scan = any(stage == "COLLSCAN" for stage, _ in stages)
+        failed |= scan
+        plan = " <- ".join(f"{stage}({index})" if index else stage for stage, index in stages)
+        print(f"{name:17s} {'COLLSCAN' if scan else 'ok':8s} {plan}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
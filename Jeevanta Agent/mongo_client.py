@@ -0,0 +1,89 @@
+"""Process-wide MongoDB clients shared by the reminder store and session backend.
+
+get_database() is the blocking client used from threads (scheduler, delivery
+workers, session store). get_async_database() is a pymongo AsyncMongoClient
+for coroutines (agent tools) so they never park an executor thread on I/O.
+Both are created lazily, once per process, and size their connection pools
+from MONGODB_MAX_POOL_SIZE / MONGODB_MIN_POOL_SIZE / MONGODB_MAX_IDLE_MS.
+"""
+
+import asyncio
+import os
+import threading
+
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.database import Database
+
+load_dotenv()
+
+_client: MongoClient | None = None
+_async_client: AsyncMongoClient | None = None
+_async_loop: asyncio.AbstractEventLoop | None = None
+_lock = threading.Lock()
+
+
+def _uri() -> str:
+    return os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+
+
+def _db_name() -> str:
+    return os.getenv("MONGODB_DB_NAME", "Users")
+
+
+def _pool_options() -> dict:
+    """Connection-pool settings applied to both clients (per client, per process)."""
+    return {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+        "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_MS", "0")) or None,
+        "serverSelectionTimeoutMS": 5000,
+    }
+
+
+def get_database() -> Database:
+    """Return the configured database, connecting lazily on first call."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                client = MongoClient(_uri(), **_pool_options())
+                client[_db_name()].command("ping")  # fail fast if unreachable
+                _client = client
+    return _client[_db_name()]
+
+
+def get_async_database() -> AsyncDatabase:
+    """Async counterpart of get_database(); call it from a coroutine.
+
+    Construction does no I/O — the first awaited operation connects. An
+    AsyncMongoClient is bound to the event loop it first runs on, so a caller
+    on a different loop (e.g. a script calling asyncio.run twice) gets a new
+    client; the server's loop keeps one for the life of the process.
+    """
+    global _async_client, _async_loop
+    loop = asyncio.get_running_loop()
+    with _lock:
+        if _async_client is None or _async_loop is not loop:
+            _async_client = AsyncMongoClient(_uri(), **_pool_options())
+            _async_loop = loop
+        return _async_client[_db_name()]
+
+
+def close_database() -> None:
+    """Close the shared client (app shutdown); the next get_database() reconnects."""
+    global _client
+    with _lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+
+
+async def close_async_database() -> None:
+    """Close the shared async client (app shutdown); the next call reconnects."""
+    global _async_client, _async_loop
+    with _lock:
+        client, _async_client, _async_loop = _async_client, None, None
+    if client is not None:
+        await client.close()
@@ -0,0 +1,133 @@
+"""Background lifecycle management for cached conversation sessions.
+
+A sweep runs every SESSION_SWEEP_INTERVAL seconds, off the request path:
+  1. sessions idle for longer than SESSION_IDLE_TTL are evicted,
+  2. sessions longer than SESSION_MAX_EVENTS have their oldest events trimmed,
+  3. if more than SESSION_MAX_CACHED remain, least recently used ones go.
+
+With the memory backend eviction is deletion; with sqlite/mongodb only the
+in-process copy is dropped and the session reloads on its next turn.
+"""
+
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from session_store import CachedSessionService
+
+load_dotenv()
+
+SESSION_IDLE_TTL       = float(os.getenv("SESSION_IDLE_TTL", "7200"))
+SESSION_MAX_CACHED     = int(os.getenv("SESSION_MAX_CACHED", "5000"))
+SESSION_MAX_EVENTS     = int(os.getenv("SESSION_MAX_EVENTS", "200"))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+
+
+def _rss_bytes() -> int:
+    """Current resident set size; falls back to peak RSS off Linux, 0 if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        if resource is None:
+            return 0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class SessionManager:
+    """Evicts idle sessions and enforces count / length caps in the background."""
+
+    def __init__(self, service: CachedSessionService,
+                 idle_ttl: float = SESSION_IDLE_TTL,
+                 max_sessions: int = SESSION_MAX_CACHED,
+                 max_events: int = SESSION_MAX_EVENTS,
+                 interval: float = SESSION_SWEEP_INTERVAL):
+        self.service = service
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.max_events = max_events
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+        self._totals = {"sweeps": 0, "idle_evicted": 0, "lru_evicted": 0, "events_trimmed": 0}
+        self._last_sweep: dict = {}
+
+    def sweep(self) -> dict:
+        """Run one pass synchronously and return what it did."""
+        started = time.perf_counter()
+        now = time.time()
+        idle = lru = trimmed = 0
+
+        live = []
+        for s in self.service.cached_sessions():
+            if now - s["active_at"] > self.idle_ttl:
+                self.service.evict(s["key"])
+                idle += 1
+            else:
+                live.append(s)
+
+        for s in live:
+            if s["events"] > self.max_events:
+                trimmed += self.service.trim_events(s["key"], self.max_events)
+
+        for s in live[:max(0, len(live) - self.max_sessions)]:   # oldest first
+            self.service.evict(s["key"])
+            lru += 1
+
+        self._totals["sweeps"] += 1
+        self._totals["idle_evicted"] += idle
+        self._totals["lru_evicted"] += lru
+        self._totals["events_trimmed"] += trimmed
+        self._last_sweep = {
+            "at": now,
+            "idle_evicted": idle,
+            "lru_evicted": lru,
+            "events_trimmed": trimmed,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        return self._last_sweep
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"[SessionManager] Sweep failed: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def report(self) -> dict:
+        sessions = self.service.cached_sessions()
+        return {
+            "sessions": len(sessions),
+            "events": sum(s["events"] for s in sessions),
+            "session_bytes": sum(s["bytes"] for s in sessions),
+            "process_rss_bytes": _rss_bytes(),
+            "persistent": self.service.persistent,
+            "limits": {
+                "idle_ttl": self.idle_ttl,
+                "max_sessions": self.max_sessions,
+                "max_events": self.max_events,
+                "sweep_interval": self.interval,
+            },
+            "totals": dict(self._totals),
+            "last_sweep": self._last_sweep,
+        }
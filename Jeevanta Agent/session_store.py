@@ -0,0 +1,558 @@
+"""Persistent ADK session service with an in-process write-through cache.
+
+SESSION_BACKEND selects where conversations live:
+  memory  — process memory only (lost on restart, single worker)
+  sqlite  — local file at SESSION_SQLITE_PATH (single node, survives restarts)
+  mongodb — MONGODB_URI / MONGODB_DB_NAME (shared by every worker and node)
+
+Events are written append-only, one row per event; the session row only
+carries the current state and an event counter. Sessions are loaded lazily
+on first access and then served from the cache. A cached session is
+re-checked against the store at most every SESSION_CACHE_REVALIDATE seconds
+(a single-row read), so a hot session costs no DB read on most turns.
+
+app:/user: prefixed state keys are stored with the session they were
+written in rather than shared across sessions.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import (
+    BaseSessionService,
+    GetSessionConfig,
+    ListSessionsResponse,
+)
+from google.adk.sessions.state import State
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from mongo_client import get_database
+
+load_dotenv()
+
+SESSION_BACKEND          = os.getenv("SESSION_BACKEND", "memory").lower()
+SESSION_SQLITE_PATH      = os.getenv("SESSION_SQLITE_PATH", "sessions.db")
+SESSION_CACHE_REVALIDATE = float(os.getenv("SESSION_CACHE_REVALIDATE", "5"))
+
+SessionKey = tuple[str, str, str]   # (app_name, user_id, session_id)
+
+# MongoSessionStore.append retries when another writer takes the same seq.
+_APPEND_ATTEMPTS = 100
+
+
+def _persistent_state(state: dict[str, Any]) -> dict[str, Any]:
+    return {k: v for k, v in state.items() if not k.startswith(State.TEMP_PREFIX)}
+
+
+# ---------------------------------------------------------------------------
+# Stores (blocking; called from a worker thread)
+# ---------------------------------------------------------------------------
+
+class SqliteSessionStore:
+    """Single-file store for one node. Safe to share across threads."""
+
+    def __init__(self, path: str = SESSION_SQLITE_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    app_name    TEXT NOT NULL,
+                    user_id     TEXT NOT NULL,
+                    id          TEXT NOT NULL,
+                    state       TEXT NOT NULL,
+                    update_time REAL NOT NULL,
+                    event_count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (app_name, user_id, id)
+                );
+                CREATE INDEX IF NOT EXISTS sessions_by_user
+                    ON sessions (app_name, user_id, update_time);
+                CREATE TABLE IF NOT EXISTS session_events (
+                    app_name   TEXT NOT NULL,
+                    user_id    TEXT NOT NULL,
+                    session_id TEXT NOT NULL,
+                    seq        INTEGER NOT NULL,
+                    data       TEXT NOT NULL,
+                    PRIMARY KEY (app_name, user_id, session_id, seq)
+                );
+            """)
+
+    def create(self, key: SessionKey, state: dict, update_time: float) -> bool:
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO sessions (app_name, user_id, id, state, update_time) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (*key, json.dumps(state), update_time),
+            )
+            return cur.rowcount == 1
+
+    def head(self, key: SessionKey) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT update_time, event_count FROM sessions "
+                "WHERE app_name = ? AND user_id = ? AND id = ?", key,
+            ).fetchone()
+        return None if row is None else {"update_time": row[0], "event_count": row[1]}
+
+    def load(self, key: SessionKey, start_seq: int = 0) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, update_time, event_count FROM sessions "
+                "WHERE app_name = ? AND user_id = ? AND id = ?", key,
+            ).fetchone()
+            if row is None:
+                return None
+            events = self._conn.execute(
+                "SELECT data FROM session_events WHERE app_name = ? AND user_id = ? "
+                "AND session_id = ? AND seq >= ? ORDER BY seq", (*key, start_seq),
+            ).fetchall()
+        return {
+            "state": json.loads(row[0]),
+            "update_time": row[1],
+            "event_count": row[2],
+            "events": [e[0] for e in events],
+        }
+
+    def append(self, key: SessionKey, event_json: str, state: dict, update_time: float) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT event_count FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                    key,
+                ).fetchone()
+                if row is None:
+                    raise ValueError(f"Session {key[2]} not found.")
+                seq = row[0]
+                self._conn.execute(
+                    "INSERT INTO session_events (app_name, user_id, session_id, seq, data) "
+                    "VALUES (?, ?, ?, ?, ?)", (*key, seq, event_json),
+                )
+                self._conn.execute(
+                    "UPDATE sessions SET state = ?, update_time = ?, event_count = ? "
+                    "WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (json.dumps(state), update_time, seq + 1, *key),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return seq
+
+    def delete(self, key: SessionKey) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM session_events WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+            self._conn.execute(
+                "DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key)
+
+    def list(self, app_name: str, user_id: str | None) -> list[dict]:
+        sql = "SELECT user_id, id, update_time FROM sessions WHERE app_name = ?"
+        args: tuple = (app_name,)
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            args += (user_id,)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY update_time", args).fetchall()
+        return [{"user_id": r[0], "id": r[1], "update_time": r[2]} for r in rows]
+
+    def latest(self, app_name: str, user_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, update_time FROM sessions WHERE app_name = ? AND user_id = ? "
+                "ORDER BY update_time DESC LIMIT 1", (app_name, user_id),
+            ).fetchone()
+        return None if row is None else {"id": row[0], "update_time": row[1]}
+
+
+class MongoSessionStore:
+    """Shared store for multi-worker / multi-node deployments."""
+
+    def __init__(self):
+        db = get_database()
+        self._sessions = db["adk_sessions"]
+        self._events = db["adk_session_events"]
+        self._sessions.create_index([("app_name", ASCENDING), ("user_id", ASCENDING),
+                                     ("update_time", ASCENDING)])
+        self._events.create_index([("session", ASCENDING), ("seq", ASCENDING)], unique=True)
+
+    @staticmethod
+    def _id(key: SessionKey) -> str:
+        return json.dumps(key)
+
+    def create(self, key: SessionKey, state: dict, update_time: float) -> bool:
+        try:
+            self._sessions.insert_one({
+                "_id": self._id(key),
+                "app_name": key[0], "user_id": key[1], "session_id": key[2],
+                "state": json.dumps(state),
+                "update_time": update_time,
+                "event_count": 0,
+            })
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def head(self, key: SessionKey) -> dict | None:
+        return self._sessions.find_one(
+            {"_id": self._id(key)}, {"_id": 0, "update_time": 1, "event_count": 1})
+
+    def load(self, key: SessionKey, start_seq: int = 0) -> dict | None:
+        doc = self._sessions.find_one({"_id": self._id(key)})
+        if doc is None:
+            return None
+        events = self._events.find(
+            {"session": doc["_id"], "seq": {"$gte": start_seq}}, {"_id": 0, "data": 1},
+        ).sort("seq", 1)
+        return {
+            "state": json.loads(doc["state"]),
+            "update_time": doc["update_time"],
+            "event_count": doc["event_count"],
+            "events": [e["data"] for e in events],
+        }
+
+    def append(self, key: SessionKey, event_json: str, state: dict, update_time: float) -> int:
+        """Store the event at the next seq, then advance event_count past it.
+
+        The unique (session, seq) index orders concurrent writers: the event
+        is inserted first, so a crash never leaves event_count ahead of the
+        stored events. An event left behind by a writer that died before
+        advancing the counter is adopted by the next append (DuplicateKeyError).
+        """
+        session_id = self._id(key)
+        for _ in range(_APPEND_ATTEMPTS):
+            head = self._sessions.find_one({"_id": session_id}, {"event_count": 1})
+            if head is None:
+                raise ValueError(f"Session {key[2]} not found.")
+            seq = head["event_count"]
+            try:
+                self._events.insert_one({"session": session_id, "seq": seq, "data": event_json})
+            except DuplicateKeyError:
+                # Taken by a concurrent writer, or orphaned by a crash: move past it and retry.
+                self._sessions.update_one({"_id": session_id, "event_count": seq},
+                                          {"$set": {"event_count": seq + 1}})
+                continue
+            # Skipped when a later event already advanced the counter; its state is newer.
+            self._sessions.update_one(
+                {"_id": session_id, "event_count": {"$lte": seq}},
+                {"$set": {"event_count": seq + 1, "state": json.dumps(state), "update_time": update_time}},
+            )
+            return seq
+        raise RuntimeError(f"Could not append to session {key[2]}: too many concurrent writers.")
+
+    def delete(self, key: SessionKey) -> None:
+        self._events.delete_many({"session": self._id(key)})
+        self._sessions.delete_one({"_id": self._id(key)})
+
+    def list(self, app_name: str, user_id: str | None) -> list[dict]:
+        query = {"app_name": app_name}
+        if user_id is not None:
+            query["user_id"] = user_id
+        docs = self._sessions.find(
+            query, {"_id": 0, "user_id": 1, "session_id": 1, "update_time": 1},
+        ).sort("update_time", 1)
+        return [{"user_id": d["user_id"], "id": d["session_id"], "update_time": d["update_time"]}
+                for d in docs]
+
+    def latest(self, app_name: str, user_id: str) -> dict | None:
+        doc = self._sessions.find_one(
+            {"app_name": app_name, "user_id": user_id},
+            {"_id": 0, "session_id": 1, "update_time": 1},
+            sort=[("update_time", -1)],
+        )
+        return None if doc is None else {"id": doc["session_id"], "update_time": doc["update_time"]}
+
+
+# ---------------------------------------------------------------------------
+# Session service
+# ---------------------------------------------------------------------------
+
+class _CacheEntry:
+    """A cached session plus the bookkeeping the cache and sweeper need."""
+
+    __slots__ = ("session", "checked_at", "active_at", "base_seq", "sizes")
+
+    def __init__(self, session: Session, sizes: list[int], base_seq: int = 0):
+        self.session = session
+        self.checked_at = time.monotonic()   # last validated against the store
+        self.active_at = time.time()         # last read or write by a request
+        self.base_seq = base_seq             # events trimmed from the front
+        self.sizes = sizes                   # serialised size of each cached event
+
+    @property
+    def event_count(self) -> int:
+        """Total events in the session, including trimmed ones."""
+        return self.base_seq + len(self.session.events)
+
+
+class CachedSessionService(BaseSessionService):
+    """ADK session service that keeps hot sessions in memory and writes through.
+
+    With store=None the cache is the only copy (equivalent to
+    InMemorySessionService), so evicting or trimming a session discards it.
+    """
+
+    def __init__(self, store=None, revalidate_after: float = SESSION_CACHE_REVALIDATE):
+        self._store = store
+        self._revalidate_after = revalidate_after
+        self._cache: OrderedDict[SessionKey, _CacheEntry] = OrderedDict()
+        self._by_user: dict[tuple[str, str], set[str]] = {}
+        # (app_name, user_id) -> (session_id, update_time, checked_at) of the latest session
+        self._latest: dict[tuple[str, str], tuple[str, float, float]] = {}
+
+    @property
+    def persistent(self) -> bool:
+        return self._store is not None
+
+    # -- cache helpers --------------------------------------------------------
+
+    def _cache_put(self, key: SessionKey, entry: _CacheEntry) -> None:
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        self._by_user.setdefault(key[:2], set()).add(key[2])
+
+    def _cache_drop(self, key: SessionKey) -> None:
+        self._cache.pop(key, None)
+        ids = self._by_user.get(key[:2])
+        if ids is not None:
+            ids.discard(key[2])
+            if not ids:
+                del self._by_user[key[:2]]
+                self._latest.pop(key[:2], None)
+
+    def _touch(self, key: SessionKey, entry: _CacheEntry) -> None:
+        entry.active_at = time.time()
+        self._cache.move_to_end(key)
+
+    def _note_latest(self, key: SessionKey, update_time: float) -> None:
+        """Record a write to key's session; it is now the user's latest if it is the newest."""
+        latest = self._latest.get(key[:2])
+        if latest is None:
+            self._latest[key[:2]] = (key[2], update_time, time.monotonic())
+        elif update_time >= latest[1]:
+            self._latest[key[:2]] = (key[2], update_time, latest[2])
+
+    @staticmethod
+    def _to_entry(key: SessionKey, row: dict) -> _CacheEntry:
+        session = Session(
+            app_name=key[0], user_id=key[1], id=key[2],
+            state=row["state"],
+            events=[Event.model_validate_json(e) for e in row["events"]],
+            last_update_time=row["update_time"],
+        )
+        return _CacheEntry(session, [len(e) for e in row["events"]])
+
+    async def _load(self, key: SessionKey) -> _CacheEntry | None:
+        entry = self._cache.get(key)
+        if self._store is None:
+            return entry
+        if entry is None:
+            row = await asyncio.to_thread(self._store.load, key)
+            if row is None:
+                return None
+            entry = self._to_entry(key, row)
+            self._cache_put(key, entry)
+            return entry
+
+        if time.monotonic() - entry.checked_at < self._revalidate_after:
+            return entry
+        head = await asyncio.to_thread(self._store.head, key)
+        if head is None:                       # deleted by another worker
+            self._cache_drop(key)
+            return None
+        if head["event_count"] != entry.event_count:
+            row = await asyncio.to_thread(self._store.load, key, entry.event_count)
+            if row is None:
+                self._cache_drop(key)
+                return None
+            entry.session.state = row["state"]
+            entry.session.events.extend(Event.model_validate_json(e) for e in row["events"])
+            entry.session.last_update_time = row["update_time"]
+            entry.sizes.extend(len(e) for e in row["events"])
+        entry.checked_at = time.monotonic()
+        return entry
+
+    # -- BaseSessionService ---------------------------------------------------
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = (session_id or "").strip() or str(uuid.uuid4())
+        key = (app_name, user_id, session_id)
+        state = _persistent_state(state or {})
+        now = time.time()
+        if key in self._cache:
+            raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+        if self._store is not None:
+            created = await asyncio.to_thread(self._store.create, key, state, now)
+            if not created:
+                raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+        session = Session(app_name=app_name, user_id=user_id, id=session_id,
+                          state=state, events=[], last_update_time=now)
+        self._cache_put(key, _CacheEntry(session, []))
+        self._note_latest(key, now)
+        return session.model_copy(deep=True)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        key = (app_name, user_id, session_id)
+        entry = await self._load(key)
+        if entry is None:
+            return None
+        self._touch(key, entry)
+        session = entry.session.model_copy(deep=True)
+        if config is not None:
+            if config.num_recent_events is not None:
+                session.events = session.events[-config.num_recent_events:] if config.num_recent_events else []
+            if config.after_timestamp is not None:
+                session.events = [e for e in session.events if e.timestamp >= config.after_timestamp]
+        return session
+
+    async def list_sessions(
+        self, *, app_name: str, user_id: Optional[str] = None
+    ) -> ListSessionsResponse:
+        if self._store is not None:
+            rows = await asyncio.to_thread(self._store.list, app_name, user_id)
+        else:
+            rows = sorted(
+                ({"user_id": k[1], "id": k[2], "update_time": e.session.last_update_time}
+                 for k, e in self._cache.items()
+                 if k[0] == app_name and (user_id is None or k[1] == user_id)),
+                key=lambda r: r["update_time"],
+            )
+        return ListSessionsResponse(sessions=[
+            Session(app_name=app_name, user_id=r["user_id"], id=r["id"],
+                    state={}, events=[], last_update_time=r["update_time"])
+            for r in rows
+        ])
+
+    async def delete_session(
+        self, *, app_name: str, user_id: str, session_id: str
+    ) -> None:
+        key = (app_name, user_id, session_id)
+        self._cache_drop(key)
+        latest = self._latest.get(key[:2])
+        if latest is not None and latest[0] == session_id:
+            del self._latest[key[:2]]
+        if self._store is not None:
+            await asyncio.to_thread(self._store.delete, key)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        event = await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        key = (session.app_name, session.user_id, session.id)
+        state = _persistent_state(session.state)
+        event_json = event.model_dump_json(exclude_none=True)
+        self._note_latest(key, event.timestamp)
+
+        seq = None
+        if self._store is not None:
+            seq = await asyncio.to_thread(
+                self._store.append, key, event_json, state, event.timestamp,
+            )
+        entry = self._cache.get(key)
+        if entry is None or entry.session is session:
+            return event
+        if seq is not None and seq != entry.event_count:
+            # Another worker wrote to this session; reload it on next access.
+            self._cache_drop(key)
+            return event
+        entry.session.events.append(event)
+        entry.session.state = dict(state)
+        entry.session.last_update_time = event.timestamp
+        entry.sizes.append(len(event_json))
+        self._touch(key, entry)
+        return event
+
+    # -- extras ---------------------------------------------------------------
+
+    async def latest_session_id(self, app_name: str, user_id: str) -> str | None:
+        """Most recently active session for a user, or None if they have none.
+
+        Kept per user and updated by this worker's creates, appends and
+        deletes; like cached sessions, it is re-read from the store (one
+        indexed row) at most every revalidate_after seconds to see other
+        workers' sessions.
+        """
+        if self._store is None:
+            ids = self._by_user.get((app_name, user_id))
+            if not ids:
+                return None
+            return max(ids, key=lambda sid: self._cache[(app_name, user_id, sid)].session.last_update_time)
+        latest = self._latest.get((app_name, user_id))
+        if latest is not None and time.monotonic() - latest[2] < self._revalidate_after:
+            return latest[0]
+        row = await asyncio.to_thread(self._store.latest, app_name, user_id)
+        if row is None:
+            self._latest.pop((app_name, user_id), None)
+            return None
+        self._latest[(app_name, user_id)] = (row["id"], row["update_time"], time.monotonic())
+        return row["id"]
+
+    def cached_sessions(self) -> list[dict]:
+        """Snapshot of cached sessions, least recently used first."""
+        return [
+            {"key": key, "active_at": e.active_at,
+             "events": len(e.session.events), "bytes": sum(e.sizes)}
+            for key, e in self._cache.items()
+        ]
+
+    def evict(self, key: SessionKey) -> None:
+        """Drop a session from memory (persistent backends reload it on next access)."""
+        self._cache_drop(key)
+
+    def trim_events(self, key: SessionKey, max_events: int) -> int:
+        """Keep at most max_events of a cached session's most recent events.
+
+        Never leaves a function response without its call at the front.
+        Returns the number of events dropped.
+        """
+        entry = self._cache.get(key)
+        if entry is None or len(entry.session.events) <= max_events:
+            return 0
+        events = entry.session.events
+        cut = len(events) - max_events
+        while cut < len(events) and events[cut].get_function_responses():
+            cut += 1
+        del events[:cut]
+        del entry.sizes[:cut]
+        entry.base_seq += cut
+        return cut
+
+
+def build_session_service() -> CachedSessionService:
+    """Create the session service selected by SESSION_BACKEND."""
+    if SESSION_BACKEND == "memory":
+        return CachedSessionService()
+    if SESSION_BACKEND == "sqlite":
+        return CachedSessionService(SqliteSessionStore(SESSION_SQLITE_PATH))
+    if SESSION_BACKEND in ("mongodb", "mongo"):
+        return CachedSessionService(MongoSessionStore())
+    raise ValueError(f"Unknown SESSION_BACKEND '{SESSION_BACKEND}' (use memory, sqlite or mongodb).")
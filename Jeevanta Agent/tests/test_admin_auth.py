@@ -0,0 +1,40 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import api_server
+
+ROUTES = [
+    ("get", "/admin/sessions"),
+    ("get", "/admin/reminders"),
+    ("get", "/admin/reminders/dead-letters"),
+    ("delete", "/profile-cache/9999999999"),
+]
+
+
+@pytest.fixture
+def client():
+    # No lifespan: the guard answers before any route touches the session store or scheduler.
+    return TestClient(api_server.app)
+
+
+@pytest.mark.parametrize("method,path", ROUTES)
+def test_admin_routes_are_disabled_without_a_token(client, monkeypatch, method, path):
+    monkeypatch.setattr(api_server, "ADMIN_TOKEN", "")
+    response = getattr(client, method)(path, headers={"Authorization": "Bearer "})
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("method,path", ROUTES)
+@pytest.mark.parametrize("authorization", [None, "Bearer wrong", "secret", "Basic secret"])
+def test_admin_routes_reject_a_missing_or_wrong_token(client, monkeypatch, method, path, authorization):
+    monkeypatch.setattr(api_server, "ADMIN_TOKEN", "secret")
+    headers = {"Authorization": authorization} if authorization else {}
+    response = getattr(client, method)(path, headers=headers)
+    assert response.status_code == 401
+
+
+def test_admin_routes_accept_the_token(client, monkeypatch):
+    monkeypatch.setattr(api_server, "ADMIN_TOKEN", "secret")
+    response = client.get("/admin/reminders", params={"count_only": True},
+                          headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200 and response.json()["ok"]
@@ -0,0 +1,51 @@
+from email import message_from_bytes, policy
+
+import pytest
+
+from Reminder_agent.email_templates import MessageCache
+
+
+def _item(medicine: str) -> list[dict]:
+    return [{"medicine": medicine, "time": "08:00", "timezone": "Asia/Kolkata"}]
+
+
+def _header_lines(data: bytes) -> list[bytes]:
+    return data.split(b"\r\n\r\n", 1)[0].split(b"\r\n")
+
+
+@pytest.fixture
+def cache():
+    return MessageCache("reminders@example.com")
+
+
+@pytest.mark.parametrize("medicine", ["X\r\nReply-To: evil@x.com", "X\nBcc: evil@x.com", "X\x00Y"])
+def test_medicine_name_cannot_inject_headers(cache, medicine):
+    with pytest.raises(ValueError):
+        cache.message("a@x.com", _item(medicine))
+
+
+@pytest.mark.parametrize("to", ["a@x.com\r\nBcc: evil@x.com", "a@x.com, evil@x.com", ""])
+def test_recipient_must_be_one_plain_address(cache, to):
+    with pytest.raises(ValueError):
+        cache.message(to, _item("Metformin"))
+
+
+def test_long_subject_is_folded(cache):
+    medicine = "Metformin " * 150 + "M" * 1200
+    data = cache.message("a@x.com", _item(medicine)).data
+    assert max(len(line) for line in _header_lines(data)) <= 998   # RFC 5322 line limit
+    assert len(_header_lines(data)) > 10
+    msg = message_from_bytes(data, policy=policy.default)
+    assert msg["Subject"] == f"Reminder: Take {medicine} now"
+
+
+def test_message_round_trips(cache):
+    data = cache.message("a@x.com", _item("Paracétamol <500mg>")).data
+    assert all(line.isascii() for line in _header_lines(data))
+    msg = message_from_bytes(data, policy=policy.default)
+    assert msg["To"] == "a@x.com" and msg["Reply-To"] is None
+    assert msg["Subject"] == "Reminder: Take Paracétamol <500mg> now"
+    assert msg.get_content_type() == "multipart/alternative"
+    text, page = (part.get_content() for part in msg.iter_parts())
+    assert "Paracétamol <500mg> at 08:00 (Asia/Kolkata)" in text
+    assert "Paracétamol &lt;500mg&gt;" in page
@@ -0,0 +1,14 @@
+import pytest
+
+from agent_context.profile import PatientProfile
+
+
+@pytest.mark.parametrize("height,weight,expected", [
+    ("170", "70", "Height=170cm Weight=70kg"),
+    (170, 70.5, "Height=170cm Weight=70.5kg"),
+    ("170 cm", "70kg", "Height=170 cm Weight=70kg"),
+    ("5'7\"", "154 lbs", "Height=5'7\" Weight=154 lbs"),
+])
+def test_units_are_added_to_bare_numbers_only(height, weight, expected):
+    block = PatientProfile.from_api({"fullName": "Asha", "height": height, "weight": weight}).context_block()
+    assert block == f"[PATIENT CONTEXT] Name=Asha {expected}"
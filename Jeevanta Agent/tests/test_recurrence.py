@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from Reminder_agent.recurrence import ALL_DAYS, WEEKDAYS, Recurrence, parse_schedule
+
+
+@pytest.mark.parametrize("text,times", [
+    ("8 AM", ["08:00"]),
+    ("21:00", ["21:00"]),
+    ("8am and 8pm", ["08:00", "20:00"]),
+    ("morning and night", ["08:00", "21:00"]),
+    ("twice a day", ["08:00", "20:00"]),
+    ("once a day at 9 pm", ["21:00"]),
+    ("every 6 hours", ["02:00", "08:00", "14:00", "20:00"]),
+    ("every 8 hours from 7am", ["07:00", "15:00", "23:00"]),
+])
+def test_doses(text, times):
+    assert parse_schedule(text).times == tuple(times)
+
+
+@pytest.mark.parametrize("text,times", [
+    ("7 in the morning", ["07:00"]),
+    ("9 in the morning", ["09:00"]),
+    ("3 in the afternoon", ["15:00"]),
+    ("6:30 in the evening", ["18:30"]),
+    ("10 at night", ["22:00"]),
+    ("2 at night", ["02:00"]),
+    ("8 pm at night", ["20:00"]),
+    ("8 o'clock in the morning", ["08:00"]),
+    ("12 noon", ["12:00"]),
+    ("at 8 in the morning and 9 at night", ["08:00", "21:00"]),
+    ("twice a day at 8 in the morning and 8 at night", ["08:00", "20:00"]),
+    ("every 8 hours from 7 in the morning", ["07:00", "15:00", "23:00"]),
+])
+def test_part_of_day_only_sets_am_pm_of_a_given_hour(text, times):
+    assert parse_schedule(text).times == tuple(times)
+
+
+@pytest.mark.parametrize("text", ["3times a day", "3x a day", "3 x daily", "3 times a day",
+                                  "three times a day", "3 times per day"])
+def test_count_spellings(text):
+    assert parse_schedule(text).times == ("08:00", "14:00", "20:00")
+
+
+@pytest.mark.parametrize("text", ["5 times a day", "0 times a day", "every 5 hours", "13pm",
+                                  "13 pm at night", "every other day", "soon", "twice a day at 8am",
+                                  "8am except sunday", "8am until friday", "tomorrow 8am", "today at 8am",
+                                  "8am and 8pm for 5 days", "not at 8am", "banana 8am", "8am and 9"])
+def test_rejected_with_value_error(text):
+    with pytest.raises(ValueError):
+        parse_schedule(text)
+
+
+def test_days():
+    assert parse_schedule("9 PM on weekdays").days == WEEKDAYS
+    assert parse_schedule("8am monday until friday").days == WEEKDAYS
+    assert parse_schedule("every day at 8am").days == ALL_DAYS
+    assert parse_schedule("8am mon, wed and fri").days == 0b0010101
+    assert parse_schedule("8am").days == ALL_DAYS
+
+
+def test_only_value_error_escapes():
+    words = ["8", "3", "12", "20:30", "am", "pm", "x", "times", "3times", "twice", "a", "day", "every",
+             "hours", "from", "at", "in", "the", "morning", "night", "and", ",", "mon", "to", "fri",
+             "weekdays", "three", "o'clock", "13", "99", ":", "."]
+    rng = random.Random(25)
+    for _ in range(5000):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 7)))
+        try:
+            assert isinstance(parse_schedule(text), Recurrence)
+        except ValueError:
+            pass
+
+
+def test_documents_round_trip():
+    schedule = parse_schedule("every 12 hours from 9am on weekends")
+    assert Recurrence.from_doc(schedule.to_doc()) == schedule
+    assert Recurrence.from_doc({"time": "07:15"}) == Recurrence(["07:15"])
@@ -0,0 +1,72 @@
+from datetime import datetime, timezone as dt_tz
+
+import pytest
+
+from Reminder_agent import reminder_scheduler
+from Reminder_agent.reminder_index import ReminderIndex
+
+SUMMER = datetime(2026, 7, 1, tzinfo=dt_tz.utc)    # Europe/Berlin on CEST (UTC+2)
+MINUTE = 8 * 60                                     # 08:00 UTC
+
+
+@pytest.fixture(autouse=True)
+def digest_on(monkeypatch):
+    monkeypatch.setattr(reminder_scheduler, "_REMINDER_DIGEST", True)
+
+
+def _index(*reminders) -> ReminderIndex:
+    index = ReminderIndex()
+    for job_id, email, medicine, time_24h, timezone in reminders:
+        index.upsert(job_id, email.split("@")[0], email, medicine, time_24h, timezone)
+    index.refresh_offsets(SUMMER)
+    return index
+
+
+def test_one_patients_reminders_across_timezones_become_one_digest():
+    index = _index(
+        ("a:metformin", "a@x.com", "Metformin", "13:30", "Asia/Kolkata"),
+        ("a:aspirin", "A@x.com", "Aspirin", "08:00", "UTC"),
+        ("a:zinc", "a@x.com", "Zinc", "10:00", "Europe/Berlin"),
+    )
+    due = index.due(MINUTE)
+    assert len(due) == 3
+
+    tasks, coalesced = reminder_scheduler._delivery_tasks(due, MINUTE)
+    assert coalesced == 2
+    [(task_id, payload)] = tasks
+    assert task_id.startswith("digest:a@x.com:")
+    assert [(i["medicine"], i["time"], i["timezone"]) for i in payload["items"]] == [
+        ("Aspirin", "08:00", "UTC"),
+        ("Metformin", "13:30", "Asia/Kolkata"),
+        ("Zinc", "10:00", "Europe/Berlin"),
+    ]
+    # Same reminders in another order: same digest id, so a re-enqueue is a no-op.
+    assert reminder_scheduler._delivery_tasks(list(reversed(due)), MINUTE)[0][0][0] == task_id
+
+
+def test_other_patients_and_other_minutes_get_their_own_email():
+    index = _index(
+        ("a:metformin", "a@x.com", "Metformin", "13:30", "Asia/Kolkata"),
+        ("b:aspirin", "b@x.com", "Aspirin", "10:00", "Europe/Berlin"),
+        ("a:zinc", "a@x.com", "Zinc", "08:01", "UTC"),
+    )
+    tasks, coalesced = reminder_scheduler._delivery_tasks(index.due(MINUTE), MINUTE)
+    assert coalesced == 0
+    assert sorted(tasks) == [
+        ("a:metformin", {"email": "a@x.com", "medicine": "Metformin", "time": "13:30",
+                         "timezone": "Asia/Kolkata"}),
+        ("b:aspirin", {"email": "b@x.com", "medicine": "Aspirin", "time": "10:00",
+                       "timezone": "Europe/Berlin"}),
+    ]
+    later, _ = reminder_scheduler._delivery_tasks(index.due(MINUTE + 1), MINUTE + 1)
+    assert [task_id for task_id, _ in later] == ["a:zinc"]
+
+
+def test_digest_off_sends_one_email_per_reminder(monkeypatch):
+    monkeypatch.setattr(reminder_scheduler, "_REMINDER_DIGEST", False)
+    index = _index(
+        ("a:metformin", "a@x.com", "Metformin", "13:30", "Asia/Kolkata"),
+        ("a:aspirin", "a@x.com", "Aspirin", "08:00", "UTC"),
+    )
+    tasks, coalesced = reminder_scheduler._delivery_tasks(index.due(MINUTE), MINUTE)
+    assert coalesced == 0 and sorted(t for t, _ in tasks) == ["a:aspirin", "a:metformin"]
@@ -0,0 +1,82 @@
+"""Reminder collection indexes: the one-time migration, and query plans on a real mongod.
+
+The plan tests need a server (explain is a server command); point
+MONGO_TEST_URI at a disposable mongod, e.g. mongodb://localhost:27017.
+They use and drop the `jeevanta_test` database.
+"""
+
+import os
+from types import SimpleNamespace
+
+import mongomock
+import pytest
+from pymongo import MongoClient
+
+from Reminder_agent import reminder_store
+
+MONGO_TEST_URI = os.getenv("MONGO_TEST_URI")
+
+
+class _MockCollection(mongomock.Collection):
+    """mongomock's bulk_write predates pymongo 4.x's UpdateOne; apply the ops one by one."""
+
+    def bulk_write(self, requests, ordered=True):
+        modified = sum(self.update_one(op._filter, op._doc).modified_count for op in requests)
+        return SimpleNamespace(modified_count=modified)
+
+
+@pytest.fixture
+def mock_col(monkeypatch):
+    col = mongomock.MongoClient()["Users"]["Users_medical_reminder"]
+    col.__class__ = _MockCollection
+    monkeypatch.setattr(reminder_store, "_col", lambda: col)
+    return col
+
+
+def test_backfill_runs_only_until_the_unique_index_exists(mock_col):
+    mock_col.insert_many([
+        {"user_id": "u1", "email": "a@x.com", "medicine": " Metformin ", "time": "08:00"},
+        {"user_id": "u1", "email": "a@x.com", "medicine": "metformin", "time": "09:00"},
+    ])
+    first = reminder_store.ensure_indexes()
+    assert first["backfilled"] == 2 and first["deduplicated"] == 1
+    assert first["missing"] == [] and first["unique"]
+
+    mock_col.insert_one({"user_id": "u2", "email": "b@x.com", "medicine": "Aspirin", "time": "21:00"})
+    second = reminder_store.ensure_indexes()
+    assert second["backfilled"] == 0 and second["deduplicated"] == 0
+    assert "medicine_normalized" not in mock_col.find_one({"user_id": "u2"})
+
+
+@pytest.fixture(scope="module")
+def mongod():
+    if not MONGO_TEST_URI:
+        pytest.skip("MONGO_TEST_URI is not set")
+    client = MongoClient(MONGO_TEST_URI, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except Exception as e:
+        client.close()
+        pytest.skip(f"No mongod at MONGO_TEST_URI ({type(e).__name__})")
+    yield client
+    client.drop_database("jeevanta_test")
+    client.close()
+
+
+@pytest.fixture
+def mongod_col(mongod, monkeypatch):
+    mongod.drop_database("jeevanta_test")
+    col = mongod["jeevanta_test"]["Users_medical_reminder"]
+    monkeypatch.setattr(reminder_store, "_col", lambda: col)
+    return col
+
+
+@pytest.mark.parametrize("query", ["due_confirm", "by_user_medicine", "by_email", "changed_since"])
+def test_lookups_use_an_index(mongod_col, query):
+    for i in range(50):
+        reminder_store.upsert_reminder(f"user{i}", f"p{i}@x.com", f"Medicine {i % 5}", "08:00", "UTC")
+    assert reminder_store.ensure_indexes()["missing"] == []
+
+    stages = reminder_store.explain_queries(user_id="user3", medicine="Medicine 3")[query]
+    names = [stage for stage, _ in stages]
+    assert "IXSCAN" in names and "COLLSCAN" not in names, stages
@@ -0,0 +1,10 @@
+import pytest
+from google.adk.tools import FunctionTool
+
+from Reminder_agent import tools
+
+
+@pytest.mark.parametrize("tool", [tools.schedule_reminder, tools.schedule_reminders_bulk])
+def test_tool_descriptions_carry_the_dosing_guidance(tool):
+    # ADK builds the model-facing description from the docstring.
+    assert "8am and 8pm" in FunctionTool(tool)._get_declaration().description
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from session_store import CachedSessionService, SqliteSessionStore
+
+APP = "jeevanta"
+
+
+class CountingStore(SqliteSessionStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.latest_reads = 0
+        self.list_reads = 0
+
+    def latest(self, app_name, user_id):
+        self.latest_reads += 1
+        return super().latest(app_name, user_id)
+
+    def list(self, app_name, user_id):
+        self.list_reads += 1
+        return super().list(app_name, user_id)
+
+
+def test_latest_session_id_is_cached_between_turns(tmp_path):
+    async def run():
+        store = CountingStore(str(tmp_path / "sessions.db"))
+        service = CachedSessionService(store, revalidate_after=60)
+        assert await service.latest_session_id(APP, "u1") is None
+        first = await service.create_session(app_name=APP, user_id="u1")
+        second = await service.create_session(app_name=APP, user_id="u1")
+        for _ in range(5):
+            assert await service.latest_session_id(APP, "u1") == second.id
+        assert store.latest_reads == 1 and store.list_reads == 0
+
+        await service.delete_session(app_name=APP, user_id="u1", session_id=second.id)
+        assert await service.latest_session_id(APP, "u1") == first.id
+        assert store.latest_reads == 2
+
+    asyncio.run(run())
+
+
+def test_latest_session_id_sees_other_workers_after_revalidation(tmp_path):
+    async def run():
+        path = str(tmp_path / "sessions.db")
+        worker_a = CachedSessionService(SqliteSessionStore(path), revalidate_after=0)
+        worker_b = CachedSessionService(SqliteSessionStore(path), revalidate_after=0)
+        await worker_a.create_session(app_name=APP, user_id="u1")
+        assert await worker_a.latest_session_id(APP, "u1") is not None
+        newer = await worker_b.create_session(app_name=APP, user_id="u1")
+        assert await worker_a.latest_session_id(APP, "u1") == newer.id
+
+    asyncio.run(run())
+
+
+def _mongo_store(monkeypatch):
+    import mongomock
+
+    import session_store
+
+    db = mongomock.MongoClient()["Users"]
+    monkeypatch.setattr(session_store, "get_database", lambda: db)
+    return session_store.MongoSessionStore(), db
+
+
+def test_mongo_append_adopts_an_event_orphaned_by_a_crash(monkeypatch):
+    store, db = _mongo_store(monkeypatch)
+    key = (APP, "u1", "s1")
+    store.create(key, {}, 1.0)
+    assert store.append(key, '{"n": 0}', {"turn": 0}, 2.0) == 0
+    # A writer died after storing its event and before advancing event_count.
+    db["adk_session_events"].insert_one({"session": store._id(key), "seq": 1, "data": '{"n": 1}'})
+
+    assert store.append(key, '{"n": 2}', {"turn": 2}, 3.0) == 2
+    row = store.load(key)
+    assert row["event_count"] == len(row["events"]) == 3
+    assert row["state"] == {"turn": 2}
+
+
+def test_mongo_append_leaves_no_gap_when_the_insert_fails(monkeypatch):
+    store, db = _mongo_store(monkeypatch)
+    key = (APP, "u1", "s1")
+    store.create(key, {}, 1.0)
+
+    def fail(*args, **kwargs):
+        raise ConnectionError("lost connection")
+
+    monkeypatch.setattr(store._events, "insert_one", fail)
+    with pytest.raises(ConnectionError):
+        store.append(key, '{"n": 0}', {}, 2.0)
+    assert store.head(key)["event_count"] == 0